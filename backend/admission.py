@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+from metrics import admission_shed
+from structured_log import log
+
+# Low-priority requests (anonymous /chat, /chat/batch, /chat/history, /models) are shed past these
+ADMISSION_LOW_LAG_MS = float(os.environ.get("ADMISSION_LOW_LAG_MS", "100"))
+ADMISSION_LOW_IN_FLIGHT = int(os.environ.get("ADMISSION_LOW_IN_FLIGHT", "32"))
+# Everything else except authenticated /chat and the health probes is shed past these
+ADMISSION_LAG_MS = float(os.environ.get("ADMISSION_LAG_MS", "500"))
+ADMISSION_IN_FLIGHT = int(os.environ.get("ADMISSION_IN_FLIGHT", "128"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+ADMISSION_SAMPLE_MS = float(os.environ.get("ADMISSION_SAMPLE_MS", "50"))
+
+# /chat/batch fans out to many engine calls, so it goes first even for logged-in users
+LOW_PRIORITY_PATHS = ("/chat/batch", "/chat/history", "/models")
+# Never shed: probes decide whether we get restarted or taken out of rotation
+CRITICAL_PATHS = ("/livez", "/readyz", "/health", "/metrics")
+
+
+class AdmissionController:
+    """Event-loop lag and in-flight request count, and the decision whether to admit a request.
+
+    Lag is how late a periodic sleep wakes up, i.e. how long ready callbacks
+    (including every request's next step) wait for the loop. It rises to a new
+    sample immediately and decays over a few quiet ones, so the gate doesn't
+    flap open between two slow callbacks.
+    """
+
+    def __init__(self, sample_ms: float = ADMISSION_SAMPLE_MS):
+        self.interval = sample_ms / 1000
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - expected) * 1000)
+            self.lag_ms = lag_ms if lag_ms > self.lag_ms else (self.lag_ms + lag_ms) / 2
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def priority(path: str, authenticated: bool) -> str:
+        if path in CRITICAL_PATHS:
+            return "critical"
+        if path == "/chat":
+            return "critical" if authenticated else "low"
+        if path in LOW_PRIORITY_PATHS:
+            return "low"
+        return "normal"
+
+    def shed_reason(self, priority: str) -> Optional[str]:
+        """Why a request of this priority should be rejected right now, or None to admit it"""
+        if priority == "critical":
+            return None
+        if priority == "low":
+            lag_limit, in_flight_limit = ADMISSION_LOW_LAG_MS, ADMISSION_LOW_IN_FLIGHT
+        else:
+            lag_limit, in_flight_limit = ADMISSION_LAG_MS, ADMISSION_IN_FLIGHT
+        if self.lag_ms > lag_limit:
+            return "loop_lag"
+        if self.in_flight >= in_flight_limit:
+            return "in_flight"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "loop_lag_ms": round(self.lag_ms, 2),
+            "max_loop_lag_ms": round(self.max_lag_ms, 2),
+        }
+
+
+# Global admission controller
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware that answers 503 + Retry-After instead of queueing work the loop can't keep up with.
+
+    `await authenticate(authorization_header)` decides whether /chat counts as a
+    logged-in request; it runs on the loop, so it must not touch the database.
+    """
+
+    def __init__(self, app, authenticate: Optional[Callable[[str], Awaitable[bool]]] = None):
+        self.app = app
+        self.authenticate = authenticate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authenticated = False
+        if self.authenticate is not None and scope["path"] == "/chat":
+            header = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+            authenticated = header is not None and await self.authenticate(header.decode("latin-1"))
+        priority = admission.priority(scope["path"], authenticated)
+        reason = admission.shed_reason(priority)
+        if reason is not None:
+            admission.shed += 1
+            admission_shed.inc(priority=priority, reason=reason)
+            log.debug("admission.shed", path=scope["path"], priority=priority, reason=reason,
+                      lag_ms=round(admission.lag_ms, 1), in_flight=admission.in_flight)
+            body = orjson.dumps({"detail": "Server is overloaded, retry shortly"})
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        admission.admitted += 1
+        admission.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.in_flight -= 1
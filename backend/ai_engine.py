@@ -6,6 +6,64 @@ from datetime import datetime, timedelta
 import httpx
 import hashlib
 import random
+import time
+
+from metrics import stage, provider_latency, provider_requests, fallbacks, ollama_prompt_tokens, ollama_prefill_seconds
+from structured_log import log
+from shared_cache import shared_cache
+from hf_batcher import hf_batcher, HFBatchHTTPError
+from usage import usage_meter
+from ollama_context import ollama_contexts
+from model_router import ModelRouter, ROUTER_ENABLED
+from late_responses import late_responses
+
+# Ollama endpoint (point at benchmarks/ollama_stub.py for load tests)
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434").rstrip("/")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "mistral")
+# How often the background task re-probes Ollama; requests only read the cached result
+OLLAMA_PROBE_INTERVAL_SECONDS = float(os.environ.get("OLLAMA_PROBE_INTERVAL_SECONDS", "30"))
+# Shared between workers: the latest probe result, and a lease so only one worker probes per interval
+OLLAMA_HEALTH_KEY = "provider_health:ollama-local"
+OLLAMA_PROBE_LEASE_KEY = "probe_lease:ollama-local"
+# How long Ollama keeps the model loaded after a call, so follow-up turns don't pay a reload
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# Continue chat sessions from Ollama's returned context instead of resending the whole prompt
+OLLAMA_CONTEXT_REUSE = os.environ.get("OLLAMA_CONTEXT_REUSE", "true").lower() in ("1", "true", "yes")
+
+# Default deadline for remote providers (0 = wait for them); past it the offline answer is returned
+# and the provider's answer is kept as a late response. Requests can pass deadline_ms instead
+HEDGE_DEADLINE_MS = float(os.environ.get("HEDGE_DEADLINE_MS", "0"))
+
+# HuggingFace inference endpoint (point at benchmarks/ollama_stub.py for load tests)
+HUGGINGFACE_API_BASE = os.environ.get("HUGGINGFACE_API_BASE", "https://api-inference.huggingface.co/models").rstrip("/")
+HF_DIALOGPT_URL = f"{HUGGINGFACE_API_BASE}/microsoft/DialoGPT-medium"
+HF_BLENDERBOT_URL = f"{HUGGINGFACE_API_BASE}/facebook/blenderbot-400M-distill"
+
+BASE_SYSTEM_PROMPT = """You are an intelligent, empathetic AI study assistant designed to help students maintain a healthy balance between academics and personal well-being. You provide thoughtful, evidence-based advice while being supportive and encouraging.
+
+Key capabilities:
+- Study strategies and time management
+- Stress management and mental health support
+- Academic planning and goal setting
+- Work-life balance guidance
+- Code review and programming help
+- Document analysis and summarization
+
+Always be:
+- Empathetic and understanding
+- Evidence-based in your advice
+- Encouraging and supportive
+- Clear and actionable
+- Respectful of individual differences
+- Focused on student well-being and success"""
+STYLE_PROMPTS = {
+    "formal": "Use formal, academic language appropriate for professional communication.",
+    "casual": "Use friendly, conversational language with appropriate humor and warmth.",
+}
+LEVEL_PROMPTS = {
+    "university": "Provide advanced academic guidance suitable for university-level students.",
+    "high_school": "Provide guidance appropriate for high school students, considering their developmental stage.",
+}
 
 class AIEngine:
     def __init__(self):
@@ -15,19 +73,19 @@ class AIEngine:
         self.free_models = {
             "huggingface-free": {
                 "name": "HuggingFace Free",
-                "url": "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium",
+                "url": HF_DIALOGPT_URL,
                 "max_tokens": 2048,
                 "cost": "FREE"
             },
             "ollama-local": {
                 "name": "Ollama Local",
-                "url": "http://localhost:11434/api/generate",
+                "url": f"{OLLAMA_URL}/api/generate",
                 "max_tokens": 4096,
                 "cost": "FREE"
             },
             "community-free": {
                 "name": "Community Models",
-                "url": "https://api-inference.huggingface.co/models/facebook/blenderbot-400M-distill",
+                "url": HF_BLENDERBOT_URL,
                 "max_tokens": 2048,
                 "cost": "FREE"
             },
@@ -41,6 +99,23 @@ class AIEngine:
         
         # Default model - prioritize offline option
         self.default_model = "fallback-enhanced"
+
+        # Picks a model by recent latency/errors when the request doesn't name one
+        self.router = ModelRouter(list(self.free_models))
+
+        # Cached Ollama availability, refreshed by the background probe (start_probe)
+        self._ollama_available: Optional[bool] = None
+        self._ollama_checked_at = 0.0
+        self._probe_task: Optional[asyncio.Task] = None
+        # Provider calls that missed their deadline and are finishing in the background
+        self._late_tasks = set()
+
+        # Every distinct system prompt, built once; any other style or level adds nothing to the base
+        self._system_prompts = {
+            (style, level): self._compose_system_prompt(style, level)
+            for style in (None, *STYLE_PROMPTS)
+            for level in (None, *LEVEL_PROMPTS)
+        }
         
     def get_available_models(self) -> List[str]:
         """Get list of available free models"""
@@ -52,52 +127,148 @@ class AIEngine:
             available.extend(["huggingface-free", "community-free"])
         
         # Check if Ollama is running locally
-        if self._check_ollama_available():
+        if self.ollama_available():
             available.append("ollama-local")
         
         return available
+
+    def ollama_available(self) -> bool:
+        """Cached Ollama probe; probes inline only when no background probe keeps it fresh"""
+        if self._probe_task is not None:
+            # Until the start-up probe lands, treat Ollama as unavailable rather than block the loop
+            return bool(self._ollama_available)
+        stale = time.time() - self._ollama_checked_at > OLLAMA_PROBE_INTERVAL_SECONDS
+        if self._ollama_available is None or stale:
+            self.refresh_ollama_status()
+        return self._ollama_available
+
+    def refresh_ollama_status(self) -> bool:
+        self._ollama_available = self._check_ollama_available()
+        self._ollama_checked_at = time.time()
+        shared_cache.set(
+            OLLAMA_HEALTH_KEY,
+            {"available": self._ollama_available, "checked_at": self._ollama_checked_at},
+            ttl=OLLAMA_PROBE_INTERVAL_SECONDS * 3,
+        )
+        return self._ollama_available
+
+    def sync_ollama_status(self, interval: float = OLLAMA_PROBE_INTERVAL_SECONDS) -> bool:
+        """Probe if this worker wins the lease, otherwise adopt the result another worker published"""
+        shared = shared_cache.get(OLLAMA_HEALTH_KEY)
+        if shared is None or shared_cache.add(OLLAMA_PROBE_LEASE_KEY, os.getpid(), ttl=interval * 0.9):
+            return self.refresh_ollama_status()
+        self._ollama_available = shared["available"]
+        self._ollama_checked_at = shared["checked_at"]
+        return self._ollama_available
+
+    async def _probe_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            available = await asyncio.to_thread(self.sync_ollama_status, interval)
+            log.debug("provider.probe", provider="ollama-local", available=available)
+
+    def start_probe(self, interval: float = OLLAMA_PROBE_INTERVAL_SECONDS):
+        """Keep the Ollama status fresh from a background task (call from the app lifespan)"""
+        if self._probe_task is None and interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop(interval))
+
+    async def stop_probe(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
     
     def _check_ollama_available(self) -> bool:
         """Check if Ollama is running locally"""
         try:
-            response = httpx.get("http://localhost:11434/api/tags", timeout=2)
+            response = httpx.get(f"{OLLAMA_URL}/api/tags", timeout=2)
             return response.status_code == 200
         except:
             return False
     
+    def select_model(self, model: Optional[str] = None, max_latency_ms: Optional[float] = None) -> str:
+        """Model that will answer: the named one if available, else the router's pick (or the default).
+
+        Callers that need the model before generating (to log or key on it)
+        pass the result to generate_response, so the router decides once.
+        """
+        available_models = self.get_available_models()
+        if not model and ROUTER_ENABLED:
+            model = self.router.choose(available_models, max_latency_ms)
+        model = model or self.default_model
+
+        # If requested model is not available, fall back to default
+        if model not in available_models:
+            log.warning("model.unavailable", model=model, fallback=self.default_model)
+            fallbacks.inc(provider=model, reason="unavailable")
+            model = self.default_model
+        return model
+
     async def generate_response(
         self, 
         message: str, 
         history: List[Dict] = None,
         model: str = None,
         user_context: Dict = None,
-        documents: List[str] = None
+        documents: List[str] = None,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        max_latency_ms: Optional[float] = None,
+        deadline_ms: Optional[float] = None
     ) -> Dict[str, Any]:
-        """Generate AI response using free services"""
-        
-        model = model or self.default_model
-        available_models = self.get_available_models()
-        
-        # If requested model is not available, fall back to default
-        if model not in available_models:
-            print(f"Model {model} not available, falling back to {self.default_model}")
-            model = self.default_model
-        
-        # Build context
-        context = self._build_context(message, history, user_context, documents)
-        
-        # Generate response based on free model
-        if model == "ollama-local":
-            response = await self._generate_ollama_response(context)
-        elif model == "huggingface-free":
-            response = await self._generate_huggingface_response(context)
-        elif model == "community-free":
-            response = await self._generate_community_response(context)
-        elif model == "fallback-enhanced":
-            response = await self._generate_fallback_response(context)
+        """Generate AI response using free services.
+
+        user_id enables usage accounting and quotas; session_id lets Ollama
+        continue from the session's previous context instead of a full prompt.
+        Without a model, select_model picks one within max_latency_ms. With a
+        deadline (deadline_ms or HEDGE_DEADLINE_MS), a remote provider races
+        the offline fallback.
+        """
+        
+        model = self.select_model(model, max_latency_ms)
+
+        # Users over their daily quota are kept off the remote/limited providers
+        degraded = False
+        if user_id is not None and model != "fallback-enhanced" and usage_meter.over_quota(user_id):
+            log.info("usage.quota_degraded", user_id=user_id, model=model)
+            fallbacks.inc(provider=model, reason="quota")
+            model = "fallback-enhanced"
+            degraded = True
+        
+        owner = late_responses.owner_of(user_id, session_id)
+        late = await late_responses.take_for(owner, message) if owner and model != "fallback-enhanced" else None
+        if late is not None:
+            # The provider's answer to this same message missed its deadline last time; serve it now
+            response = late
+            outcome = "late_cache"
         else:
-            # Final fallback
-            response = await self._generate_fallback_response(context)
+            # Build context
+            with stage("context_build"):
+                context = self._build_context(message, history, user_context, documents)
+
+            # Generate response based on free model
+            started = time.perf_counter()
+            deadline_ms = HEDGE_DEADLINE_MS if deadline_ms is None else deadline_ms
+            with stage("provider_call"), provider_latency.time(provider=model):
+                call = self._call_provider(model, context, message, user_context, documents, session_id)
+                if deadline_ms and deadline_ms > 0 and model != "fallback-enhanced":
+                    response = await self._hedged(call, context, deadline_ms, model, started, owner, message, session_id)
+                else:
+                    response = await call
+
+            if "late_response_id" in response:
+                # The router hears about this call when it finishes in the background
+                outcome = "deadline"
+            else:
+                # Providers fall back internally; local-free from a remote provider means it failed over
+                outcome = "fallback" if model != "fallback-enhanced" and response["provider"] == "local-free" else "ok"
+                self.router.record(model, (time.perf_counter() - started) * 1000, outcome == "ok")
+        provider_requests.inc(provider=model, outcome=outcome)
+        if user_id is not None:
+            usage_meter.record(user_id, response.get("tokens_used", 0), degraded=degraded)
         
         # Update memory
         self.memory.append({
@@ -112,20 +283,80 @@ class AIEngine:
         
         return response
     
+    def _call_provider(self, model: str, context: str, message: str, user_context: Dict, documents: List[str], session_id: Optional[str]):
+        """Coroutine for the provider call behind `model`"""
+        if model == "ollama-local":
+            turn = prefix_key = None
+            if session_id and OLLAMA_CONTEXT_REUSE:
+                # History and the system prompt are already in the session's context; only the new turn is sent
+                turn = self._build_context(message, None, None, documents, system=False)
+                prefix_key = self._prefix_key(user_context)
+            return self._generate_ollama_response(context, session_id=session_id if turn else None, turn=turn, prefix_key=prefix_key)
+        if model == "huggingface-free":
+            return self._generate_huggingface_response(context)
+        if model == "community-free":
+            return self._generate_community_response(context)
+        # fallback-enhanced, and the final fallback for anything else
+        return self._generate_fallback_response(context)
+
+    async def _hedged(self, call, context: str, deadline_ms: float, model: str, started: float,
+                      owner: Optional[str], message: str, session_id: Optional[str]) -> Dict[str, Any]:
+        """Race the provider against the offline answer; past the deadline return the offline one.
+
+        The provider call keeps running and its answer is stored as a late
+        response (id in the result's late_response_id; None for a caller with
+        neither a user nor a session, whose answer couldn't be handed back).
+        """
+        provider = asyncio.ensure_future(call)
+        offline = asyncio.ensure_future(self._generate_fallback_response(context))
+        await asyncio.wait({provider}, timeout=deadline_ms / 1000)
+        if provider.done():
+            offline.cancel()
+            return provider.result()
+        response = await offline
+        late_id = await late_responses.pending(owner, message)
+        finishing = asyncio.create_task(self._finish_late(provider, model, started, late_id, session_id))
+        self._late_tasks.add(finishing)
+        finishing.add_done_callback(self._late_tasks.discard)
+        fallbacks.inc(provider=model, reason="deadline")
+        log.info("provider.deadline", provider=model, deadline_ms=deadline_ms, late_response_id=late_id)
+        return {**response, "late_response_id": late_id}
+
+    async def _finish_late(self, provider: asyncio.Future, model: str, started: float, late_id: Optional[str], session_id: Optional[str]):
+        """Wait out a provider call that missed its deadline and store its answer as the late response"""
+        try:
+            response = await provider
+        except Exception:
+            response = None
+        latency_ms = (time.perf_counter() - started) * 1000
+        ok = response is not None and response["provider"] != "local-free"
+        self.router.record(model, latency_ms, ok)
+        # Without a late id (owner-less caller) the answer only feeds the router
+        if late_id is not None and ok:
+            await late_responses.complete(late_id, response)
+        elif late_id is not None:
+            await late_responses.fail(late_id)
+        if session_id:
+            # The session showed the offline answer, so the provider's context no longer matches it
+            ollama_contexts.drop(session_id)
+        log.info("provider.late_response", provider=model, latency_ms=round(latency_ms, 1), ok=ok, late_response_id=late_id)
+
     def _build_context(
         self, 
         message: str, 
         history: List[Dict] = None,
         user_context: Dict = None,
-        documents: List[str] = None
+        documents: List[str] = None,
+        system: bool = True
     ) -> str:
         """Build comprehensive context for the AI"""
         
         context_parts = []
         
         # System prompt
-        system_prompt = self._get_system_prompt(user_context)
-        context_parts.append(f"System: {system_prompt}")
+        if system:
+            system_prompt = self._get_system_prompt(user_context)
+            context_parts.append(f"System: {system_prompt}")
         
         # User context
         if user_context:
@@ -133,7 +364,8 @@ class AIEngine:
         
         # Document context
         if documents:
-            doc_context = self._process_documents(documents, message)
+            with stage("retrieval"):
+                doc_context = self._process_documents(documents, message)
             if doc_context:
                 context_parts.append(f"Relevant Documents: {doc_context}")
         
@@ -147,42 +379,29 @@ class AIEngine:
         
         return "\n\n".join(context_parts)
     
-    def _get_system_prompt(self, user_context: Dict = None) -> str:
-        """Generate personalized system prompt for students"""
-        
-        base_prompt = """You are an intelligent, empathetic AI study assistant designed to help students maintain a healthy balance between academics and personal well-being. You provide thoughtful, evidence-based advice while being supportive and encouraging.
+    def _compose_system_prompt(self, style: Optional[str], level: Optional[str]) -> str:
+        parts = [BASE_SYSTEM_PROMPT]
+        if style:
+            parts.append(STYLE_PROMPTS[style])
+        if level:
+            parts.append(LEVEL_PROMPTS[level])
+        return "\n\n".join(parts)
 
-Key capabilities:
-- Study strategies and time management
-- Stress management and mental health support
-- Academic planning and goal setting
-- Work-life balance guidance
-- Code review and programming help
-- Document analysis and summarization
+    def _get_system_prompt(self, user_context: Dict = None) -> str:
+        """Personalized system prompt for students, from the precomputed table"""
+        if not user_context:
+            return self._system_prompts[(None, None)]
+        style = user_context.get("communication_style", "neutral")
+        level = user_context.get("study_level", "high_school")
+        return self._system_prompts[(
+            style if style in STYLE_PROMPTS else None,
+            level if level in LEVEL_PROMPTS else None,
+        )]
 
-Always be:
-- Empathetic and understanding
-- Evidence-based in your advice
-- Encouraging and supportive
-- Clear and actionable
-- Respectful of individual differences
-- Focused on student well-being and success"""
-        
-        if user_context:
-            style = user_context.get("communication_style", "neutral")
-            level = user_context.get("study_level", "high_school")
-            
-            if style == "formal":
-                base_prompt += "\n\nUse formal, academic language appropriate for professional communication."
-            elif style == "casual":
-                base_prompt += "\n\nUse friendly, conversational language with appropriate humor and warmth."
-            
-            if level == "university":
-                base_prompt += "\n\nProvide advanced academic guidance suitable for university-level students."
-            elif level == "high_school":
-                base_prompt += "\n\nProvide guidance appropriate for high school students, considering their developmental stage."
-        
-        return base_prompt
+    def _prefix_key(self, user_context: Dict = None) -> str:
+        """Identifies the system prompt and profile a session's Ollama context was started with"""
+        prefix = self._get_system_prompt(user_context) + json.dumps(user_context, sort_keys=True, default=str)
+        return hashlib.sha1(prefix.encode()).hexdigest()
     
     def _process_documents(self, documents: List[str], query: str) -> str:
         """Process and retrieve relevant document content"""
@@ -210,34 +429,66 @@ Always be:
         
         return "\n".join(formatted)
     
-    async def _generate_ollama_response(self, context: str) -> Dict[str, Any]:
-        """Generate response using Ollama local API"""
+    async def _generate_ollama_response(
+        self,
+        context: str,
+        session_id: Optional[str] = None,
+        turn: Optional[str] = None,
+        prefix_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Generate response using Ollama local API.
+
+        With a session_id, a follow-up turn sends only `turn` plus the context
+        Ollama returned last time, so the prompt prefix isn't prefilled again.
+        Only /ws/chat has sessions; HTTP /chat always sends the full prompt.
+        """
+        payload = {
+            "model": OLLAMA_MODEL,  # Free model
+            "prompt": context,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE
+        }
+        if session_id:
+            cached = ollama_contexts.get(session_id, prefix_key)
+            if cached is not None:
+                payload["prompt"] = turn
+                payload["context"] = cached
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    "http://localhost:11434/api/generate",
-                    json={
-                        "model": "mistral",  # Free model
-                        "prompt": context,
-                        "stream": False
-                    },
+                    f"{OLLAMA_URL}/api/generate",
+                    json=payload,
                     timeout=30.0
                 )
                 
                 if response.status_code == 200:
                     data = response.json()
+                    reuse = "true" if "context" in payload else "false"
+                    if "prompt_eval_count" in data:
+                        ollama_prompt_tokens.observe(data["prompt_eval_count"], context_reuse=reuse)
+                    if "prompt_eval_duration" in data:
+                        ollama_prefill_seconds.observe(data["prompt_eval_duration"] / 1e9, context_reuse=reuse)
+                    if session_id:
+                        ollama_contexts.put(session_id, prefix_key, data.get("context"))
                     return {
                         "content": data.get("response", ""),
-                        "model": "ollama-mistral",
+                        "model": f"ollama-{OLLAMA_MODEL}",
+                        # The whole prompt, reused or not, so usage and quotas don't depend on the transport
                         "tokens_used": len(context.split()),
                         "provider": "ollama-local"
                     }
                 else:
-                    print(f"Ollama API error: {response.status_code}")
+                    if session_id:
+                        ollama_contexts.drop(session_id)
+                    log.warning("provider.http_error", provider="ollama-local", status=response.status_code)
+                    fallbacks.inc(provider="ollama-local", reason=f"http_{response.status_code}")
                     return await self._generate_fallback_response(context)
                     
         except Exception as e:
-            print(f"Ollama error: {e}")
+            if session_id:
+                ollama_contexts.drop(session_id)
+            log.warning("provider.error", provider="ollama-local", error=str(e))
+            fallbacks.inc(provider="ollama-local", reason="error")
             return await self._generate_fallback_response(context)
     
     async def _generate_huggingface_response(self, context: str) -> Dict[str, Any]:
@@ -246,42 +497,37 @@ Always be:
             # Check if we have a token
             token = os.environ.get('HUGGINGFACE_TOKEN', '')
             if not token:
-                print("No HuggingFace token provided, falling back to local model")
+                log.info("provider.no_token", provider="huggingface-free")
+                fallbacks.inc(provider="huggingface-free", reason="no_token")
                 return await self._generate_fallback_response(context)
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium",
-                    headers={
-                        "Authorization": f"Bearer {token}"
-                    },
-                    json={"inputs": context},
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    # Extract response from HuggingFace format
-                    if isinstance(data, list) and len(data) > 0:
-                        content = data[0].get("generated_text", "")
-                        # Clean up the response
-                        if context in content:
-                            content = content.replace(context, "").strip()
-                    else:
-                        content = str(data)
-                    
-                    return {
-                        "content": content,
-                        "model": "huggingface-dialoGPT",
-                        "tokens_used": len(context.split()),
-                        "provider": "huggingface-free"
-                    }
-                else:
-                    print(f"HuggingFace API error: {response.status_code}")
-                    return await self._generate_fallback_response(context)
+            # Concurrent calls are coalesced into one list-valued request per model
+            try:
+                data = await hf_batcher.submit(HF_DIALOGPT_URL, context, token)
+            except HFBatchHTTPError as e:
+                log.warning("provider.http_error", provider="huggingface-free", status=e.status_code)
+                fallbacks.inc(provider="huggingface-free", reason=f"http_{e.status_code}")
+                return await self._generate_fallback_response(context)
+            
+            # Extract response from HuggingFace format
+            if isinstance(data, list) and len(data) > 0:
+                content = data[0].get("generated_text", "")
+                # Clean up the response
+                if context in content:
+                    content = content.replace(context, "").strip()
+            else:
+                content = str(data)
+            
+            return {
+                "content": content,
+                "model": "huggingface-dialoGPT",
+                "tokens_used": len(context.split()),
+                "provider": "huggingface-free"
+            }
                     
         except Exception as e:
-            print(f"HuggingFace error: {e}")
+            log.warning("provider.error", provider="huggingface-free", error=str(e))
+            fallbacks.inc(provider="huggingface-free", reason="error")
             return await self._generate_fallback_response(context)
     
     async def _generate_community_response(self, context: str) -> Dict[str, Any]:
@@ -290,35 +536,29 @@ Always be:
             # Check if we have a token
             token = os.environ.get('HUGGINGFACE_TOKEN', '')
             if not token:
-                print("No HuggingFace token provided, falling back to local model")
+                log.info("provider.no_token", provider="community-free")
+                fallbacks.inc(provider="community-free", reason="no_token")
                 return await self._generate_fallback_response(context)
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api-inference.huggingface.co/models/facebook/blenderbot-400M-distill",
-                    headers={
-                        "Authorization": f"Bearer {token}"
-                    },
-                    json={"inputs": context},
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    content = str(data) if isinstance(data, str) else str(data)
-                    
-                    return {
-                        "content": content,
-                        "model": "community-blenderbot",
-                        "tokens_used": len(context.split()),
-                        "provider": "community-free"
-                    }
-                else:
-                    print(f"Community API error: {response.status_code}")
-                    return await self._generate_fallback_response(context)
+            try:
+                data = await hf_batcher.submit(HF_BLENDERBOT_URL, context, token)
+            except HFBatchHTTPError as e:
+                log.warning("provider.http_error", provider="community-free", status=e.status_code)
+                fallbacks.inc(provider="community-free", reason=f"http_{e.status_code}")
+                return await self._generate_fallback_response(context)
+            
+            content = str(data) if isinstance(data, str) else str(data)
+            
+            return {
+                "content": content,
+                "model": "community-blenderbot",
+                "tokens_used": len(context.split()),
+                "provider": "community-free"
+            }
                     
         except Exception as e:
-            print(f"Community model error: {e}")
+            log.warning("provider.error", provider="community-free", error=str(e))
+            fallbacks.inc(provider="community-free", reason="error")
             return await self._generate_fallback_response(context)
     
     async def _generate_fallback_response(self, context: str) -> Dict[str, Any]:
@@ -476,7 +716,7 @@ What's on your mind? I'm here to listen and provide helpful guidance!"""
                 embedding.append(0.0)
             return embedding[:384]
         except Exception as e:
-            print(f"Embedding error: {e}")
+            log.error("embedding.error", error=str(e))
             return [0.0] * 384
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
@@ -489,7 +729,7 @@ What's on your mind? I'm here to listen and provide helpful guidance!"""
             union = words1.union(words2)
             return len(intersection) / len(union) if union else 0.0
         except Exception as e:
-            print(f"Similarity calculation error: {e}")
+            log.error("similarity.error", error=str(e))
             return 0.0
 
 # Global AI engine instance
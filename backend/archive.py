@@ -0,0 +1,264 @@
+"""Tiered archival of old chats into per-user compressed segment files.
+
+Each user gets an append-only segment file (``user_<id>.seg``) made of
+gzip members, one per archived block of NDJSON records, plus a small
+NDJSON index (``user_<id>.idx``) with the byte offset, length, row count
+and id/timestamp range of every block. Only hot rows stay in the DB.
+
+Run the job from backend/:
+    python archive.py --older-than-days 180
+"""
+import os
+import gzip
+import time
+import bisect
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set
+
+import orjson
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from models import Chat, ConversationEmbedding
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "./archive")
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "5000"))
+
+
+class ChatArchive:
+    """Append-only per-user segment files with an offset index"""
+
+    def __init__(self, directory: str = ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _segment_path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"user_{user_id}.seg")
+
+    def _index_path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"user_{user_id}.idx")
+
+    def read_index(self, user_id: int) -> List[Dict]:
+        """Index entries in append order (oldest block first)"""
+        path = self._index_path(user_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            return [orjson.loads(line) for line in f if line.strip()]
+
+    def archived_ids(self, user_id: int, kind: str, ids: List[int]) -> Set[int]:
+        """Which of `ids` are already in the archive; only blocks whose id range covers one are read"""
+        wanted = sorted(ids)
+        entries = []
+        for entry in self.read_index(user_id):
+            if entry["kind"] != kind:
+                continue
+            i = bisect.bisect_left(wanted, entry["min_id"])
+            if i < len(wanted) and wanted[i] <= entry["max_id"]:
+                entries.append(entry)
+        if not entries:
+            return set()
+        wanted_set = set(wanted)
+        found = set()
+        with open(self._segment_path(user_id), "rb") as seg:
+            for entry in entries:
+                found.update(record["id"] for record in self._read_block(seg, entry) if record["id"] in wanted_set)
+        return found
+
+    def append_block(self, user_id: int, kind: str, records: List[Dict]):
+        """Write one compressed block; the index line is only added once the block is durable"""
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        payload = gzip.compress(b"".join(orjson.dumps(r) + b"\n" for r in records))
+        with self._lock:
+            with open(self._segment_path(user_id), "ab") as seg:
+                offset = seg.tell()
+                seg.write(payload)
+                seg.flush()
+                os.fsync(seg.fileno())
+            entry = {
+                "kind": kind,
+                "offset": offset,
+                "length": len(payload),
+                "rows": len(records),
+                "min_id": records[0]["id"],
+                "max_id": records[-1]["id"],
+                "min_ts": records[0]["timestamp"],
+                "max_ts": records[-1]["timestamp"],
+            }
+            with open(self._index_path(user_id), "ab") as idx:
+                idx.write(orjson.dumps(entry) + b"\n")
+                idx.flush()
+                os.fsync(idx.fileno())
+
+    def _read_block(self, seg, entry: Dict) -> List[Dict]:
+        seg.seek(entry["offset"])
+        data = gzip.decompress(seg.read(entry["length"]))
+        return [orjson.loads(line) for line in data.splitlines() if line]
+
+    def iter_records(self, user_id: int, kind: str = "chat", newest_first: bool = False) -> Iterator[Dict]:
+        """Stream archived records one block at a time"""
+        entries = [entry for entry in self.read_index(user_id) if entry["kind"] == kind]
+        if not entries:
+            return
+        if newest_first:
+            entries.reverse()
+        with open(self._segment_path(user_id), "rb") as seg:
+            for entry in entries:
+                records = self._read_block(seg, entry)
+                if newest_first:
+                    records.reverse()
+                yield from records
+
+    def recent_chats(self, user_id: int, limit: int) -> List[Dict]:
+        """Newest archived chats, reading only as many blocks as needed"""
+        chats = []
+        for record in self.iter_records(user_id, "chat", newest_first=True):
+            chats.append(record)
+            if len(chats) >= limit:
+                break
+        return chats
+
+    def stats(self) -> Dict:
+        if not os.path.isdir(self.directory):
+            return {"users": 0, "bytes": 0}
+        segments = [name for name in os.listdir(self.directory) if name.endswith(".seg")]
+        return {
+            "users": len(segments),
+            "bytes": sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments),
+        }
+
+
+def _chat_record(chat: Chat) -> Dict:
+    return {
+        "id": chat.id,
+        "user_id": chat.user_id,
+        "message": chat.message,
+        "response": chat.response,
+        "timestamp": chat.timestamp.isoformat() if chat.timestamp else None,
+        "model_used": chat.model_used,
+        "tokens_used": chat.tokens_used,
+        "context_length": chat.context_length,
+    }
+
+
+def _embedding_record(row: ConversationEmbedding) -> Dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "conversation_text": row.conversation_text,
+        "embedding": row.embedding,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "relevance_score": row.relevance_score,
+    }
+
+
+def _archive_table(db: Session, archive: ChatArchive, model, kind: str, to_record, cutoff: datetime, batch_size: int) -> int:
+    moved = 0
+    user_ids = [row[0] for row in db.query(model.user_id).filter(model.timestamp < cutoff).distinct()]
+    for user_id in user_ids:
+        while True:
+            rows = (
+                db.query(model)
+                .filter(model.user_id == user_id, model.timestamp < cutoff)
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            # Rows already in a block were written by an interrupted run; they're only deleted. Checked by
+            # id rather than against the highest archived id: id order needn't follow timestamp order
+            # (backdated rows, per-epoch shard id ranges)
+            archived = archive.archived_ids(user_id, kind, [row.id for row in rows])
+            fresh = [to_record(row) for row in rows if row.id not in archived]
+            archive.append_block(user_id, kind, fresh)
+            db.query(model).filter(model.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+            db.commit()
+            db.expunge_all()
+            moved += len(fresh)
+    return moved
+
+
+def _table_report(db: Session) -> Dict:
+    report = {
+        "chats_rows": db.query(func.count(Chat.id)).scalar(),
+        "conversation_embeddings_rows": db.query(func.count(ConversationEmbedding.id)).scalar(),
+    }
+    # The chats' bind, which is a shard file when sharding is on
+    if db.get_bind(Chat).dialect.name == "sqlite":
+        chats_bind = {"mapper": Chat}
+        page_size = db.execute(text("PRAGMA page_size"), bind_arguments=chats_bind).scalar()
+        page_count = db.execute(text("PRAGMA page_count"), bind_arguments=chats_bind).scalar()
+        free_pages = db.execute(text("PRAGMA freelist_count"), bind_arguments=chats_bind).scalar()
+        report["db_bytes"] = page_size * page_count
+        report["db_free_bytes"] = page_size * free_pages
+    return report
+
+
+def _history_latency_ms(db: Session, repeat: int = 20) -> Optional[float]:
+    """Average latency of the /chat/history query for the user with the most hot chats"""
+    top = db.query(Chat.user_id).group_by(Chat.user_id).order_by(func.count(Chat.id).desc()).first()
+    if top is None:
+        return None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.query(Chat).filter(Chat.user_id == top[0]).order_by(Chat.timestamp.desc()).limit(50).all()
+        db.expunge_all()
+    return round((time.perf_counter() - start) / repeat * 1000, 3)
+
+
+def archive_old_chats(db: Session, cutoff: datetime, archive: Optional[ChatArchive] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> Dict:
+    """Move chats and conversation embeddings older than cutoff into segment files"""
+    archive = archive or chat_archive
+    before = _table_report(db)
+    before["history_query_ms"] = _history_latency_ms(db)
+
+    moved_chats = _archive_table(db, archive, Chat, "chat", _chat_record, cutoff, batch_size)
+    moved_embeddings = _archive_table(
+        db, archive, ConversationEmbedding, "embedding", _embedding_record, cutoff, batch_size
+    )
+
+    after = _table_report(db)
+    after["history_query_ms"] = _history_latency_ms(db)
+    return {
+        "cutoff": cutoff.isoformat(),
+        "archived_chats": moved_chats,
+        "archived_embeddings": moved_embeddings,
+        "before": before,
+        "after": after,
+        "archive": archive.stats(),
+    }
+
+
+# Global archive instance
+chat_archive = ChatArchive()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old chats into compressed segment files")
+    parser.add_argument("--older-than-days", type=int, default=180)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite database afterwards to reclaim space")
+    args = parser.parse_args()
+
+    from database import shard_sessions
+
+    cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+    # One pass per database holding chats (just the main one unless DB_SHARDS is set)
+    for db in shard_sessions():
+        try:
+            report = archive_old_chats(db, cutoff, batch_size=args.batch_size)
+            if "shard" in db.info:
+                report["shard"] = db.info["shard"]
+            if args.vacuum and db.get_bind(Chat).dialect.name == "sqlite":
+                db.commit()
+                with db.get_bind(Chat).connect() as conn:
+                    conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+                report["after"] = {**report["after"], **_table_report(db)}
+            print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
+        finally:
+            db.close()
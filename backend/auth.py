@@ -1,25 +1,32 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 from models import User
 from sqlalchemy.orm import Session
 import os
+import asyncio
+from password_hasher import build_context, password_hasher
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (sync helpers; request handlers use the async pool versions below)
+pwd_context = build_context()
 
 # JWT settings
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Comma-separated emails allowed to use admin-only diagnostics
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()}
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def get_password_hash_async(password):
+    return await password_hasher.hash(password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,6 +37,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def is_admin(email: Optional[str]) -> bool:
+    return bool(email) and email.lower() in ADMIN_EMAILS
+
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
@@ -39,4 +49,30 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     if not verify_password(password, user.password_hash):
         return False
-    return user 
\ No newline at end of file
+    return user
+
+def _find_detached(db: Session, email: str):
+    """User by email, detached, with the connection handed back to the pool"""
+    user = get_user_by_email(db, email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+def _store_hash(db: Session, user_id: int, password_hash: str):
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    # DB work runs in threads (SQLite can wait out busy_timeout); the hash runs in the process pool
+    user = await asyncio.to_thread(_find_detached, db, email)
+    if not user:
+        return False
+    result = await password_hasher.verify(password, user.password_hash)
+    if not result["valid"]:
+        return False
+    # Transparently upgrade hashes made with a different cost factor
+    if result["new_hash"]:
+        await asyncio.to_thread(_store_hash, db, user.id, result["new_hash"])
+        user.password_hash = result["new_hash"]
+    return user
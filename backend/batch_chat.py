@@ -0,0 +1,136 @@
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import orjson
+from sqlalchemy.orm import Session
+
+from models import Chat, ConversationEmbedding
+from ai_engine import ai_engine
+from metrics import stage
+from etags import resource_versions
+from structured_log import log
+
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get("CHAT_BATCH_MAX_ITEMS", "1000"))
+CHAT_BATCH_CONCURRENCY = int(os.environ.get("CHAT_BATCH_CONCURRENCY", "8"))
+# Finished items written per bulk insert
+CHAT_BATCH_INSERT_SIZE = int(os.environ.get("CHAT_BATCH_INSERT_SIZE", "100"))
+
+
+def _bulk_save(session_factory: Callable[[], Session], user_id: int, rows: List[Dict[str, Any]]):
+    """Insert a batch of exchanges and their embeddings in one transaction"""
+    objects = []
+    for row in rows:
+        ai_response = row["ai_response"]
+        objects.append(Chat(
+            user_id=user_id,
+            message=row["message"],
+            response=ai_response["content"],
+            model_used=ai_response["model"],
+            tokens_used=ai_response["tokens_used"],
+            context_length=row["context_length"],
+        ))
+        conversation_text = f"User: {row['message']}\nAssistant: {ai_response['content']}"
+        embedding = ai_engine.create_embedding(conversation_text)
+        if embedding:
+            objects.append(ConversationEmbedding(user_id=user_id, conversation_text=conversation_text, embedding=embedding))
+    db = session_factory()
+    try:
+        db.add_all(objects)
+        with stage("db_commit"):
+            db.commit()
+    finally:
+        db.close()
+    resource_versions.bump("chat_history", user_id)
+
+
+async def iter_batch_results(
+    items: List[Dict[str, Any]],
+    session_factory: Callable[[], Session],
+    user_id: Optional[int] = None,
+    user_context: Optional[Dict] = None,
+    concurrency: int = CHAT_BATCH_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """Run items through the engine with at most `concurrency` in flight; yield NDJSON lines as each finishes.
+
+    Each item is {"message", "id"?, "history"?, "model"?}. Failures become per-item
+    error lines; a summary line closes the stream.
+    """
+    started = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                ai_response = await ai_engine.generate_response(
+                    message=item["message"],
+                    history=item.get("history"),
+                    model=item.get("model"),
+                    user_context=user_context,
+                    user_id=user_id,
+                )
+                await results.put((index, item, ai_response, None))
+            except Exception as e:
+                log.warning("chat.batch_item_error", index=index, error=str(e))
+                await results.put((index, item, None, str(e)))
+
+    # A fixed pool of workers pulling from a queue keeps only `concurrency` coroutines alive for any batch size
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    pending_rows: List[Dict[str, Any]] = []
+    succeeded = failed = 0
+    persist_failed = 0
+
+    async def flush():
+        nonlocal persist_failed
+        rows = pending_rows[:]
+        pending_rows.clear()
+        try:
+            await asyncio.to_thread(_bulk_save, session_factory, user_id, rows)
+        except Exception as e:
+            persist_failed += len(rows)
+            log.exception("chat.batch_persist_error", rows=len(rows), error=str(e))
+
+    try:
+        for _ in range(len(items)):
+            index, item, ai_response, error = await results.get()
+            line = {"type": "result", "index": index, "id": item.get("id")}
+            if error is None:
+                succeeded += 1
+                line.update(
+                    response=ai_response["content"],
+                    model=ai_response["model"],
+                    provider=ai_response["provider"],
+                    tokens_used=ai_response["tokens_used"],
+                )
+                if user_id is not None:
+                    history = item.get("history")
+                    pending_rows.append({"message": item["message"], "ai_response": ai_response, "context_length": len(history) if history else 0})
+                    if len(pending_rows) >= CHAT_BATCH_INSERT_SIZE:
+                        await flush()
+            else:
+                failed += 1
+                line.update(type="error", error=error)
+            yield orjson.dumps(line) + b"\n"
+        if pending_rows:
+            await flush()
+        yield orjson.dumps({
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "persist_failed": persist_failed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }) + b"\n"
+    finally:
+        # Client went away (or we finished): stop any work still queued
+        for task in workers:
+            task.cancel()
+        log.info("chat.batch", total=len(items), succeeded=succeeded, failed=failed, concurrency=len(workers))
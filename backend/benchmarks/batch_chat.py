@@ -0,0 +1,50 @@
+"""Sequential POST /chat calls vs one POST /chat/batch, against the Ollama stub.
+
+Usage (from backend/):
+    python benchmarks/batch_chat.py --items 200 --concurrency 8
+"""
+import sys
+import time
+import json
+import argparse
+
+import httpx
+
+from load import Servers, add_arguments
+
+
+def main(args):
+    with Servers(args) as servers:
+        with httpx.Client(base_url=servers.base_url, timeout=300.0) as client:
+            token = client.post("/register", json={"email": "batch@example.com", "password": "batch-password"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            messages = [f"Give a study tip for student {i}" for i in range(args.items)]
+
+            start = time.perf_counter()
+            for message in messages:
+                client.post("/chat", json={"message": message, "model": args.model}, headers=headers).raise_for_status()
+            sequential = time.perf_counter() - start
+
+            start = time.perf_counter()
+            first_line = None
+            lines = []
+            body = {"items": [{"message": m, "id": i} for i, m in enumerate(messages)], "model": args.model, "concurrency": args.concurrency}
+            with client.stream("POST", "/chat/batch", json=body, headers=headers) as response:
+                for line in response.iter_lines():
+                    if first_line is None:
+                        first_line = time.perf_counter() - start
+                    lines.append(json.loads(line))
+            batch = time.perf_counter() - start
+
+    summary = lines[-1]
+    print(f"sequential /chat: {args.items} items in {sequential:.2f} s ({args.items / sequential:.1f} items/s)")
+    print(f"/chat/batch:      {args.items} items in {batch:.2f} s ({args.items / batch:.1f} items/s), "
+          f"first result after {first_line * 1000:.0f} ms, summary {summary}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--items", type=int, default=200)
+    parser.set_defaults(concurrency=8)
+    sys.exit(main(parser.parse_args()))
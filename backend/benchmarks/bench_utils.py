@@ -0,0 +1,56 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import json
+import statistics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(section, results, path=BASELINE_PATH):
+    """Replace one section (e.g. "micro" or "load") of the saved baseline"""
+    baseline = load_baseline(path)
+    baseline[section] = results
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(name, current, baseline, tolerance, higher_is_better=False):
+    """Return a printable verdict line; a change beyond tolerance in the bad direction is a regression"""
+    if baseline in (None, 0):
+        return f"  {name}: {current} (no baseline)", False
+    change = (current - baseline) / baseline
+    regressed = change < -tolerance if higher_is_better else change > tolerance
+    verdict = "REGRESSION" if regressed else "ok"
+    return f"  {name}: {current} vs {baseline} ({change:+.1%}) {verdict}", regressed
@@ -0,0 +1,77 @@
+"""Peak memory of the NDJSON export as the row count grows.
+
+Fills a scratch SQLite database with N chat rows for one user, drains the
+export stream (plain and gzip) and reports the tracemalloc peak. The peak
+should stay flat from 10k to 1M rows because rows are read through
+yield_per and written out in fixed-size chunks.
+
+Usage (from backend/):
+    python benchmarks/export_memory.py --rows 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User, Chat
+from export import iter_export_chunks
+
+
+def build_database(path, rows):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "export@example.com", "password_hash": "x"}])
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "user_id": 1,
+                "message": f"how should I plan revision for exam {i}?",
+                "response": "Break the material into focused blocks and review actively. " * 4,
+                "timestamp": now,
+                "model_used": "fallback-enhanced",
+                "tokens_used": 48,
+                "context_length": 4,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Chat), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Chat), batch)
+    return sessionmaker(bind=engine)
+
+
+def measure(session_factory, compress):
+    tracemalloc.start()
+    start = time.perf_counter()
+    total = 0
+    for chunk in iter_export_chunks(session_factory, 1, "export@example.com", compress=compress):
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total, peak, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="export-memory-") as tmp:
+        for rows in args.rows:
+            session_factory = build_database(os.path.join(tmp, f"export-{rows}.db"), rows)
+            for compress in (False, True):
+                total, peak, elapsed = measure(session_factory, compress)
+                print(f"rows={rows:8d} gzip={str(compress):5s} output={total / 1e6:8.1f} MB "
+                      f"peak={peak / 1e6:6.2f} MB time={elapsed:6.1f}s")
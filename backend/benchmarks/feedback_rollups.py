@@ -0,0 +1,91 @@
+"""Feedback analytics: full-scan join vs the incrementally maintained rollups.
+
+Fills a scratch SQLite database with chats and feedback, backfills the
+rollups once, then times "worst-rated model over the last 7 days" both as a
+feedback-to-chats join and through FeedbackRollups.summary, plus the cost of
+the per-insert fold.
+
+Usage (from backend/):
+    python benchmarks/feedback_rollups.py --feedback 10000 100000 1000000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from bench_utils import BACKEND_DIR, summarize  # noqa: F401 (puts backend/ on sys.path)
+
+MODELS = ["ollama-llama2", "huggingface-free", "local-free", "fallback-enhanced"]
+MESSAGES = ["help me study for my exam", "I feel stressed", "plan my week", "I'm tired", "hello"]
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="feedback-bench-")
+    os.environ["LOG_FILE"] = os.devnull
+    from sqlalchemy import create_engine, func, insert, select
+    from sqlalchemy.orm import sessionmaker
+    from models import Base, Chat, Feedback
+    from feedback_rollups import FeedbackRollups
+
+    for total in args.feedback:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, f'{total}.db')}")
+        Base.metadata.create_all(engine)
+        now = datetime.utcnow()
+        chats = max(1, total // 2)
+        with engine.begin() as conn:
+            for start in range(0, chats, 50000):
+                conn.execute(insert(Chat), [
+                    {"user_id": 1, "message": random.choice(MESSAGES), "response": "", "model_used": random.choice(MODELS),
+                     "timestamp": now - timedelta(days=random.uniform(0, args.days))}
+                    for _ in range(start, min(chats, start + 50000))
+                ])
+            for start in range(0, total, 50000):
+                conn.execute(insert(Feedback), [
+                    {"chat_id": random.randint(1, chats), "message": "", "rating": random.choice([1, 1, -1]),
+                     "timestamp": now - timedelta(days=random.uniform(0, args.days))}
+                    for _ in range(start, min(total, start + 50000))
+                ])
+        session_factory = sessionmaker(bind=engine)
+        rollups = FeedbackRollups()
+        rollups._session_factory = session_factory
+        started = time.perf_counter()
+        rollups._catch_up()
+        backfill_s = time.perf_counter() - started
+
+        since = now - timedelta(days=7)
+        scan, rolled, fold = [], [], []
+        db = session_factory()
+        try:
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                db.execute(
+                    select(Chat.model_used, func.count(), func.sum(Feedback.rating))
+                    .join(Chat, Feedback.chat_id == Chat.id)
+                    .where(Feedback.timestamp >= since)
+                    .group_by(Chat.model_used)
+                ).all()
+                scan.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                rollups.summary(db, 7, "model")
+                rolled.append(time.perf_counter() - started)
+                db.add(Feedback(chat_id=random.randint(1, chats), message="", rating=1))
+                db.commit()
+                started = time.perf_counter()
+                rollups.fold(db)
+                fold.append(time.perf_counter() - started)
+        finally:
+            db.close()
+            engine.dispose()
+        print(f"{total:>9d} feedback rows (backfill {backfill_s:.1f}s): "
+              f"join {summarize(scan)['p50_ms']:8.2f} ms, rollups {summarize(rolled)['p50_ms']:6.2f} ms, "
+              f"fold after insert {summarize(fold)['p50_ms']:5.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feedback", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--days", type=float, default=90.0, help="timestamps are spread over this many days")
+    parser.add_argument("--repeats", type=int, default=20)
+    main(parser.parse_args())
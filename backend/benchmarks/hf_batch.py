@@ -0,0 +1,87 @@
+"""HuggingFace micro-batching: throughput and 429 fallbacks with and without batching.
+
+Starts the stub's HuggingFace route with a request rate limit, then drives
+generate_response(model="huggingface-free") from concurrent clients for each
+max-batch setting (1 = batching off) and reports answered/s, how many calls
+fell back to the offline model, and the requests the stub actually saw.
+
+Usage (from backend/):
+    python benchmarks/hf_batch.py --clients 32 --duration 5 --rate-limit 5 --batch-sizes 1 8 16
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+from bench_utils import BACKEND_DIR, summarize
+from load import free_port, wait_until_up
+
+
+async def drive(engine, clients, duration):
+    latencies, providers = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def client(i):
+        n = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await engine.generate_response(f"Student {i} asks question {n} about exam prep", model="huggingface-free")
+            latencies.append(time.perf_counter() - start)
+            providers[response["provider"]] = providers.get(response["provider"], 0) + 1
+            n += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(i) for i in range(clients)])
+    return latencies, providers, time.perf_counter() - started
+
+
+def main(args):
+    port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "ollama_stub.py"), "--port", str(port),
+        "--hf-base-ms", str(args.hf_base_ms), "--hf-rate-limit", str(args.rate_limit),
+    ], cwd=BACKEND_DIR)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(base + "/api/tags")
+        os.environ["HUGGINGFACE_API_BASE"] = base + "/models"
+        os.environ.setdefault("HUGGINGFACE_TOKEN", "bench-token")
+        os.environ.setdefault("LOG_FILE", os.devnull)
+        import ai_engine as engine_module
+        from hf_batcher import hf_batcher, MicroBatcher
+
+        for max_batch in args.batch_sizes:
+            before = httpx.get(base + "/stats").json()
+            batcher = MicroBatcher(engine_module.HF_DIALOGPT_URL, max_batch=max_batch, max_wait_ms=args.max_wait_ms)
+            hf_batcher._batchers[engine_module.HF_DIALOGPT_URL] = batcher
+
+            async def run():
+                try:
+                    return await drive(engine_module.ai_engine, args.clients, args.duration)
+                finally:
+                    await batcher.close()
+
+            latencies, providers, elapsed = asyncio.run(run())
+            after = httpx.get(base + "/stats").json()
+            answered = providers.get("huggingface-free", 0)
+            print(f"max_batch={max_batch:<3d} answered {answered / elapsed:6.1f}/s, fell back {providers.get('local-free', 0):5d}, "
+                  f"stub requests {after['hf_requests'] - before['hf_requests']}, 429s {after['hf_rate_limited'] - before['hf_rate_limited']}, "
+                  f"avg batch {batcher.stats()['avg_batch_size']}, latency {summarize(latencies)}")
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rate-limit", type=float, default=5.0, help="stub requests/s before 429")
+    parser.add_argument("--hf-base-ms", type=float, default=200.0)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16])
+    main(parser.parse_args())
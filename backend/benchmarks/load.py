@@ -0,0 +1,227 @@
+"""End-to-end load generator for /chat, /login and /chat/history.
+
+By default it starts benchmarks/ollama_stub.py and the app (uvicorn
+main:app) as subprocesses on a scratch SQLite database, points the app's
+OLLAMA_URL at the stub, and then drives each scenario with a fixed number
+of concurrent clients for a fixed duration. It reports throughput, error
+counts and p50/p95/p99 latency, and compares them with the "load" section
+of benchmarks/baseline.json.
+
+Usage (from backend/):
+    python benchmarks/load.py --duration 10 --concurrency 16
+    python benchmarks/load.py --base-url http://127.0.0.1:8000   # existing server
+    python benchmarks/load.py --stub-base-ms 200 --stub-error-rate 0.05 --save-baseline
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from bench_utils import BACKEND_DIR, summarize, load_baseline, save_baseline, compare
+
+SCENARIOS = ("chat", "login", "history")
+PASSWORD = "load-test-password"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Servers:
+    """Stub + app subprocesses for a self-contained run"""
+
+    def __init__(self, args, extra_env=None, workers=1):
+        self.args = args
+        self.extra_env = extra_env or {}
+        self.workers = workers
+        self.processes = []
+        self.tmp = tempfile.TemporaryDirectory(prefix="load-bench-")
+
+    def __enter__(self):
+        stub_port, app_port = free_port(), free_port()
+        stub_cmd = [
+            sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "ollama_stub.py"),
+            "--port", str(stub_port),
+            "--base-ms", str(self.args.stub_base_ms),
+            "--prefill-us-per-token", str(self.args.stub_prefill_us),
+            "--error-rate", str(self.args.stub_error_rate),
+            "--seed", "1",
+        ]
+        self.processes.append(subprocess.Popen(stub_cmd, cwd=BACKEND_DIR))
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{self.tmp.name}/load.db",
+            "ARCHIVE_DIR": f"{self.tmp.name}/archive",
+            "OLLAMA_URL": f"http://127.0.0.1:{stub_port}",
+            "BCRYPT_ROUNDS": str(self.args.bcrypt_rounds),
+            "LOG_FILE": f"{self.tmp.name}/app.log",
+            "WEB_CONCURRENCY": str(self.workers),
+            "SHARED_CACHE_PATH": f"{self.tmp.name}/shared_cache.db",
+            **self.extra_env,
+        }
+        app_cmd = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(app_port),
+            "--workers", str(self.workers), "--log-level", "warning", "--no-access-log",
+        ]
+        self.processes.append(subprocess.Popen(app_cmd, cwd=BACKEND_DIR, env=env))
+        wait_until_up(f"http://127.0.0.1:{stub_port}/api/tags")
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        wait_until_up(self.base_url + "/livez")
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout: float = 60.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if httpx.get(self.base_url + "/readyz", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("app did not become ready")
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.tmp.cleanup()
+
+
+async def setup_users(client, count):
+    """Register load-test users and return their bearer headers"""
+    headers = []
+    for i in range(count):
+        email = f"load-{i}@example.com"
+        response = await client.post("/register", json={"email": email, "password": PASSWORD})
+        if response.status_code != 200:
+            response = await client.post("/login", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+def scenario_request(name, worker, i, users, model):
+    user = users[worker % len(users)]
+    if name == "chat":
+        body = {"message": f"How should I plan my study week for exam {i}?", "model": model}
+        return "POST", "/chat", body, user
+    if name == "login":
+        return "POST", "/login", {"email": f"load-{worker % len(users)}@example.com", "password": PASSWORD}, {}
+    return "GET", "/chat/history", None, user
+
+
+async def run_scenario(client, name, users, concurrency, duration, model):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        i = 0
+        while time.perf_counter() < deadline:
+            method, path, body, headers = scenario_request(name, index, i, users, model)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "rps": round(len(latencies) / elapsed, 1),
+        **summarize(latencies),
+    }
+
+
+async def drive(base_url, scenarios, concurrency, duration, users_count, model):
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        users = await setup_users(client, users_count)
+        results = {}
+        for name in scenarios:
+            results[name] = await run_scenario(client, name, users, concurrency, duration, model)
+            print(f"{name:8s} {results[name]}")
+        return results
+
+
+def report(results, tolerance):
+    baseline = load_baseline().get("load", {})
+    regressions = 0
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        for metric, higher_is_better in (("rps", True), ("p95_ms", False), ("p99_ms", False)):
+            line, regressed = compare(f"{name:8s} {metric}", result.get(metric), base.get(metric), tolerance, higher_is_better)
+            regressions += regressed
+            print(line)
+    return regressions
+
+
+def add_arguments(parser):
+    parser.add_argument("--base-url", help="target an already running server instead of spawning one")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--model", default="ollama-local")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--stub-base-ms", type=float, default=50.0)
+    parser.add_argument("--stub-prefill-us", type=float, default=200.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+
+
+def main(args):
+    def go(base_url):
+        return asyncio.run(drive(base_url, args.scenarios, args.concurrency, args.duration, args.users, args.model))
+
+    if args.base_url:
+        results = go(args.base_url)
+    else:
+        with Servers(args) as servers:
+            results = go(servers.base_url)
+    regressions = report(results, args.tolerance)
+    if args.save_baseline:
+        save_baseline("load", results)
+        print("saved load baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    sys.exit(1 if main(args) and not args.save_baseline else 0)
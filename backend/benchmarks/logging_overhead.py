@@ -0,0 +1,68 @@
+"""Per-call cost of print() versus the queued structured logger.
+
+Both write to a real file, the way start.sh redirects uvicorn's stdout.
+print() is measured block-buffered and flushed per line (what happens
+with PYTHONUNBUFFERED=1 or a tty). The structured logger is measured on
+the calling thread only (writer paused) and end to end including the
+background serialization, which still shares the GIL.
+
+Usage (from backend/):
+    python benchmarks/logging_overhead.py --calls 100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from structured_log import StructuredLogger
+
+
+def bench_print(path, calls, flush):
+    with open(path, "w") as f, contextlib.redirect_stdout(f):
+        start = time.perf_counter()
+        for i in range(calls):
+            print(f"Chat request received: model=None, message_length={i}", flush=flush)
+            print(f"AI response generated: model=fallback-enhanced, provider=local-free", flush=flush)
+        return time.perf_counter() - start
+
+
+def bench_structured(path, calls, sample_rates, caller_only):
+    with open(path, "wb") as f:
+        # A huge flush interval keeps the writer idle so only the caller's cost is timed
+        interval = 3600 if caller_only else 0.05
+        logger = StructuredLogger(stream=f, queue_size=calls * 2 + 1, sample_rates=sample_rates, flush_interval=interval)
+        start = time.perf_counter()
+        for i in range(calls):
+            logger.info("chat.request", model=None, message_length=i)
+            logger.info("chat.response", model="fallback-enhanced", provider="local-free")
+        if not caller_only:
+            logger.flush(timeout=60)
+        elapsed = time.perf_counter() - start
+        logger.close()
+        return elapsed, logger.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="log-bench-") as tmp:
+        calls = args.calls
+        sampled = {"chat.request": 0.1, "chat.response": 0.1}
+        per_call = lambda total: total / (calls * 2) * 1e6
+        rows = [
+            ("print() block-buffered", bench_print(os.path.join(tmp, "p1.log"), calls, False), None),
+            ("print() flushed per line", bench_print(os.path.join(tmp, "p2.log"), calls, True), None),
+        ]
+        for label, rates in (("unsampled", {}), ("10% sampled", sampled)):
+            for caller_only in (True, False):
+                elapsed, stats = bench_structured(os.path.join(tmp, "s.log"), calls, rates, caller_only)
+                scope = "caller" if caller_only else "end-to-end"
+                rows.append((f"structured {label} {scope}", elapsed, stats))
+        for label, elapsed, stats in rows:
+            print(f"{label:38s} {per_call(elapsed):6.2f} us/call" + (f"  {stats}" if stats else ""))
@@ -0,0 +1,77 @@
+"""Chat latency during a login storm.
+
+Measures /chat and /chat/history latency on their own and again while a
+burst of concurrent /login calls is in flight. With password hashing in
+the dedicated process pool the two runs should stay close.
+
+Usage (from backend/):
+    python benchmarks/login_storm.py --logins 200 --probes 50
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from bench_utils import summarize
+
+
+async def probe(client, headers, count):
+    """Alternate /chat and /chat/history calls and record their latencies"""
+    chat, history = [], []
+    for i in range(count):
+        start = time.perf_counter()
+        await client.post("/chat", json={"message": f"help me study {i}"}, headers=headers)
+        chat.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await client.get("/chat/history", headers=headers)
+        history.append(time.perf_counter() - start)
+    return chat, history
+
+
+async def storm(client, logins, password):
+    results = await asyncio.gather(
+        *[client.post("/login", json={"email": "storm@example.com", "password": password}) for _ in range(logins)]
+    )
+    return [r.status_code for r in results]
+
+
+async def run(logins, probes):
+    import httpx
+    import main
+
+    # ASGITransport does not run the lifespan, so create the schema here
+    main.init_db()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        password = "storm-password"
+        await client.post("/register", json={"email": "storm@example.com", "password": password})
+        token = (await client.post("/login", json={"email": "storm@example.com", "password": password})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        quiet_chat, quiet_history = await probe(client, headers, probes)
+
+        storm_task = asyncio.create_task(storm(client, logins, password))
+        await asyncio.sleep(0)
+        busy_chat, busy_history = await probe(client, headers, probes)
+        codes = await storm_task
+
+    main.password_hasher.shutdown()
+    print(f"login storm: {logins} logins, status counts: "
+          f"{ {code: codes.count(code) for code in set(codes)} }")
+    print(f"hasher: {main.password_hasher.stats()}")
+    print(f"/chat         quiet {summarize(quiet_chat)}")
+    print(f"/chat         storm {summarize(busy_chat)}")
+    print(f"/chat/history quiet {summarize(quiet_history)}")
+    print(f"/chat/history storm {summarize(busy_history)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=50)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="login-storm-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{db_dir}/bench.db")
+    asyncio.run(run(args.logins, args.probes))
@@ -0,0 +1,87 @@
+"""Micro-benchmarks for the chat hot path.
+
+Covers the routing helpers in main.py (detect_user_character,
+select_conversation_module, is_requesting_tips, is_quick_tip_request,
+generate_ai_response) and the engine's _build_context, _process_documents
+and create_embedding. Results are compared with the "micro" section of
+benchmarks/baseline.json.
+
+Usage (from backend/):
+    python benchmarks/micro.py                 # run and compare
+    python benchmarks/micro.py --save-baseline # run and record as the new baseline
+"""
+import os
+import sys
+import timeit
+import argparse
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from bench_utils import load_baseline, save_baseline, compare
+
+HISTORY = [
+    {"sender": "user" if i % 2 == 0 else "assistant", "text": f"I have an exam on chapter {i} and I'm stressed about time"}
+    for i in range(20)
+]
+DOCUMENTS = [("Lecture notes on thermodynamics and entropy. " * 40) for _ in range(10)] + [
+    ("Exam schedule and study plan for the semester. " * 40)
+]
+USER_CONTEXT = {"communication_style": "casual", "study_level": "university", "preferences": {"theme": "dark"}}
+MESSAGE = "Can you help me plan my study schedule for the exam next week?"
+
+
+def cases():
+    import main
+    from ai_engine import ai_engine
+
+    character = main.detect_user_character(HISTORY)
+    conversation = "User: " + MESSAGE + "\nAssistant: " + ("Try spaced repetition. " * 30)
+    return {
+        "detect_user_character": lambda: main.detect_user_character(HISTORY),
+        "select_conversation_module": lambda: main.select_conversation_module(MESSAGE, character),
+        "is_requesting_tips": lambda: main.is_requesting_tips(MESSAGE),
+        "is_quick_tip_request": lambda: main.is_quick_tip_request(MESSAGE),
+        "generate_ai_response": lambda: main.generate_ai_response(MESSAGE, HISTORY[-1]["text"], HISTORY),
+        "build_context": lambda: ai_engine._build_context(MESSAGE, HISTORY, USER_CONTEXT, DOCUMENTS),
+        "process_documents": lambda: ai_engine._process_documents(DOCUMENTS, MESSAGE),
+        "create_embedding": lambda: ai_engine.create_embedding(conversation),
+    }
+
+
+def run(repeat=5, min_time=0.2):
+    """Best-of-repeat mean time per call in microseconds"""
+    results = {}
+    for name, fn in cases().items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        number = max(number, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = {"mean_us": round(best * 1e6, 3), "ops_per_sec": round(1 / best)}
+    return results
+
+
+def report(results, tolerance):
+    baseline = load_baseline().get("micro", {})
+    regressions = 0
+    for name, result in results.items():
+        line, regressed = compare(
+            f"{name:28s} mean_us", result["mean_us"], baseline.get(name, {}).get("mean_us"), tolerance
+        )
+        regressions += regressed
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat)
+    regressions = report(results, args.tolerance)
+    if args.save_baseline:
+        save_baseline("micro", results)
+        print("saved micro baseline")
+    sys.exit(1 if regressions and not args.save_baseline else 0)
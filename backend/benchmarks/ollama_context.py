@@ -0,0 +1,106 @@
+"""Ollama context reuse: prefill tokens and time to first token over multi-turn sessions.
+
+Starts the stub (which prefills only tokens not already in a passed-in
+context) and plays the same multi-turn sessions through
+generate_response(model="ollama-local", session_id=...) with context reuse
+off and on. Reports prompt tokens the stub had to prefill, its reported
+prefill time, and end-to-end latency per turn; with stream=false the time to
+first token is the latency minus the stub's fixed decode time.
+
+Usage (from backend/):
+    python benchmarks/ollama_context.py --sessions 8 --turns 10 --prefill-us-per-token 500
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+from bench_utils import BACKEND_DIR, summarize
+from load import free_port, wait_until_up
+
+MESSAGES = [
+    "Can you help me plan a study session for my chemistry exam next week?",
+    "I keep getting distracted after twenty minutes, what should I change?",
+    "How long should my breaks be between the blocks?",
+    "What if I have a lab report due the same week?",
+]
+USER_CONTEXT = {"communication_style": "casual", "study_level": "university", "preferences": {}}
+
+
+async def play(engine, sessions, turns, tag):
+    latencies = {"first": [], "later": []}
+
+    async def session(i):
+        history = []
+        for turn in range(turns):
+            message = MESSAGES[turn % len(MESSAGES)]
+            history.append({"sender": "user", "text": message})
+            start = time.perf_counter()
+            response = await engine.generate_response(
+                message=message, history=list(history[-10:]), model="ollama-local",
+                user_context=USER_CONTEXT, session_id=f"{tag}-{i}",
+            )
+            latencies["first" if turn == 0 else "later"].append(time.perf_counter() - start)
+            history.append({"sender": "assistant", "text": response["content"]})
+
+    await asyncio.gather(*[session(i) for i in range(sessions)])
+    return latencies
+
+
+def prefill_seconds(reuse):
+    from metrics import ollama_prefill_seconds
+    return sum(series[1] for key, series in ollama_prefill_seconds._series.items() if key == (reuse,))
+
+
+def main(args):
+    port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "ollama_stub.py"), "--port", str(port),
+        "--base-ms", str(args.base_ms), "--prefill-us-per-token", str(args.prefill_us_per_token),
+        "--decode-ms-per-token", str(args.decode_ms_per_token), "--response-tokens", str(args.response_tokens),
+    ], cwd=BACKEND_DIR)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(base + "/api/tags")
+        os.environ["OLLAMA_URL"] = base
+        os.environ.setdefault("LOG_FILE", os.devnull)
+        import ai_engine as engine_module
+        engine = engine_module.ai_engine
+        engine.refresh_ollama_status()
+        decode_ms = args.response_tokens * args.decode_ms_per_token
+
+        for reuse in (False, True):
+            engine_module.OLLAMA_CONTEXT_REUSE = reuse
+            before = httpx.get(base + "/stats").json()
+            prefill_before = prefill_seconds("true") + prefill_seconds("false")
+            started = time.perf_counter()
+            latencies = asyncio.run(play(engine, args.sessions, args.turns, "reuse" if reuse else "full"))
+            elapsed = time.perf_counter() - started
+            after = httpx.get(base + "/stats").json()
+            calls = after["requests"] - before["requests"]
+            prompt_tokens = after["prompt_tokens"] - before["prompt_tokens"]
+            prefill_ms = (prefill_seconds("true") + prefill_seconds("false") - prefill_before) * 1000
+            later = summarize(latencies["later"])
+            print(f"context reuse {'on ' if reuse else 'off'}: {calls} calls in {elapsed:.1f}s, "
+                  f"prefilled {prompt_tokens / calls:6.1f} tokens/call, prefill {prefill_ms / calls:6.1f} ms/call, "
+                  f"first turn p50 {summarize(latencies['first'])['p50_ms']:.1f} ms, "
+                  f"later turns p50 {later['p50_ms']:.1f} ms (ttft ~{later['p50_ms'] - decode_ms:.1f} ms)")
+        print(engine_module.ollama_contexts.stats())
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--base-ms", type=float, default=20.0)
+    parser.add_argument("--prefill-us-per-token", type=float, default=500.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=1.0)
+    parser.add_argument("--response-tokens", type=int, default=30)
+    main(parser.parse_args())
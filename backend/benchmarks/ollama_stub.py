@@ -0,0 +1,163 @@
+"""Local stand-in for Ollama's /api/generate and /api/tags (and HuggingFace inference).
+
+Latency is modelled as a fixed base plus a prefill cost per prompt token
+plus a decode cost per generated token, with optional jitter and a
+configurable error rate. Responses carry the same fields Ollama returns
+(response, context, prompt_eval_count, prompt_eval_duration, ...), so the
+engine can be exercised end to end without a GPU.
+
+POST /models/{owner}/{name} mimics the HuggingFace inference API: "inputs"
+may be a string or a list, a list costs one base latency plus a small
+per-input cost, and --hf-rate-limit turns requests beyond N per second into
+429s, like a rate-limited free token.
+
+Usage (from backend/):
+    python benchmarks/ollama_stub.py --port 11500 --base-ms 50 --prefill-us-per-token 200
+    OLLAMA_URL=http://127.0.0.1:11500 uvicorn main:app
+"""
+import time
+import random
+import asyncio
+import argparse
+from typing import List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class StubConfig:
+    def __init__(self, base_ms=50.0, prefill_us_per_token=200.0, decode_ms_per_token=2.0,
+                 response_tokens=60, jitter=0.1, error_rate=0.0, error_status=500, seed=None,
+                 hf_base_ms=200.0, hf_per_input_ms=5.0, hf_rate_limit=0.0):
+        self.base_ms = base_ms
+        self.prefill_us_per_token = prefill_us_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.response_tokens = response_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.hf_base_ms = hf_base_ms
+        self.hf_per_input_ms = hf_per_input_ms
+        self.hf_rate_limit = hf_rate_limit
+
+
+def _tokens(text: str) -> List[int]:
+    # Cheap deterministic "tokenizer": one token per whitespace-separated word
+    return [hash(word) & 0xFFFF for word in text.split()]
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI()
+    stats = {"requests": 0, "errors": 0, "prompt_tokens": 0, "reused_context_tokens": 0,
+             "hf_requests": 0, "hf_inputs": 0, "hf_rate_limited": 0}
+    hf_window = []
+
+    @app.get("/api/tags")
+    def tags():
+        return {"models": [{"name": "mistral:latest"}]}
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if config.error_rate and config.random.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "stub failure"}, status_code=config.error_status)
+
+        system = body.get("system") or ""
+        prompt = body.get("prompt") or ""
+        context: Optional[List[int]] = body.get("context")
+        # Tokens already in a returned context are cached by the model, so only new ones are prefilled
+        new_tokens = _tokens(system if not context else "") + _tokens(prompt)
+        stats["prompt_tokens"] += len(new_tokens)
+        stats["reused_context_tokens"] += len(context or [])
+
+        prefill = len(new_tokens) * config.prefill_us_per_token / 1e6
+        decode = config.response_tokens * config.decode_ms_per_token / 1000
+        total = config.base_ms / 1000 + prefill + decode
+        total *= 1 + config.random.uniform(-config.jitter, config.jitter)
+        await asyncio.sleep(max(0.0, total))
+
+        answer = " ".join(["Here", "is", "a", "focused", "study", "tip."] * (config.response_tokens // 6 or 1))
+        response_tokens = _tokens(answer)
+        return {
+            "model": body.get("model", "mistral"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": answer,
+            "done": True,
+            "context": (context or []) + new_tokens + response_tokens,
+            "total_duration": int(total * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(new_tokens),
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": len(response_tokens),
+            "eval_duration": int(decode * 1e9),
+        }
+
+    @app.post("/models/{owner}/{name}")
+    async def hf_inference(owner: str, name: str, request: Request):
+        body = await request.json()
+        now = time.monotonic()
+        if config.hf_rate_limit:
+            # Sliding one-second window of accepted requests
+            while hf_window and now - hf_window[0] > 1.0:
+                hf_window.pop(0)
+            if len(hf_window) >= config.hf_rate_limit:
+                stats["hf_rate_limited"] += 1
+                return JSONResponse({"error": "Rate limit reached"}, status_code=429)
+            hf_window.append(now)
+        inputs = body.get("inputs")
+        batch = inputs if isinstance(inputs, list) else [inputs]
+        stats["hf_requests"] += 1
+        stats["hf_inputs"] += len(batch)
+        await asyncio.sleep((config.hf_base_ms + config.hf_per_input_ms * len(batch)) / 1000)
+        outputs = [{"generated_text": f"{text} Try a 25 minute focus block."} for text in batch]
+        return outputs
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--base-ms", type=float, default=50.0)
+    parser.add_argument("--prefill-us-per-token", type=float, default=200.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=2.0)
+    parser.add_argument("--response-tokens", type=int, default=60)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--hf-base-ms", type=float, default=200.0)
+    parser.add_argument("--hf-per-input-ms", type=float, default=5.0)
+    parser.add_argument("--hf-rate-limit", type=float, default=0.0, help="requests/s before 429 (0 = unlimited)")
+    return parser.parse_args(argv)
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(
+        base_ms=args.base_ms,
+        prefill_us_per_token=args.prefill_us_per_token,
+        decode_ms_per_token=args.decode_ms_per_token,
+        response_tokens=args.response_tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        hf_base_ms=args.hf_base_ms,
+        hf_per_input_ms=args.hf_per_input_ms,
+        hf_rate_limit=args.hf_rate_limit,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
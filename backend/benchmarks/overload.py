@@ -0,0 +1,108 @@
+"""Admission control under overload: authenticated /chat latency while low-priority traffic floods the app.
+
+Starts the stub and the app twice, once with admission control effectively
+off (limits set out of reach) and once with the configured limits. In each
+run a flood of anonymous /chat, /chat/history and /models clients keeps the
+single process saturated while a few authenticated clients measure /chat
+latency. Flood clients honour Retry-After unless --ignore-retry-after is
+passed. Reports the authenticated p50/p95/p99, flood throughput, how many
+flood requests were shed with 503 and how fast those 503s came back.
+
+Usage (from backend/):
+    python benchmarks/overload.py --duration 10 --flood 64 --probes 4
+"""
+import sys
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from bench_utils import summarize
+from load import Servers, add_arguments, setup_users
+
+OFF = {"ADMISSION_LOW_LAG_MS": "1e9", "ADMISSION_LOW_IN_FLIGHT": "1000000", "ADMISSION_LAG_MS": "1e9", "ADMISSION_IN_FLIGHT": "1000000"}
+
+
+async def flood_request(client, i, user):
+    kind = i % 3
+    if kind == 0:
+        return await client.post("/chat", json={"message": f"Anonymous question {i}", "model": "ollama-local"})
+    if kind == 1:
+        return await client.get("/chat/history", headers=user)
+    return await client.get("/models")
+
+
+async def drive(base_url, args):
+    limits = httpx.Limits(max_connections=args.flood + args.probes + 8, max_keepalive_connections=args.flood + args.probes + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        users = await setup_users(client, max(1, args.probes))
+        probe_latencies, probe_statuses = [], {}
+        served, shed = [], []
+        deadline = time.perf_counter() + args.duration
+
+        async def flooder(index):
+            i = index
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await flood_request(client, i, users[index % len(users)])
+                except httpx.HTTPError:
+                    continue
+                finally:
+                    i += args.flood
+                if response.status_code != 503:
+                    served.append(time.perf_counter() - start)
+                    continue
+                shed.append(time.perf_counter() - start)
+                if not args.ignore_retry_after:
+                    await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), max(0.0, deadline - time.perf_counter())))
+
+        async def prober(index):
+            i = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/chat", headers=users[index % len(users)],
+                                                 json={"message": f"Plan my revision for exam {i}", "model": "ollama-local"})
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                probe_latencies.append(time.perf_counter() - start)
+                probe_statuses[status] = probe_statuses.get(status, 0) + 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[flooder(i) for i in range(args.flood)], *[prober(i) for i in range(args.probes)])
+        elapsed = time.perf_counter() - started
+        health = (await client.get("/health")).json().get("admission")
+        return {
+            "authenticated_chat": {**summarize(probe_latencies), "statuses": {str(k): v for k, v in probe_statuses.items()}},
+            "flood_served_rps": round(len(served) / elapsed, 1),
+            "flood_shed": len(shed),
+            "shed_latency": summarize(shed),
+            "admission": health,
+        }
+
+
+def main(args):
+    for label, env in (("admission off", OFF), ("admission on", {})):
+        with Servers(args, extra_env=env) as servers:
+            result = asyncio.run(drive(servers.base_url, args))
+        chat = result["authenticated_chat"]
+        print(f"{label}: authenticated /chat p50 {chat.get('p50_ms')} ms p95 {chat.get('p95_ms')} ms "
+              f"p99 {chat.get('p99_ms')} ms ({chat['count']} requests, {chat['statuses']}); "
+              f"flood served {result['flood_served_rps']} req/s, shed {result['flood_shed']} "
+              f"(503 p50 {result['shed_latency'].get('p50_ms')} ms)")
+        print(f"  {result['admission']}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--flood", type=int, default=64, help="concurrent low-priority clients")
+    parser.add_argument("--probes", type=int, default=4, help="concurrent authenticated /chat clients")
+    parser.add_argument("--ignore-retry-after", action="store_true", help="flood clients retry 503s immediately")
+    parser.set_defaults(duration=10.0)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+"""Reminder scheduler: window load cost and heap size vs total reminders.
+
+Fills a scratch SQLite database with open reminders spread evenly over
+--days, then times one scheduler window load (REMINDER_WINDOW_SECONDS ahead)
+against the old polling path (every reminder for a user, sorted), and reports
+how many reminders the heap holds.
+
+Usage (from backend/):
+    python benchmarks/reminders.py --reminders 100000 1000000 --days 30
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from bench_utils import BACKEND_DIR  # noqa: F401 (puts backend/ on sys.path)
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="reminder-bench-")
+    os.environ["LOG_FILE"] = os.devnull
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.orm import sessionmaker
+    from models import Base, Reminder
+    from reminder_scheduler import ReminderScheduler
+
+    for total in args.reminders:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, f'{total}.db')}")
+        Base.metadata.create_all(engine)
+        now = datetime.utcnow()
+        span = args.days * 86400
+        with engine.begin() as conn:
+            for start in range(0, total, 50000):
+                conn.execute(insert(Reminder), [
+                    {
+                        "user_id": random.randint(1, args.users),
+                        "title": f"Reminder {i}",
+                        "description": "",
+                        "due_date": now + timedelta(seconds=random.uniform(0, span)),
+                        "completed": random.random() < 0.3,
+                    }
+                    for i in range(start, min(total, start + 50000))
+                ])
+        session_factory = sessionmaker(bind=engine)
+
+        scheduler = ReminderScheduler(window=args.window)
+        scheduler._session_factory = session_factory
+        scheduler._cursor = (time.time(), 0)
+        started = time.perf_counter()
+        scheduler._load_until(time.time() + args.window)
+        window_ms = (time.perf_counter() - started) * 1000
+
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            for user_id in range(1, args.polls + 1):
+                conn.execute(select(Reminder).where(Reminder.user_id == user_id).order_by(Reminder.due_date)).fetchall()
+            poll_ms = (time.perf_counter() - started) * 1000 / args.polls
+        engine.dispose()
+
+        print(f"{total:>9d} reminders: window load {window_ms:8.1f} ms, heap {len(scheduler._heap):6d} entries; "
+              f"one GET /reminders poll {poll_ms:6.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--days", type=float, default=30.0, help="due dates are spread over this many days")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--window", type=float, default=3600.0)
+    parser.add_argument("--polls", type=int, default=20, help="users whose reminder list is fetched for comparison")
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+"""Throughput and tail latency as the number of uvicorn workers grows.
+
+Runs the load.py scenarios against the app started with 1, 2, 4 and 8
+worker processes (WEB_CONCURRENCY), all sharing one SQLite-backed shared
+cache, and prints requests/s and p95 per scenario and worker count. The
+numbers are only meaningful on a machine with at least as many cores as
+the largest worker count.
+
+Usage (from backend/):
+    python benchmarks/scaling.py --workers 1 2 4 8 --duration 10 --concurrency 32
+"""
+import os
+import sys
+import asyncio
+import argparse
+
+from bench_utils import load_baseline, save_baseline, compare
+from load import Servers, add_arguments, drive
+
+
+def main(args):
+    print(f"cpus: {os.cpu_count()}")
+    results = {}
+    for workers in args.workers:
+        with Servers(args, workers=workers) as servers:
+            print(f"-- {workers} worker(s)")
+            results[str(workers)] = asyncio.run(
+                drive(servers.base_url, args.scenarios, args.concurrency, args.duration, args.users, args.model)
+            )
+
+    print(f"{'workers':>7s} " + " ".join(f"{name + ' rps':>12s} {name + ' p95':>12s}" for name in args.scenarios))
+    for workers, by_scenario in results.items():
+        cells = " ".join(f"{by_scenario[name]['rps']:>12} {by_scenario[name].get('p95_ms', '-'):>12}" for name in args.scenarios)
+        print(f"{workers:>7s} {cells}")
+
+    baseline = load_baseline().get("scaling", {})
+    regressions = 0
+    for workers, by_scenario in results.items():
+        for name, result in by_scenario.items():
+            base = baseline.get(workers, {}).get(name, {})
+            line, regressed = compare(f"{workers}w {name:8s} rps", result["rps"], base.get("rps"), args.tolerance, True)
+            regressions += regressed
+            print(line)
+    if args.save_baseline:
+        save_baseline("scaling", results)
+        print("saved scaling baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.set_defaults(scenarios=["chat", "history"])
+    args = parser.parse_args()
+    sys.exit(1 if main(args) and not args.save_baseline else 0)
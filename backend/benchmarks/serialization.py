@@ -0,0 +1,83 @@
+"""Serialization cost of large history and reminder lists.
+
+Compares the old path (ORM rows walked by jsonable_encoder, rendered with
+json) against typed response models rendered with orjson.
+
+Usage (from backend/):
+    python benchmarks/serialization.py --rows 10000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(rows, repeat):
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from models import Base, User, Chat, Reminder
+    from main import ChatHistoryItem, ReminderResponse
+    from responses import ORJSONResponse
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+
+    now = datetime.utcnow()
+    db.add_all(
+        Chat(user_id=user.id, message=f"question {i} " * 8, response=f"answer {i} " * 40,
+             timestamp=now - timedelta(minutes=i), model_used="fallback-enhanced", tokens_used=120)
+        for i in range(rows)
+    )
+    db.add_all(
+        Reminder(user_id=user.id, title=f"reminder {i}", description="review notes " * 5,
+                 due_date=now + timedelta(hours=i), completed=i % 3 == 0)
+        for i in range(rows)
+    )
+    db.commit()
+
+    chats = db.query(Chat).all()
+    reminders = db.query(Reminder).all()
+
+    cases = [
+        ("chat history", chats, TypeAdapter(List[ChatHistoryItem])),
+        ("reminders", reminders, TypeAdapter(List[ReminderResponse])),
+    ]
+    response = ORJSONResponse(content=None)
+    for label, objects, adapter in cases:
+        old = best_of(lambda: json.dumps(jsonable_encoder(objects)).encode(), repeat)
+        new = best_of(
+            lambda: response.render(adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")),
+            repeat,
+        )
+        print(f"{label:13s} rows={len(objects):7d}  jsonable_encoder+json {old * 1000:8.1f} ms   "
+              f"model+orjson {new * 1000:8.1f} ms   speedup x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
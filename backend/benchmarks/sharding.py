@@ -0,0 +1,114 @@
+"""Write throughput of per-user tables vs DB_SHARDS.
+
+Starts --writers processes, each committing one chat row at a time (like
+/chat does for a logged-in user) for its own set of users, against a scratch
+database laid out with 0 (everything in one file), 1, 2, 4 and 8 shards.
+Every SQLite file has one write lock, so commits/s should grow with the shard
+count until writers stop colliding or the disk saturates.
+
+Usage (from backend/):
+    python benchmarks/sharding.py --shards 0 1 2 4 8 --writers 8 --rows 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from bench_utils import BACKEND_DIR, summarize, load_baseline, save_baseline, compare
+
+
+def _configure(url, shards):
+    # database reads DATABASE_URL / DB_SHARDS at import, so each process sets them first
+    os.environ["DATABASE_URL"] = url
+    os.environ["DB_SHARDS"] = str(shards)
+    os.environ["LOG_FILE"] = os.devnull
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def _prepare(url, shards, users):
+    _configure(url, shards)
+    from database import SessionLocal, init_db
+    from models import User
+
+    init_db()
+    db = SessionLocal()
+    try:
+        db.add_all([User(id=user_id, email=f"shard-bench-{user_id}@example.com", password_hash="x") for user_id in range(1, users + 1)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _write(url, shards, user_ids, rows, start_at):
+    _configure(url, shards)
+    from database import user_session
+    from models import Chat
+
+    sessions = {user_id: user_session(user_id) for user_id in user_ids}
+    latencies = []
+    # Line the writers up so they contend from the first commit
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for i in range(rows):
+        user_id = user_ids[i % len(user_ids)]
+        db = sessions[user_id]
+        started = time.perf_counter()
+        db.add(Chat(user_id=user_id, message=f"question {i}", response="answer " * 40, model_used="fallback-enhanced", tokens_used=48))
+        db.commit()
+        latencies.append(time.perf_counter() - started)
+    finished_at = time.time()
+    for db in sessions.values():
+        db.close()
+    return latencies, finished_at
+
+
+def run(shards, args):
+    workdir = tempfile.mkdtemp(prefix=f"shard-bench-{shards}-")
+    url = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    users = args.writers * args.users_per_writer
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        pool.apply(_prepare, (url, shards, users))
+    with context.Pool(args.writers) as pool:
+        start_at = time.time() + 2.0
+        jobs = [
+            pool.apply_async(_write, (url, shards, list(range(writer + 1, users + 1, args.writers)), args.rows, start_at))
+            for writer in range(args.writers)
+        ]
+        outcomes = [job.get() for job in jobs]
+    latencies = [sample for samples, _ in outcomes for sample in samples]
+    elapsed = max(finished_at for _, finished_at in outcomes) - start_at
+    return {"commits_per_s": round(len(latencies) / elapsed, 1), **summarize(latencies)}
+
+
+def main(args):
+    print(f"cpus: {os.cpu_count()}, writers: {args.writers}, rows per writer: {args.rows}")
+    results = {str(shards): run(shards, args) for shards in args.shards}
+    print(f"{'shards':>6s} {'commits/s':>10s} {'p50_ms':>8s} {'p95_ms':>8s} {'p99_ms':>8s}")
+    for shards, result in results.items():
+        print(f"{shards:>6s} {result['commits_per_s']:>10} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}")
+
+    baseline = load_baseline().get("sharding", {})
+    regressions = 0
+    for shards, result in results.items():
+        line, regressed = compare(f"{shards} shard(s) commits/s", result["commits_per_s"], baseline.get(shards, {}).get("commits_per_s"), args.tolerance, True)
+        regressions += regressed
+        print(line)
+    if args.save_baseline:
+        save_baseline("sharding", results)
+        print("saved sharding baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=500, help="Commits per writer")
+    parser.add_argument("--users-per-writer", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    sys.exit(main(parser.parse_args()))
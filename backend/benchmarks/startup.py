@@ -0,0 +1,93 @@
+"""Cold-start timing: process launch to /livez and to /readyz.
+
+Starts uvicorn main:app on a scratch database several times and reports how
+long the server takes to answer /livez (serving) and /readyz (warm), along
+with the import/lifespan/warm-up breakdown the app reports itself.
+
+Usage (from backend/):
+    python benchmarks/startup.py --runs 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from bench_utils import BACKEND_DIR, summarize, load_baseline, save_baseline, compare
+from load import free_port
+
+
+def poll(url, deadline, want_status=200):
+    while time.perf_counter() < deadline:
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if response.status_code == want_status:
+                return response
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} not {want_status} before deadline")
+
+
+def one_run(timeout):
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as tmp:
+        port = free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/startup.db",
+            "LOG_FILE": f"{tmp}/app.log",
+            # Nothing listens here, so the Ollama probe fails fast instead of timing out
+            "OLLAMA_URL": f"http://127.0.0.1:{free_port()}",
+        }
+        cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+        started = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+        try:
+            deadline = started + timeout
+            base = f"http://127.0.0.1:{port}"
+            poll(base + "/livez", deadline)
+            live = time.perf_counter() - started
+            report = poll(base + "/readyz", deadline).json()
+            ready = time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return live, ready, report
+
+
+def main(args):
+    lives, readies = [], []
+    for i in range(args.runs):
+        live, ready, report = one_run(args.timeout)
+        lives.append(live)
+        readies.append(ready)
+        warmups = {name: w.get("seconds") for name, w in report["warmups"].items()}
+        print(f"run {i + 1}: live {live * 1000:.0f} ms, ready {ready * 1000:.0f} ms, "
+              f"import {report['import_seconds']} s, warm-ups {warmups}")
+    results = {"livez": summarize(lives), "readyz": summarize(readies)}
+    for name, result in results.items():
+        print(f"{name:7s} {result}")
+
+    baseline = load_baseline().get("startup", {})
+    regressions = 0
+    for name, result in results.items():
+        line, regressed = compare(f"{name:7s} p50_ms", result["p50_ms"], baseline.get(name, {}).get("p50_ms"), args.tolerance, False)
+        regressions += regressed
+        print(line)
+    if args.save_baseline:
+        save_baseline("startup", results)
+        print("saved startup baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    sys.exit(1 if main(args) and not args.save_baseline else 0)
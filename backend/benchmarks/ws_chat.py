@@ -0,0 +1,68 @@
+"""Per-turn request size and latency: POST /chat with full history vs /ws/chat.
+
+Plays the same N-turn conversation both ways against the in-process app
+(offline fallback model, scratch database) and reports request bytes and
+latency for the first and last turn.
+
+Usage (from backend/):
+    python benchmarks/ws_chat.py --turns 40
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+from bench_utils import summarize
+
+MESSAGE = "Can you help me plan a study session for my chemistry exam next week?"
+
+
+def http_turns(client, turns):
+    history, sizes, latencies = [], [], []
+    for _ in range(turns):
+        history.append({"sender": "user", "text": MESSAGE, "timestamp": "2024-01-01T00:00:00"})
+        body = json.dumps({"message": MESSAGE, "history": history, "model": "fallback-enhanced"})
+        start = time.perf_counter()
+        reply = client.post("/chat", content=body, headers={"Content-Type": "application/json"}).json()["response"]
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(body))
+        history.append({"sender": "assistant", "text": reply, "timestamp": "2024-01-01T00:00:00"})
+    return sizes, latencies
+
+
+def ws_turns(client, turns):
+    sizes, latencies = [], []
+    with client.websocket_connect("/ws/chat") as ws:
+        ws.receive_json()
+        for i in range(turns):
+            frame = json.dumps({"type": "message", "id": i, "text": MESSAGE, "model": "fallback-enhanced"})
+            start = time.perf_counter()
+            ws.send_text(frame)
+            while ws.receive_json()["type"] != "done":
+                pass
+            latencies.append(time.perf_counter() - start)
+            sizes.append(len(frame))
+    return sizes, latencies
+
+
+def main(turns):
+    tmp = tempfile.mkdtemp(prefix="ws-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/ws.db")
+    os.environ.setdefault("LOG_FILE", f"{tmp}/app.log")
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    with TestClient(app_module.app) as client:
+        for name, run in (("http", http_turns), ("ws", ws_turns)):
+            sizes, latencies = run(client, turns)
+            print(f"{name:4s} request bytes: first {sizes[0]}, last {sizes[-1]}, total {sum(sizes)}")
+            print(f"{name:4s} latency: first {latencies[0] * 1000:.2f} ms, last {latencies[-1] * 1000:.2f} ms, {summarize(latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+    main(args.turns)
@@ -0,0 +1,107 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+
+from shared_cache import shared_cache
+
+# The engine only reads the last few messages, so the server keeps a short window per session
+WS_HISTORY_MESSAGES = int(os.environ.get("WS_HISTORY_MESSAGES", "10"))
+WS_SESSION_MAX_BYTES = int(os.environ.get("WS_SESSION_MAX_BYTES", "65536"))
+WS_SESSION_TTL_SECONDS = float(os.environ.get("WS_SESSION_TTL_SECONDS", "1800"))
+WS_MAX_SESSIONS = int(os.environ.get("WS_MAX_SESSIONS", "10000"))
+
+
+class ChatSession:
+    """Server-held conversation window for one WebSocket chat session"""
+
+    def __init__(self, session_id: str, user_id: Optional[int], history=None, undelivered=None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.history: deque = deque(history or [], maxlen=WS_HISTORY_MESSAGES)
+        self.history_bytes = sum(len(m["text"]) for m in self.history)
+        # Last reply that could not be sent because the socket dropped; re-sent on resume
+        self.undelivered: Optional[Dict[str, Any]] = undelivered
+        self.last_seen = time.time()
+
+    def add(self, sender: str, text: str):
+        if len(self.history) == self.history.maxlen:
+            self.history_bytes -= len(self.history[0]["text"])
+        self.history.append({"sender": sender, "text": text})
+        self.history_bytes += len(text)
+        # Byte bound on top of the message-count bound, so a few huge messages can't pin memory
+        while self.history_bytes > WS_SESSION_MAX_BYTES and len(self.history) > 1:
+            self.history_bytes -= len(self.history.popleft()["text"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "history": list(self.history), "undelivered": self.undelivered}
+
+
+class ChatSessionStore:
+    """LRU of live sessions, mirrored to the shared cache so a reconnect can resume on any worker"""
+
+    def __init__(self, max_sessions: int = WS_MAX_SESSIONS, ttl: float = WS_SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.connected = 0
+        self.resumed = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"ws_session:{session_id}"
+
+    def open(self, user_id: Optional[int], session_id: Optional[str] = None) -> Tuple[ChatSession, bool]:
+        """Resume session_id if it exists and belongs to this user, otherwise start a new one"""
+        session = self._load(session_id) if session_id else None
+        resumed = session is not None and session.user_id == user_id
+        if not resumed:
+            session = ChatSession(uuid.uuid4().hex, user_id)
+        else:
+            self.resumed += 1
+        session.last_seen = time.time()
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            self._evict(session.last_seen)
+        return session, resumed
+
+    def _load(self, session_id: str) -> Optional[ChatSession]:
+        # The shared copy wins: the last connection may have been served by another worker
+        stored = shared_cache.get(self._key(session_id))
+        if stored is not None:
+            return ChatSession(session_id, stored["user_id"], stored["history"], stored["undelivered"])
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None and time.time() - session.last_seen <= self.ttl:
+            return session
+        return None
+
+    def _evict(self, now: float):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def save(self, session: ChatSession):
+        session.last_seen = time.time()
+        shared_cache.set(self._key(session.session_id), session.to_dict(), ttl=self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "connected": self.connected,
+            "resumed": self.resumed,
+            "history_bytes": sum(s.history_bytes for s in sessions),
+        }
+
+
+# Global session store
+chat_sessions = ChatSessionStore()
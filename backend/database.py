@@ -1,22 +1,200 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, inspect, select, text, Column, Integer, MetaData, Table
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from models import Base
+from models import Base, ShardLayout
+from typing import Dict, List, Optional
 import os
+import zlib
 
 SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./ai_assistant.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Per-user tables live in DB_SHARDS shard databases (0 = in the main database with everything else).
+# Changing it on an existing database needs `python sharding.py rebalance --shards N` first.
+DB_SHARDS = int(os.environ.get("DB_SHARDS", "0"))
+_root, _ext = os.path.splitext(SQLALCHEMY_DATABASE_URL)
+DB_SHARD_URL_TEMPLATE = os.environ.get("DB_SHARD_URL_TEMPLATE", f"{_root}.shard{{shard}}{_ext or '.db'}")
+SHARDED_TABLES = ("chats", "conversation_embeddings", "documents", "reminders")
+MAX_SHARDS = 256
+# Shard s of layout epoch e allocates ids from ((e * MAX_SHARDS) + s) << SHARD_ID_BITS, so ids stay
+# unique across shards (feedback.chat_id) and a user's new rows sort after rows moved by a rebalance
+SHARD_ID_BITS = 32
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+
+def _make_engine(url: str):
+    new_engine = create_engine(url, connect_args={"check_same_thread": False})
+    if url.startswith("sqlite"):
+        @event.listens_for(new_engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            # WAL lets readers in other worker processes proceed while one writes; busy_timeout waits out writer locks
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+    return new_engine
+
+
+engine = _make_engine(SQLALCHEMY_DATABASE_URL)
+_shard_engines: Dict[int, object] = {}
+
+# Shard copies of the per-user tables: AUTOINCREMENT so the seeded id range is never reused,
+# and a bare `users` stand-in so their foreign keys still render
+shard_metadata = MetaData()
+Table("users", shard_metadata, Column("id", Integer, primary_key=True))
+for _table in Base.metadata.sorted_tables:
+    if _table.name in SHARDED_TABLES:
+        _table.to_metadata(shard_metadata).dialect_kwargs["sqlite_autoincrement"] = True
+
+
+def shard_engine(index: int):
+    """Engine for shard file `index`, created on first use"""
+    if index not in _shard_engines:
+        _shard_engines[index] = _make_engine(DB_SHARD_URL_TEMPLATE.format(shard=index))
+    return _shard_engines[index]
+
+
+def shard_for(user_id: int, shards: int = DB_SHARDS) -> int:
+    """Stable hash of the user id, so a user's rows always land in the same shard"""
+    return zlib.crc32(str(user_id).encode()) % shards
+
+
+def id_base(epoch: int, shard: int) -> int:
+    return (epoch * MAX_SHARDS + shard) << SHARD_ID_BITS
+
+
+class UnboundShardError(RuntimeError):
+    """A per-user table was queried through a session that isn't bound to a user or shard"""
+
+
+class RoutingSession(Session):
+    """Sends per-user tables to the shard of the session's user (info["user_id"]) or to a pinned
+    shard (info["shard"], for jobs that walk every shard); everything else uses the main database."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if DB_SHARDS and mapper is not None:
+            table = getattr(inspect(mapper), "local_table", None)
+            if table is not None and table.name in SHARDED_TABLES:
+                if "shard" in self.info:
+                    return shard_engine(self.info["shard"])
+                if self.info.get("user_id") is not None:
+                    return shard_engine(shard_for(self.info["user_id"], DB_SHARDS))
+                raise UnboundShardError(f"{table.name} is sharded; bind the session to a user first")
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+
+DB_WARM_CONNECTIONS = int(os.environ.get("DB_WARM_CONNECTIONS", "4"))
+
+
+def bind_user(db: Session, user_id: int):
+    """Route this session's per-user tables to user_id's shard (no-op without sharding)"""
+    db.info["user_id"] = user_id
+
+
+def user_session(user_id: int) -> Session:
+    return SessionLocal(info={"user_id": user_id})
+
+
+def shard_sessions(session_factory=None) -> List[Session]:
+    """One session per database holding per-user tables, for jobs that read across users; caller closes them"""
+    session_factory = session_factory or SessionLocal
+    if not DB_SHARDS:
+        return [session_factory()]
+    return [session_factory(info={"shard": index}) for index in range(DB_SHARDS)]
+
+
+def read_layout(bind=None) -> Optional[ShardLayout]:
+    with Session(bind=bind or engine) as db:
+        return db.get(ShardLayout, 1)
+
+
+def prepare_shard(index: int, epoch: int):
+    """Create the per-user tables in a shard and start its id sequences at the epoch's range"""
+    target = shard_engine(index)
+    shard_metadata.create_all(bind=target, tables=[shard_metadata.tables[name] for name in SHARDED_TABLES])
+    for name in SHARDED_TABLES:
+        for index_ in shard_metadata.tables[name].indexes:
+            index_.create(bind=target, checkfirst=True)
+    base = id_base(epoch, index)
+    with target.begin() as conn:
+        for name in SHARDED_TABLES:
+            updated = conn.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :base) WHERE name = :name"), {"base": base, "name": name})
+            if updated.rowcount == 0:
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :base)"), {"base": base, "name": name})
+
+
+def _has_user_rows(bind) -> bool:
+    existing = set(inspect(bind).get_table_names())
+    with bind.connect() as conn:
+        return any(conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() for name in SHARDED_TABLES if name in existing)
+
+
+def _check_layout():
+    """Start using DB_SHARDS shards, or refuse if the data is laid out differently"""
+    layout = read_layout()
+    shards = layout.shards if layout else 0
+    if shards == DB_SHARDS:
+        for index in range(DB_SHARDS):
+            prepare_shard(index, layout.epoch)
+        return
+    if layout is None and not _has_user_rows(engine):
+        # Fresh database: nothing to move, start sharded right away
+        try:
+            with Session(bind=engine) as db:
+                db.add(ShardLayout(id=1, shards=DB_SHARDS, epoch=1))
+                db.commit()
+        except IntegrityError:
+            # Another worker got there first
+            return _check_layout()
+        return _check_layout()
+    raise RuntimeError(
+        f"DB_SHARDS={DB_SHARDS} but per-user data is laid out for {shards} shard(s); "
+        f"run `python sharding.py rebalance --shards {DB_SHARDS}` with the app stopped"
+    )
+
+
+def init_db():
+    """Create missing tables; run from the app lifespan rather than at import (start.sh also runs Alembic)"""
+    tables = [table for table in Base.metadata.sorted_tables if not (DB_SHARDS and table.name in SHARDED_TABLES)]
+    try:
+        Base.metadata.create_all(bind=engine, tables=tables)
+    except OperationalError:
+        # Another worker created the tables between our existence check and CREATE; re-check once
+        Base.metadata.create_all(bind=engine, tables=tables)
+    # create_all only builds indexes with new tables; add ones declared later to existing tables
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _check_layout()
+
+
+def warm_pool(connections: int = DB_WARM_CONNECTIONS):
+    """Open pooled connections and touch every table so schema and root pages are cached"""
+    opened = [engine.connect() for _ in range(max(1, connections))]
+    try:
+        for conn in opened:
+            for table in Base.metadata.sorted_tables:
+                if not (DB_SHARDS and table.name in SHARDED_TABLES):
+                    conn.execute(select(table).limit(1)).fetchall()
+    finally:
+        for conn in opened:
+            conn.close()
+    for index in range(DB_SHARDS):
+        with shard_engine(index).connect() as conn:
+            for name in SHARDED_TABLES:
+                conn.execute(select(shard_metadata.tables[name]).limit(1)).fetchall()
+
+# Identity-map sizes seen when request sessions close (reported by the memory endpoint)
+identity_map_stats = {"last": 0, "max": 0, "sessions": 0}
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        size = len(db.identity_map)
+        identity_map_stats["last"] = size
+        identity_map_stats["max"] = max(identity_map_stats["max"], size)
+        identity_map_stats["sessions"] += 1
+        db.close()
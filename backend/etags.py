@@ -0,0 +1,88 @@
+import uuid
+import hashlib
+from typing import Any, Dict, Optional
+
+from shared_cache import shared_cache
+
+GENERATION_KEY = "etag:generation"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag (quoted, opaque) for the given parts"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires: a W/ prefix on the client's tag is ignored"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResourceVersions:
+    """Per-user version counters for read-mostly resources, bumped after every committed write.
+
+    Counters live in the shared cache so all workers hand out the same ETag.
+    Callers read the version before running the query and bump it after the
+    commit, so a response can carry an older tag than its data but never a
+    newer one. Tags also include a generation id stored next to the counters:
+    when the store is wiped (a restart with the memory backend) the counters
+    start over, and tags issued before that must not match again.
+    """
+
+    def __init__(self, cache=shared_cache):
+        self._cache = cache
+        self._generation: Optional[str] = None
+        self.bumps = 0
+        self.checks = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _key(resource: str, user_id: int) -> str:
+        return f"etag:{resource}:{user_id}"
+
+    def generation(self) -> str:
+        if self._generation is None:
+            # The first worker to get here picks it; the rest read the winner's
+            self._cache.add(GENERATION_KEY, uuid.uuid4().hex)
+            self._generation = self._cache.get(GENERATION_KEY)
+        return self._generation
+
+    def version(self, resource: str, user_id: int) -> int:
+        return int(self._cache.get(self._key(resource, user_id), 0))
+
+    def bump(self, resource: str, user_id: int) -> int:
+        self.bumps += 1
+        return self._cache.incr(self._key(resource, user_id))
+
+    def etag(self, resource: str, user_id: int, variant: Any = "") -> str:
+        """ETag of one user's resource; `variant` covers anything else the response depends on (query params)"""
+        return make_etag(self.generation(), resource, user_id, self.version(resource, user_id), variant)
+
+    def check(self, if_none_match: Optional[str], etag: str) -> bool:
+        """True if the client's copy is current (answer 304)"""
+        self.checks += 1
+        matched = etag_matches(if_none_match, etag)
+        self.not_modified += matched
+        return matched
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bumps": self.bumps,
+            "checks": self.checks,
+            "not_modified": self.not_modified,
+            "not_modified_rate": round(self.not_modified / self.checks, 4) if self.checks else 0.0,
+        }
+
+
+# Global resource version store
+resource_versions = ResourceVersions()
@@ -0,0 +1,81 @@
+import zlib
+from datetime import datetime
+from typing import Iterator, Callable
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Chat, Reminder, Document
+from archive import chat_archive
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_YIELD_PER = 1000
+# Bytes buffered before a chunk is handed to the response
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_queries(user_id: int):
+    """(record type, column select) pairs, in export order"""
+    return [
+        ("chat", select(
+            Chat.id, Chat.message, Chat.response, Chat.timestamp,
+            Chat.model_used, Chat.tokens_used, Chat.context_length,
+        ).where(Chat.user_id == user_id).order_by(Chat.id)),
+        ("reminder", select(
+            Reminder.id, Reminder.title, Reminder.description, Reminder.due_date,
+            Reminder.completed, Reminder.created_at,
+        ).where(Reminder.user_id == user_id).order_by(Reminder.id)),
+        # Metadata only; document contents can be large and are not exported
+        ("document", select(
+            Document.id, Document.filename, Document.file_type, Document.uploaded_at,
+        ).where(Document.user_id == user_id).order_by(Document.id)),
+    ]
+
+
+def iter_export_lines(db: Session, user_id: int, email: str) -> Iterator[bytes]:
+    """Yield one NDJSON line per row, streaming each table through yield_per"""
+    yield orjson.dumps({
+        "type": "export",
+        "user_id": user_id,
+        "email": email,
+        "exported_at": datetime.utcnow(),
+    }) + b"\n"
+
+    # Archived chats are older than anything still in the DB, so they go first
+    for record in chat_archive.iter_records(user_id, "chat"):
+        record.pop("user_id", None)
+        yield orjson.dumps({"type": "chat", **record}) + b"\n"
+
+    for record_type, query in _export_queries(user_id):
+        result = db.execute(query.execution_options(yield_per=EXPORT_YIELD_PER))
+        for row in result:
+            yield orjson.dumps({"type": record_type, **row._asdict()}) + b"\n"
+
+
+def iter_export_chunks(session_factory: Callable[[], Session], user_id: int, email: str, compress: bool = False) -> Iterator[bytes]:
+    """Batch export lines into chunks, optionally gzip-compressing on the fly"""
+    # The stream outlives the request's own session, so it opens its own
+    db = session_factory()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    try:
+        buffer = []
+        size = 0
+        for line in iter_export_lines(db, user_id, email):
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                chunk = b"".join(buffer)
+                buffer, size = [], 0
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+
+        chunk = b"".join(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        db.close()
@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import Chat, Feedback, FeedbackRollup, FeedbackRollupState
+from database import DB_SHARDS, shard_sessions
+from structured_log import log
+
+# Feedback rows folded in right after each insert; a larger backlog is left to the periodic job
+FEEDBACK_ROLLUP_INLINE_MAX = int(os.environ.get("FEEDBACK_ROLLUP_INLINE_MAX", "100"))
+FEEDBACK_ROLLUP_BATCH = int(os.environ.get("FEEDBACK_ROLLUP_BATCH", "5000"))
+FEEDBACK_ROLLUP_INTERVAL_SECONDS = float(os.environ.get("FEEDBACK_ROLLUP_INTERVAL_SECONDS", "60"))
+FEEDBACK_ANALYTICS_MAX_DAYS = int(os.environ.get("FEEDBACK_ANALYTICS_MAX_DAYS", "90"))
+GROUP_BY = ("model", "module", "day")
+# Chat ids per IN (...) lookup when chats are sharded (stays under SQLite's bound-parameter limit)
+CHAT_LOOKUP_BATCH = 500
+
+
+class FeedbackRollups:
+    """Folds new feedback rows into per-day/model/module counters behind an id watermark.
+
+    The same fold runs after every /feedback insert and from a periodic job
+    (which also backfills rows that predate the rollup tables). The watermark
+    row is written before it is read, so concurrent folds in other workers
+    serialize on the database write lock and never count a row twice.
+    """
+
+    def __init__(self):
+        self._module_of: Callable[[str], str] = lambda message: "general"
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.folded = 0
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+
+    def _lock_state(self, db: Session) -> FeedbackRollupState:
+        now = datetime.utcnow()
+        if db.execute(update(FeedbackRollupState).where(FeedbackRollupState.id == 1).values(updated_at=now)).rowcount == 0:
+            db.add(FeedbackRollupState(id=1, last_feedback_id=0, updated_at=now))
+            db.flush()
+        return db.execute(
+            select(FeedbackRollupState).where(FeedbackRollupState.id == 1).with_for_update().execution_options(populate_existing=True)
+        ).scalar_one()
+
+    def _rows_with_sharded_chats(self, db: Session, after_id: int, limit: int) -> List[Tuple]:
+        """The fold's join done by hand: chats live in the shard files, feedback in the main database"""
+        feedback = db.execute(
+            select(Feedback.id, Feedback.rating, Feedback.timestamp, Feedback.chat_id)
+            .where(Feedback.id > after_id)
+            .order_by(Feedback.id)
+            .limit(limit)
+        ).all()
+        chat_ids = sorted({row[3] for row in feedback if row[3] is not None})
+        chats: Dict[int, Tuple[str, str]] = {}
+        if chat_ids:
+            for shard_db in shard_sessions():
+                try:
+                    for start in range(0, len(chat_ids), CHAT_LOOKUP_BATCH):
+                        for chat_id, model_used, message in shard_db.execute(
+                            select(Chat.id, Chat.model_used, Chat.message).where(Chat.id.in_(chat_ids[start:start + CHAT_LOOKUP_BATCH]))
+                        ):
+                            chats[chat_id] = (model_used, message)
+                finally:
+                    shard_db.close()
+        return [(feedback_id, rating, timestamp, *chats.get(chat_id, (None, None))) for feedback_id, rating, timestamp, chat_id in feedback]
+
+    def fold(self, db: Session, limit: int = FEEDBACK_ROLLUP_BATCH) -> int:
+        """Fold up to `limit` feedback rows past the watermark and commit; returns rows folded"""
+        state = self._lock_state(db)
+        if DB_SHARDS:
+            rows = self._rows_with_sharded_chats(db, state.last_feedback_id, limit)
+        else:
+            rows = db.execute(
+                select(Feedback.id, Feedback.rating, Feedback.timestamp, Chat.model_used, Chat.message)
+                .outerjoin(Chat, Feedback.chat_id == Chat.id)
+                .where(Feedback.id > state.last_feedback_id)
+                .order_by(Feedback.id)
+                .limit(limit)
+            ).all()
+        if not rows:
+            db.commit()
+            return 0
+        deltas: Dict[Tuple[date, str, str], List[int]] = {}
+        for _, rating, timestamp, model_used, message in rows:
+            key = (
+                (timestamp or datetime.utcnow()).date(),
+                model_used or "unknown",
+                self._module_of(message) if message else "unknown",
+            )
+            delta = deltas.setdefault(key, [0, 0, 0, 0])
+            rating = rating or 0
+            delta[0] += 1
+            delta[1] += rating > 0
+            delta[2] += rating < 0
+            delta[3] += rating
+        now = datetime.utcnow()
+        for (day, model_used, module), (total, positive, negative, rating_sum) in deltas.items():
+            rollup = db.get(FeedbackRollup, (day, model_used, module))
+            if rollup is None:
+                db.add(FeedbackRollup(day=day, model_used=model_used, module=module, total=total,
+                                      positive=positive, negative=negative, rating_sum=rating_sum, updated_at=now))
+            else:
+                rollup.total += total
+                rollup.positive += positive
+                rollup.negative += negative
+                rollup.rating_sum += rating_sum
+                rollup.updated_at = now
+        state.last_feedback_id = rows[-1][0]
+        db.commit()
+        self.folded += len(rows)
+        return len(rows)
+
+    def fold_after_insert(self, db: Session):
+        """Best effort: the feedback row is already committed and the job catches up on failure"""
+        try:
+            self.fold(db, limit=FEEDBACK_ROLLUP_INLINE_MAX)
+        except Exception as e:
+            db.rollback()
+            self.errors += 1
+            log.warning("feedback_rollup.inline_error", error=str(e))
+
+    def _catch_up(self):
+        db = self._session_factory()
+        try:
+            while self.fold(db) == FEEDBACK_ROLLUP_BATCH:
+                pass
+        finally:
+            db.close()
+
+    async def _run(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self._catch_up)
+                self.runs += 1
+                self.last_run = time.time()
+            except Exception as e:
+                self.errors += 1
+                log.error("feedback_rollup.job_error", error=str(e))
+            await asyncio.sleep(interval)
+
+    def start(self, session_factory: Callable[[], Session], module_of: Callable[[str], str], interval: float = FEEDBACK_ROLLUP_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._module_of = module_of
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def summary(self, db: Session, days: int, group_by: str, model: Optional[str] = None, module: Optional[str] = None) -> Dict[str, Any]:
+        """Aggregate the last `days` days of rollups; reads at most days x models x modules rows"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        query = select(FeedbackRollup).where(FeedbackRollup.day >= since)
+        if model:
+            query = query.where(FeedbackRollup.model_used == model)
+        if module:
+            query = query.where(FeedbackRollup.module == module)
+        groups: Dict[str, Dict[str, int]] = {}
+        for rollup in db.execute(query).scalars():
+            key = {"model": rollup.model_used, "module": rollup.module, "day": rollup.day.isoformat()}[group_by]
+            group = groups.setdefault(key, {"total": 0, "positive": 0, "negative": 0, "rating_sum": 0})
+            group["total"] += rollup.total
+            group["positive"] += rollup.positive
+            group["negative"] += rollup.negative
+            group["rating_sum"] += rollup.rating_sum
+        state = db.get(FeedbackRollupState, 1)
+        results = [
+            {
+                "key": key,
+                "total": group["total"],
+                "positive": group["positive"],
+                "negative": group["negative"],
+                "avg_rating": round(group["rating_sum"] / group["total"], 4) if group["total"] else 0.0,
+                "negative_rate": round(group["negative"] / group["total"], 4) if group["total"] else 0.0,
+            }
+            for key, group in groups.items()
+        ]
+        # Days read chronologically; models and modules worst-rated first
+        if group_by == "day":
+            results.sort(key=lambda r: r["key"])
+        else:
+            results.sort(key=lambda r: (-r["negative_rate"], r["avg_rating"], -r["total"]))
+        return {
+            "since": since.isoformat(),
+            "days": days,
+            "group_by": group_by,
+            "groups": results,
+            "folded_through_id": state.last_feedback_id if state else 0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"folded": self.folded, "runs": self.runs, "errors": self.errors, "last_run": self.last_run}
+
+
+# Global feedback rollups
+feedback_rollups = FeedbackRollups()
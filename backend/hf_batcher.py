@@ -0,0 +1,145 @@
+import os
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from metrics import hf_batch_size
+from structured_log import log
+
+# A batch is sent when it reaches HF_BATCH_MAX_SIZE inputs or its first input has waited HF_BATCH_MAX_WAIT_MS
+HF_BATCH_MAX_SIZE = int(os.environ.get("HF_BATCH_MAX_SIZE", "8"))
+HF_BATCH_MAX_WAIT_MS = float(os.environ.get("HF_BATCH_MAX_WAIT_MS", "10"))
+HF_REQUEST_TIMEOUT_SECONDS = float(os.environ.get("HF_REQUEST_TIMEOUT_SECONDS", "30"))
+
+
+class HFBatchHTTPError(Exception):
+    """The batched request came back with a non-200 status; raised to every caller in the batch"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HuggingFace returned HTTP {status_code}")
+        self.status_code = status_code
+
+
+class MicroBatcher:
+    """Coalesces concurrent inference calls for one model into a single list-valued request"""
+
+    def __init__(self, url: str, max_batch: int = HF_BATCH_MAX_SIZE, max_wait_ms: float = HF_BATCH_MAX_WAIT_MS, timeout: float = HF_REQUEST_TIMEOUT_SECONDS):
+        self.url = url
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.timeout = timeout
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_seen = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def submit(self, text: str, token: str) -> Any:
+        """Queue one input and wait for its share of the batched response.
+
+        Resolves to the same shape a single {"inputs": text} call returns, so
+        callers parse it exactly as before.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, token, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            # Keep a reference so the send isn't garbage-collected mid-flight
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        self.max_seen = max(self.max_seen, len(batch))
+        hf_batch_size.observe(len(batch), model=self.url.rsplit("/", 1)[-1])
+        texts = [text for text, _, _ in batch]
+        # One request per token; in practice every caller uses the same HUGGINGFACE_TOKEN
+        token = batch[0][1]
+        try:
+            response = await self._get_client().post(
+                self.url,
+                headers={"Authorization": f"Bearer {token}"},
+                json={"inputs": texts[0] if len(texts) == 1 else texts},
+            )
+            if response.status_code != 200:
+                raise HFBatchHTTPError(response.status_code)
+            data = response.json()
+            results = [data] if len(texts) == 1 else self._split(data, len(texts))
+        except Exception as e:
+            self.errors += 1
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _split(self, data: Any, count: int) -> List[Any]:
+        """Per-input outputs, each wrapped like a single-input response ([{"generated_text": ...}])"""
+        if not isinstance(data, list) or len(data) != count:
+            log.warning("hf_batch.shape_mismatch", url=self.url, expected=count, got=len(data) if isinstance(data, list) else type(data).__name__)
+            raise ValueError("Batched response does not match the number of inputs")
+        return [item if isinstance(item, list) else [item] for item in data]
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_seen,
+            "errors": self.errors,
+            "pending": len(self._pending),
+        }
+
+
+class HFBatcherRegistry:
+    """One micro-batcher per model URL"""
+
+    def __init__(self):
+        self._batchers: Dict[str, MicroBatcher] = {}
+
+    def submit(self, url: str, text: str, token: str):
+        batcher = self._batchers.get(url)
+        if batcher is None:
+            batcher = self._batchers[url] = MicroBatcher(url)
+        return batcher.submit(text, token)
+
+    async def close(self):
+        for batcher in self._batchers.values():
+            await batcher.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {url.rsplit("/", 1)[-1]: batcher.stats() for url, batcher in self._batchers.items()}
+
+
+# Global batcher registry
+hf_batcher = HFBatcherRegistry()
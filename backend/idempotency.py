@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from shared_cache import shared_cache
+from structured_log import log
+
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "10000"))
+# How long another worker's in-flight claim on a key is honoured before this worker runs it itself
+IDEMPOTENCY_LEASE_SECONDS = float(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "60"))
+IDEMPOTENCY_POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyMismatch(Exception):
+    """The key was already used for a different request body"""
+
+
+class IdempotencyStore:
+    """Runs each (scope, Idempotency-Key) once and replays the stored result for retries.
+
+    Duplicates in this worker await the first call's future; duplicates in
+    other workers see its shared-cache lease and poll for the stored result.
+    Failed calls are not stored, so the client can retry them.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        # key -> (fingerprint, result, stored_at)
+        self._results: "OrderedDict[str, Tuple[str, Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+
+    def _key(self, scope: str, key: str) -> str:
+        return hashlib.sha1(f"{scope}\0{key}".encode()).hexdigest()
+
+    async def _lookup(self, key: str) -> Optional[Tuple[str, Any]]:
+        entry = self._results.get(key)
+        if entry is not None:
+            if time.time() - entry[2] <= self.ttl:
+                self._results.move_to_end(key)
+                return entry[0], entry[1]
+            del self._results[key]
+        stored = await shared_cache.get_async(f"idem:{key}")
+        if stored is not None:
+            self._remember(key, stored["fingerprint"], stored["result"])
+            return stored["fingerprint"], stored["result"]
+        return None
+
+    def _remember(self, key: str, fingerprint: str, result: Any):
+        self._results[key] = (fingerprint, result, time.time())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_keys:
+            self._results.popitem(last=False)
+
+    def _replay(self, found: Tuple[str, Any], fingerprint: str) -> Any:
+        if found[0] != fingerprint:
+            raise IdempotencyKeyMismatch()
+        self.replayed += 1
+        return found[1]
+
+    async def run(self, scope: str, idempotency_key: str, fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of fn() for this key, and whether it was replayed rather than executed here"""
+        key = self._key(scope, idempotency_key)
+        found = await self._lookup(key)
+        if found is not None:
+            return self._replay(found, fingerprint), True
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] != fingerprint:
+                raise IdempotencyKeyMismatch()
+            self.joined += 1
+            # Shielded so a duplicate that disconnects doesn't cancel the original call
+            return await asyncio.shield(inflight[1]), True
+
+        lease_key = f"idem_lease:{key}"
+        while not await shared_cache.add_async(lease_key, os.getpid(), ttl=IDEMPOTENCY_LEASE_SECONDS):
+            # Another worker is running this key; wait for its result or for its lease to lapse
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+            found = await self._lookup(key)
+            if found is not None:
+                return self._replay(found, fingerprint), True
+            if key in self._inflight:
+                return await self.run(scope, idempotency_key, fingerprint, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (fingerprint, future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Duplicates re-raise it; mark retrieved so an unawaited future doesn't warn
+                future.exception()
+            raise
+        else:
+            self.executed += 1
+            self._remember(key, fingerprint, result)
+            try:
+                await shared_cache.set_async(f"idem:{key}", {"fingerprint": fingerprint, "result": result}, ttl=self.ttl)
+            except Exception as e:
+                log.warning("idempotency.store_error", error=str(e))
+            future.set_result(result)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+            await shared_cache.delete_async(lease_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stored": len(self._results),
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined": self.joined,
+        }
+
+
+# Global idempotency store
+idempotency_store = IdempotencyStore()
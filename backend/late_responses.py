@@ -0,0 +1,91 @@
+import os
+import uuid
+import hashlib
+from typing import Any, Dict, Optional
+
+from shared_cache import shared_cache
+
+# How long an LLM answer that missed its deadline stays available
+HEDGE_LATE_TTL_SECONDS = float(os.environ.get("HEDGE_LATE_TTL_SECONDS", "600"))
+
+
+class LateResponseStore:
+    """LLM answers that finished after the offline fallback was returned, kept in the shared cache.
+
+    Only requests with an owner (the user, or the WebSocket session for an
+    anonymous caller; see owner_of) get one. It is readable by id
+    (GET /chat/late/{id}) by that owner alone, and served once as the answer
+    when the owner sends the same message again.
+    """
+
+    def __init__(self, ttl: float = HEDGE_LATE_TTL_SECONDS):
+        self.ttl = ttl
+        self.completed = 0
+        self.failed = 0
+        self.served = 0
+
+    def _key(self, late_id: str) -> str:
+        return f"late_response:{late_id}"
+
+    def _owner_key(self, owner: str, message: str) -> str:
+        return "late_for:" + hashlib.sha1(f"{owner}\0{message}".encode()).hexdigest()
+
+    @staticmethod
+    def owner_of(user_id: Optional[int] = None, session_id: Optional[str] = None) -> Optional[str]:
+        if user_id is not None:
+            return f"user:{user_id}"
+        if session_id:
+            return f"session:{session_id}"
+        return None
+
+    async def pending(self, owner: Optional[str], message: str) -> Optional[str]:
+        """Id for an answer still being generated, or None without an owner (nobody could read it)"""
+        if not owner:
+            return None
+        late_id = uuid.uuid4().hex
+        await shared_cache.set_async(self._key(late_id), {"status": "pending", "owner": owner}, ttl=self.ttl)
+        await shared_cache.set_async(self._owner_key(owner, message), late_id, ttl=self.ttl)
+        return late_id
+
+    async def _finish(self, late_id: str, entry: Dict[str, Any]):
+        current = await shared_cache.get_async(self._key(late_id))
+        if current is None:
+            # Expired before the provider finished
+            return
+        await shared_cache.set_async(self._key(late_id), {**entry, "owner": current["owner"]}, ttl=self.ttl)
+
+    async def complete(self, late_id: str, response: Dict[str, Any]):
+        self.completed += 1
+        await self._finish(late_id, {"status": "ready", "response": response})
+
+    async def fail(self, late_id: str):
+        self.failed += 1
+        await self._finish(late_id, {"status": "failed"})
+
+    def get(self, late_id: str, owner: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The entry if `owner` is the one it was stored under; None (as if unknown) otherwise"""
+        entry = shared_cache.get(self._key(late_id))
+        if entry is None or not owner or entry.get("owner") != owner:
+            return None
+        return entry
+
+    async def take_for(self, owner: str, message: str) -> Optional[Dict[str, Any]]:
+        """The finished late answer to this owner's message, consumed so it's served only once"""
+        owner_key = self._owner_key(owner, message)
+        late_id = await shared_cache.get_async(owner_key)
+        if late_id is None:
+            return None
+        entry = await shared_cache.get_async(self._key(late_id))
+        if not entry or entry["status"] != "ready":
+            return None
+        await shared_cache.delete_async(owner_key)
+        await shared_cache.delete_async(self._key(late_id))
+        self.served += 1
+        return entry["response"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"completed": self.completed, "failed": self.failed, "served": self.served}
+
+
+# Global late-response store
+late_responses = LateResponseStore()
@@ -1,28 +1,162 @@
-from fastapi import FastAPI, Request, Depends, HTTPException, status
+from startup import startup
+from fastapi import FastAPI, Request, Response, Header, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 import httpx
 import os
-from typing import List, Optional, Dict
+import time
+import asyncio
+import concurrent.futures
+import hashlib
+import inspect
+import functools
+from typing import Any, List, Optional, Dict, Union
 import jwt
 
-from database import get_db
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.routing import Match
+from database import get_db, SessionLocal, identity_map_stats, init_db, warm_pool, bind_user, user_session
 from models import User, Chat, Reminder, Feedback, Document, ConversationEmbedding
 from auth import (
-    get_password_hash, 
-    authenticate_user, 
+    get_password_hash_async,
+    authenticate_user_async,
     create_access_token, 
     get_user_by_email,
+    is_admin,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     SECRET_KEY,
     ALGORITHM
 )
 from ai_engine import ai_engine
+from user_cache import CachedUser, auth_user_cache
+from password_hasher import password_hasher, PasswordHasherBusy
+from responses import ORJSONResponse
+from export import iter_export_chunks
+from batch_chat import iter_batch_results, CHAT_BATCH_MAX_ITEMS, CHAT_BATCH_CONCURRENCY
+from archive import chat_archive
+from etags import resource_versions, make_etag
+import metrics
+from structured_log import log, RequestIdMiddleware
+from profiling import ProfilingMiddleware
+from memory_monitor import memory_monitor, deep_sizeof
+from shared_cache import shared_cache
+from chat_sessions import chat_sessions
+from hf_batcher import hf_batcher
+from reminder_scheduler import reminder_scheduler
+from usage import usage_meter
+from ollama_context import ollama_contexts
+from late_responses import late_responses
+from admission import AdmissionMiddleware, admission
+from idempotency import idempotency_store, IdempotencyKeyMismatch, MAX_KEY_LENGTH as MAX_IDEMPOTENCY_KEY_LENGTH
+from feedback_rollups import feedback_rollups, FEEDBACK_ANALYTICS_MAX_DAYS, GROUP_BY as FEEDBACK_GROUP_BY
+import orjson
 
-app = FastAPI()
+def _warm_password_hasher():
+    """Spawn the bcrypt workers and wait until each has built its context"""
+    done, not_done = concurrent.futures.wait(password_hasher.warm_up(), timeout=password_hasher.timeout)
+    if not_done:
+        raise RuntimeError(f"{len(not_done)} password hash workers not ready")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema first (cheap, and requests need it); everything else warms in the background behind /readyz
+    await asyncio.to_thread(init_db)
+    ai_engine.start_probe()
+    admission.start()
+    reminder_scheduler.start(SessionLocal)
+    feedback_rollups.start(SessionLocal, _feedback_module)
+    usage_meter.start(SessionLocal)
+    startup.start_warmups([
+        ("database_pool", warm_pool, True),
+        ("password_hasher", _warm_password_hasher, True),
+        # Ollama is optional (the offline model always answers), so a failed probe doesn't hold back /readyz
+        ("ollama_probe", ai_engine.sync_ollama_status, False),
+    ])
+    memory_monitor.start_sampler()
+    startup.mark_started()
+    yield
+    await startup.stop()
+    await admission.stop()
+    await ai_engine.stop_probe()
+    await reminder_scheduler.stop()
+    await feedback_rollups.stop()
+    await usage_meter.stop()
+    await hf_batcher.close()
+    memory_monitor.stop_sampler()
+    password_hasher.shutdown()
+    log.close()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+async def _profiling_allowed(auth_header: Optional[str]) -> bool:
+    """Only admins may profile; runs only for requests carrying X-Profile"""
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return False
+    token = auth_header.split(" ")[1]
+    user = await auth_user_cache.get_async(token)
+    if user is None:
+        # Cache miss: the user lookup hits the database, so keep it off the loop
+        user = await asyncio.to_thread(_ws_authenticate, token)
+    return user is not None and is_admin(user.email)
+
+def _is_async_route(scope) -> bool:
+    """Whether the matched endpoint is `async def` (runs on the loop) rather than in the threadpool"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return inspect.iscoroutinefunction(getattr(route, "endpoint", None))
+    return False
+
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware, authorize=_profiling_allowed, is_async_route=_is_async_route)
+app.add_middleware(RequestIdMiddleware)
+async def _admission_authenticated(auth_header: str) -> bool:
+    """A token admission control may trust: an auth cache hit or a valid signature (no DB lookup on the loop)"""
+    if not auth_header.startswith("Bearer "):
+        return False
+    token = auth_header.split(" ")[1]
+    if await auth_user_cache.get_async(token) is not None:
+        return True
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub") is not None
+    except jwt.PyJWTError:
+        return False
+
+# Outside metrics/profiling so a shed request costs as little as possible
+app.add_middleware(AdmissionMiddleware, authenticate=_admission_authenticated)
+
+# Queue depths and cache sizes, read only when /metrics is scraped
+metrics.registry.gauge("password_hash_queue_depth", "Password hashing jobs queued or running", lambda: password_hasher.stats()["pending"])
+metrics.registry.gauge("password_hash_rejected", "Password hashing jobs rejected because the queue was full", lambda: password_hasher.rejected)
+metrics.registry.gauge("auth_cache_entries", "Verified tokens held in the auth cache", lambda: auth_user_cache.stats()["entries"])
+metrics.registry.gauge("log_records_dropped", "Log records dropped because the log queue was full", lambda: log.dropped)
+metrics.registry.gauge("log_queue_depth", "Log records waiting for the writer thread", lambda: log.stats()["queue_depth"])
+metrics.registry.gauge("ws_chat_connections", "Open /ws/chat connections", lambda: chat_sessions.connected)
+metrics.registry.gauge("reminder_stream_subscribers", "Open /reminders/stream connections", lambda: reminder_scheduler.stats()["subscribers"])
+metrics.registry.gauge("event_loop_lag_seconds", "Smoothed event loop lag seen by admission control", lambda: admission.lag_ms / 1000)
+metrics.registry.gauge("http_requests_in_flight", "HTTP requests admitted and not yet finished", lambda: admission.in_flight)
+metrics.registry.gauge("conditional_get_not_modified", "Conditional GETs answered 304 since start", lambda: resource_versions.not_modified)
+metrics.registry.gauge("auth_cache_hit_ratio", "Auth cache hit ratio since start", lambda: auth_user_cache.stats()["hit_rate"])
+
+# Internal structures reported by the admin memory endpoint
+memory_monitor.register("ai_engine_memory", lambda: {"items": len(ai_engine.memory), "bytes": deep_sizeof(ai_engine.memory)})
+memory_monitor.register("auth_user_cache", lambda: {"entries": len(auth_user_cache._entries), "bytes": deep_sizeof(auth_user_cache._entries)})
+memory_monitor.register("log_buffer", lambda: {"records": log.stats()["queue_depth"]})
+memory_monitor.register("metrics_series", metrics.registry.series_counts)
+memory_monitor.register("db_identity_map", lambda: dict(identity_map_stats))
+memory_monitor.register("ws_chat_sessions", chat_sessions.stats)
+memory_monitor.register("hf_batcher", hf_batcher.stats)
+memory_monitor.register("reminder_scheduler", reminder_scheduler.stats)
+memory_monitor.register("usage_meter", usage_meter.stats)
+memory_monitor.register("ollama_contexts", ollama_contexts.stats)
+memory_monitor.register("admission", admission.stats)
+memory_monitor.register("resource_versions", resource_versions.stats)
+memory_monitor.register("idempotency_store", idempotency_store.stats)
+memory_monitor.register("late_responses", lambda: {**late_responses.stats(), "in_flight": len(ai_engine._late_tasks)})
 
 # Allow CORS for frontend
 app.add_middleware(
@@ -47,6 +181,19 @@ class ChatRequest(BaseModel):
     history: Optional[List[dict]] = None
     model: Optional[str] = None
     documents: Optional[List[str]] = None
+    max_latency_ms: Optional[float] = None  # Latency hint for the router when model is left open
+    deadline_ms: Optional[float] = None  # Past this, answer offline and keep the provider's answer as a late response
+
+class BatchChatItem(BaseModel):
+    message: str
+    id: Optional[Union[str, int]] = None
+    history: Optional[List[dict]] = None
+    model: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+    model: Optional[str] = None
+    concurrency: Optional[int] = None
 
 class DocumentUpload(BaseModel):
     filename: str
@@ -88,23 +235,190 @@ class FeedbackRequest(BaseModel):
     message: str
     rating: int  # 1 for positive, -1 for negative
 
+# Response models (only declared columns are read, so no lazy relationship loads)
+class MessageResponse(BaseModel):
+    message: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
+
+class StatusResponse(BaseModel):
+    status: str
+    message: str
+
+class HealthResponse(BaseModel):
+    status: str
+    timestamp: str
+    ai_engine: Optional[str] = None
+    available_models: Optional[List[str]] = None
+    default_model: Optional[str] = None
+    auth_cache: Optional[Dict] = None
+    password_hasher: Optional[Dict] = None
+    shared_cache: Optional[Dict] = None
+    router: Optional[Dict] = None
+    admission: Optional[Dict] = None
+    error: Optional[str] = None
+
+class ChatResponse(BaseModel):
+    response: str
+    model: str
+    tokens_used: int
+    provider: str
+    late_response_id: Optional[str] = None
+
+class LateResponse(BaseModel):
+    status: str
+    response: Optional[str] = None
+    model: Optional[str] = None
+    tokens_used: Optional[int] = None
+    provider: Optional[str] = None
+
+class ChatHistoryItem(BaseModel):
+    id: int
+    user_id: int
+    message: str
+    response: str
+    timestamp: datetime
+    model_used: Optional[str] = None
+    tokens_used: Optional[int] = None
+    context_length: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class ModelsResponse(BaseModel):
+    available_models: List[str]
+    default_model: str
+    model_info: Dict[str, Dict]
+
+class DocumentUploadResponse(BaseModel):
+    status: str
+    document_id: int
+
+class DocumentSummary(BaseModel):
+    id: int
+    filename: str
+    file_type: str
+    uploaded_at: datetime
+
+class UserPreferencesResponse(BaseModel):
+    communication_style: Optional[str] = None
+    study_level: Optional[str] = None
+    preferences: Optional[Dict] = None
+
+class FeedbackResponse(BaseModel):
+    status: str
+    feedback_id: int
+
+class UsageResponse(BaseModel):
+    day: str
+    requests: int
+    tokens: int
+    request_quota: Optional[int] = None
+    token_quota: Optional[int] = None
+    over_quota: bool
+
+class FeedbackGroup(BaseModel):
+    key: str
+    total: int
+    positive: int
+    negative: int
+    avg_rating: float
+    negative_rate: float
+
+class FeedbackAnalyticsResponse(BaseModel):
+    since: str
+    days: int
+    group_by: str
+    groups: List[FeedbackGroup]
+    folded_through_id: int
+
+class WarmupStatus(BaseModel):
+    status: str
+    required: bool
+    attempts: int
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    import_seconds: Optional[float] = None
+    lifespan_seconds: Optional[float] = None
+    ready_seconds: Optional[float] = None
+    warmups: Dict[str, WarmupStatus]
+
+class MemorySample(BaseModel):
+    at: Optional[float] = None
+    rss_bytes: Optional[int] = None
+    traced_bytes: Optional[int] = None
+
+class TracemallocStatus(BaseModel):
+    tracing: bool
+    traced_bytes: Optional[int] = None
+    peak_traced_bytes: Optional[int] = None
+
+class MemorySnapshotInfo(BaseModel):
+    id: int
+    label: str
+    taken_at: float
+    traced_bytes: int
+
+class MemorySummaryResponse(BaseModel):
+    rss_bytes: Optional[int] = None
+    baseline_rss_bytes: Optional[int] = None
+    growth_threshold_mb: float
+    growth_alerts: int
+    last_sample: MemorySample
+    tracemalloc: TracemallocStatus
+    snapshots: List[MemorySnapshotInfo]
+    structures: Dict[str, Any]
+
+class MemoryTracingResponse(BaseModel):
+    tracing: bool
+
+class AllocationSite(BaseModel):
+    site: str
+    size_bytes: int
+    count: int
+
+class AllocationDiff(AllocationSite):
+    size_diff_bytes: int
+    count_diff: int
+
 # Free AI Service Configuration
 HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
 HUGGINGFACE_TOKEN = os.environ.get("HUGGINGFACE_TOKEN", "")  # Optional for some models
 
-# Helper function to get current user (required for protected endpoints)
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def _resolve_user(token: str, db: Session) -> Optional[CachedUser]:
+    """Verify a token and return the user snapshot, hitting the DB only on cache misses"""
+    cached = auth_user_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    start = time.perf_counter()
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
     
     user = get_user_by_email(db, email=email)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
+        return None
+    snapshot = CachedUser.from_user(user)
+    auth_user_cache.put(token, payload, snapshot, lookup_seconds=time.perf_counter() - start)
+    return snapshot
+
+# Helper function to get current user (required for protected endpoints)
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    user = _resolve_user(credentials.credentials, db)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    # The request's session now reaches this user's shard for chats, documents and reminders
+    bind_user(db, user.id)
     return user
 
 # Helper function to get current user (optional for chat)
@@ -114,17 +428,17 @@ def get_current_user_optional(request: Request, db: Session = Depends(get_db)):
         return None
     
     token = auth_header.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-    except jwt.PyJWTError:
-        return None
-    
-    user = get_user_by_email(db, email=email)
+    user = _resolve_user(token, db)
+    if user is not None:
+        bind_user(db, user.id)
     return user
 
+# Helper function to require an admin (ADMIN_EMAILS) for diagnostics endpoints
+def get_current_admin(current_user: CachedUser = Depends(get_current_user)):
+    if not is_admin(current_user.email):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 def detect_user_character(history: Optional[List[dict]]) -> dict:
     """Analyze conversation history to infer user character traits (mood, directness, verbosity, emotional state)."""
     if not history or len(history) < 2:
@@ -383,11 +697,11 @@ def generate_ai_response(user_message: str, last_assistant: Optional[str] = None
     except Exception as e:
         return "I'm here to help you find balance and well-being. Try asking me about time management, stress relief, or anything else on your mind! If you want a joke, just ask!"
 
-@app.get("/")
+@app.get("/", response_model=MessageResponse)
 def read_root():
     return {"message": "Backend is running!"}
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse, response_model_exclude_none=True)
 def health_check():
     """Health check endpoint"""
     try:
@@ -398,7 +712,12 @@ def health_check():
             "timestamp": datetime.now().isoformat(),
             "ai_engine": "available",
             "available_models": available_models,
-            "default_model": ai_engine.default_model
+            "default_model": ai_engine.default_model,
+            "auth_cache": auth_user_cache.stats(),
+            "password_hasher": password_hasher.stats(),
+            "shared_cache": shared_cache.stats(),
+            "router": ai_engine.router.stats(),
+            "admission": admission.stats()
         }
     except Exception as e:
         return {
@@ -407,17 +726,52 @@ def health_check():
             "error": str(e)
         }
 
-@app.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
-    if db_user:
+@app.get("/livez", response_model=StatusResponse)
+def liveness():
+    """Process is up and serving; never touches the DB or providers"""
+    return {"status": "alive", "message": "ok"}
+
+@app.get("/readyz", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+def readiness(response: Response):
+    """503 until the required background warm-ups (DB pool, bcrypt workers) have succeeded"""
+    report = startup.report()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
+def _password_hasher_busy(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of request, stage and provider metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def _email_taken(db: Session, email: str) -> bool:
+    taken = get_user_by_email(db, email=email) is not None
+    # Don't hold a pooled connection while waiting on the hashing pool
+    db.rollback()
+    return taken
+
+def _add_user(db: Session, email: str, password_hash: str):
+    db.add(User(email=email, password_hash=password_hash))
+    db.commit()
+
+@app.post("/register", response_model=TokenResponse)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # Queries run in threads so the loop never waits on SQLite; only the hash goes to the process pool
+    if await asyncio.to_thread(_email_taken, db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
-    db_user = User(email=user.email, password_hash=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except PasswordHasherBusy as e:
+        raise _password_hasher_busy(e)
+    await asyncio.to_thread(_add_user, db, user.email, hashed_password)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -425,9 +779,12 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/login")
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+@app.post("/login", response_model=TokenResponse)
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+    try:
+        user = await authenticate_user_async(db, user_credentials.email, user_credentials.password)
+    except PasswordHasherBusy as e:
+        raise _password_hasher_busy(e)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -440,86 +797,328 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/chat")
-async def chat_endpoint(req: ChatRequest, current_user: Optional[User] = Depends(get_current_user_optional), db: Session = Depends(get_db)):
+def _user_context(user: Optional[CachedUser]) -> Optional[dict]:
+    if not user:
+        return None
+    return {
+        "communication_style": user.communication_style,
+        "study_level": user.study_level,
+        "preferences": user.preferences
+    }
+
+def _save_chat(db: Session, user_id: int, message: str, ai_response: dict, context_length: int):
+    """Persist one exchange plus its conversation embedding"""
+    chat = Chat(
+        user_id=user_id,
+        message=message,
+        response=ai_response["content"],
+        model_used=ai_response["model"],
+        tokens_used=ai_response["tokens_used"],
+        context_length=context_length
+    )
+    db.add(chat)
+    with metrics.stage("db_commit"):
+        db.commit()
+    resource_versions.bump("chat_history", user_id)
+    
+    # Store conversation embedding for future reference
+    conversation_text = f"User: {message}\nAssistant: {ai_response['content']}"
+    with metrics.stage("embedding"):
+        embedding = ai_engine.create_embedding(conversation_text)
+    if embedding:
+        conv_embedding = ConversationEmbedding(
+            user_id=user_id,
+            conversation_text=conversation_text,
+            embedding=embedding
+        )
+        db.add(conv_embedding)
+        with metrics.stage("db_commit"):
+            db.commit()
+
+def _idempotency_scope(request: Request, current_user: Optional[CachedUser]) -> str:
+    """Namespace for Idempotency-Keys: the user, or the client address for anonymous callers"""
+    if current_user is not None:
+        return f"user:{current_user.id}"
+    # Behind the bundled nginx, uvicorn takes this from X-Forwarded-For
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(
+    req: ChatRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: Optional[CachedUser] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """Chat with the assistant; retries carrying the same Idempotency-Key get the first result"""
+    if idempotency_key is None:
+        return await _chat(req, current_user, db)
+    if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+    fingerprint = hashlib.sha1(orjson.dumps(req.model_dump(), option=orjson.OPT_SORT_KEYS)).hexdigest()
+    try:
+        result, replayed = await idempotency_store.run(_idempotency_scope(request, current_user), idempotency_key, fingerprint,
+                                                       lambda: _chat(req, current_user, db))
+    except IdempotencyKeyMismatch:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+async def _chat(req: ChatRequest, current_user: Optional[CachedUser], db: Session) -> dict:
     try:
-        print(f"Chat request received: model={req.model}, message_length={len(req.message)}")
+        # Routed once here; generate_response gets the chosen model and doesn't ask the router again
+        model = ai_engine.select_model(req.model, req.max_latency_ms)
+        log.info("chat.request", model=model, requested_model=req.model, message_length=len(req.message), authenticated=current_user is not None)
         
         # Get user context
-        user_context = None
-        if current_user:
-            user_context = {
-                "communication_style": current_user.communication_style,
-                "study_level": current_user.study_level,
-                "preferences": current_user.preferences
-            }
+        user_context = _user_context(current_user)
         
         # Get user documents for context
         documents = []
         if current_user and req.documents:
-            user_docs = db.query(Document).filter(Document.user_id == current_user.id).all()
-            documents = [doc.content for doc in user_docs]
+            with metrics.stage("retrieval"):
+                user_docs = db.query(Document).filter(Document.user_id == current_user.id).all()
+                documents = [doc.content for doc in user_docs]
+            metrics.documents_loaded_bytes.observe(sum(len(doc or "") for doc in documents))
         
         # Generate AI response using enhanced engine
         ai_response = await ai_engine.generate_response(
             message=req.message,
             history=req.history,
-            model=req.model,
+            model=model,
             user_context=user_context,
-            documents=documents
+            documents=documents,
+            user_id=current_user.id if current_user else None,
+            deadline_ms=req.deadline_ms
         )
         
-        print(f"AI response generated: model={ai_response.get('model')}, provider={ai_response.get('provider')}")
+        log.info("chat.response", model=ai_response.get("model"), provider=ai_response.get("provider"))
         
         # Save to database if user is logged in
         if current_user:
-            chat = Chat(
-                user_id=current_user.id,
-                message=req.message,
-                response=ai_response["content"],
-                model_used=ai_response["model"],
-                tokens_used=ai_response["tokens_used"],
-                context_length=len(req.history) if req.history else 0
-            )
-            db.add(chat)
-            db.commit()
-            
-            # Store conversation embedding for future reference
-            conversation_text = f"User: {req.message}\nAssistant: {ai_response['content']}"
-            embedding = ai_engine.create_embedding(conversation_text)
-            if embedding:
-                conv_embedding = ConversationEmbedding(
-                    user_id=current_user.id,
-                    conversation_text=conversation_text,
-                    embedding=embedding
-                )
-                db.add(conv_embedding)
-                db.commit()
+            # Commits and the history version bump (shared cache) can wait on file locks; keep them off the loop
+            await asyncio.to_thread(_save_chat, db, current_user.id, req.message, ai_response, len(req.history) if req.history else 0)
         
         return {
             "response": ai_response["content"],
             "model": ai_response["model"],
             "tokens_used": ai_response["tokens_used"],
-            "provider": ai_response["provider"]
+            "provider": ai_response["provider"],
+            "late_response_id": ai_response.get("late_response_id")
         }
     except Exception as e:
         # Log the error for debugging
-        print(f"Error in chat endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("chat.error", error=str(e))
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@app.get("/models")
-def get_available_models():
+@app.post("/chat/batch")
+def chat_batch(req: BatchChatRequest, current_user: Optional[CachedUser] = Depends(get_current_user_optional)):
+    """Answer many messages concurrently, streaming one NDJSON line per item as it completes.
+
+    Lines are {"type": "result" | "error", "index", "id", ...} in completion order,
+    followed by a {"type": "summary"} line. Exchanges are saved in bulk for logged-in users.
+    """
+    if not req.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(req.items) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_ITEMS} items per batch")
+    concurrency = min(req.concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_CONCURRENCY)
+    items = [
+        {"message": item.message, "id": item.id, "history": item.history, "model": item.model or req.model}
+        for item in req.items
+    ]
+    return StreamingResponse(
+        iter_batch_results(
+            items,
+            functools.partial(user_session, current_user.id) if current_user else SessionLocal,
+            user_id=current_user.id if current_user else None,
+            user_context=_user_context(current_user),
+            concurrency=max(1, concurrency),
+        ),
+        media_type="application/x-ndjson",
+    )
+
+# WebSocket chat: the server keeps the history window, clients send only the new message
+WS_HEARTBEAT_SECONDS = float(os.environ.get("WS_HEARTBEAT_SECONDS", "20"))
+WS_MAX_MISSED_HEARTBEATS = int(os.environ.get("WS_MAX_MISSED_HEARTBEATS", "2"))
+WS_MAX_MESSAGE_CHARS = int(os.environ.get("WS_MAX_MESSAGE_CHARS", "8000"))
+WS_CHUNK_CHARS = int(os.environ.get("WS_CHUNK_CHARS", "200"))
+
+def _chunk_reply(text: str, size: int = WS_CHUNK_CHARS) -> List[str]:
+    """Split a reply into ~size-character pieces on word boundaries"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start, end)
+            if space > start:
+                end = space + 1
+        chunks.append(text[start:end])
+        start = end
+    return chunks or [""]
+
+def _ws_authenticate(token: str) -> Optional[CachedUser]:
+    db = SessionLocal()
+    try:
+        return _resolve_user(token, db)
+    finally:
+        db.close()
+
+def _ws_save_chat(user_id: int, message: str, ai_response: dict, context_length: int):
+    db = user_session(user_id)
+    try:
+        _save_chat(db, user_id, message, ai_response, context_length)
+    finally:
+        db.close()
+
+async def _ws_reply(websocket: WebSocket, session, current_user: Optional[CachedUser], message_id, text: str, model: Optional[str],
+                    max_latency_ms: Optional[float] = None, deadline_ms: Optional[float] = None):
+    session.add("user", text)
+    history = list(session.history)
+    try:
+        ai_response = await ai_engine.generate_response(
+            message=text,
+            history=history,
+            model=model,
+            user_context=_user_context(current_user),
+            user_id=current_user.id if current_user else None,
+            session_id=session.session_id,
+            max_latency_ms=max_latency_ms,
+            deadline_ms=deadline_ms
+        )
+    except Exception as e:
+        log.exception("ws.chat_error", session_id=session.session_id, error=str(e))
+        await websocket.send_json({"type": "error", "id": message_id, "detail": "Internal server error"})
+        return
+    session.add("assistant", ai_response["content"])
+    done = {
+        "type": "done",
+        "id": message_id,
+        "model": ai_response["model"],
+        "tokens_used": ai_response["tokens_used"],
+        "provider": ai_response["provider"]
+    }
+    if "late_response_id" in ai_response:
+        done["late_response_id"] = ai_response["late_response_id"]
+    # Kept until the reply is fully sent, so a client that drops mid-reply gets it on resume
+    session.undelivered = {**done, "response": ai_response["content"], "redelivered": True}
+
+    persist = None
+    if current_user:
+        persist = asyncio.ensure_future(asyncio.to_thread(_ws_save_chat, current_user.id, text, ai_response, len(history)))
+    try:
+        for chunk in _chunk_reply(ai_response["content"]):
+            await websocket.send_json({"type": "chunk", "id": message_id, "text": chunk})
+        await websocket.send_json(done)
+        session.undelivered = None
+        await shared_cache.offload(chat_sessions.save, session)
+    finally:
+        if persist is not None:
+            await persist
+
+@app.websocket("/ws/chat")
+async def websocket_chat(websocket: WebSocket, token: Optional[str] = None, session_id: Optional[str] = None):
+    """Chat over one connection: {"type": "message", "text", "model", "max_latency_ms", "deadline_ms", "id"} in, chunk/done frames out.
+
+    The first message of a new session may carry "history" to seed the server-side window.
+
+    Pass ?token= to authenticate (browsers can't set headers on WebSockets) and
+    ?session_id= from the "session" frame to resume after a reconnect.
+    """
+    current_user = None
+    if token:
+        current_user = await asyncio.to_thread(_ws_authenticate, token)
+        if current_user is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await websocket.accept()
+    session, resumed = await shared_cache.offload(chat_sessions.open, current_user.id if current_user else None, session_id)
+    chat_sessions.connected += 1
+    log.info("ws.connect", session_id=session.session_id, resumed=resumed, authenticated=current_user is not None)
+    try:
+        await websocket.send_json({"type": "session", "session_id": session.session_id, "resumed": resumed, "history_messages": len(session.history)})
+        if session.undelivered:
+            await websocket.send_json(session.undelivered)
+            session.undelivered = None
+            await shared_cache.offload(chat_sessions.save, session)
+        missed = 0
+        while True:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=WS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                missed += 1
+                if missed > WS_MAX_MISSED_HEARTBEATS:
+                    await websocket.close(code=status.WS_1001_GOING_AWAY)
+                    break
+                await websocket.send_json({"type": "ping"})
+                continue
+            missed = 0
+            if len(raw) > WS_MAX_MESSAGE_CHARS * 2:
+                await websocket.send_json({"type": "error", "detail": "Frame too large"})
+                continue
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                continue
+            kind = data.get("type") if isinstance(data, dict) else None
+            if kind == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif kind == "pong":
+                continue
+            elif kind == "message":
+                text = str(data.get("text") or "").strip()
+                if not text or len(text) > WS_MAX_MESSAGE_CHARS:
+                    await websocket.send_json({"type": "error", "id": data.get("id"), "detail": f"Message must be 1-{WS_MAX_MESSAGE_CHARS} characters"})
+                    continue
+                if not session.history and isinstance(data.get("history"), list):
+                    # A conversation picked up from the client's local history seeds the window once
+                    for item in data["history"][-session.history.maxlen:]:
+                        if isinstance(item, dict) and item.get("sender") in ("user", "assistant"):
+                            session.add(item["sender"], str(item.get("text") or "")[:WS_MAX_MESSAGE_CHARS])
+                hints = {}
+                for hint in ("max_latency_ms", "deadline_ms"):
+                    value = data.get(hint)
+                    if isinstance(value, (int, float)) and value > 0:
+                        hints[hint] = value
+                await _ws_reply(websocket, session, current_user, data.get("id"), text, data.get("model"), **hints)
+            else:
+                await websocket.send_json({"type": "error", "detail": "Unknown frame type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_sessions.connected -= 1
+        await shared_cache.offload(chat_sessions.save, session)
+        log.info("ws.disconnect", session_id=session.session_id)
+
+# Conditional GETs: the frontend re-fetches these on every view, so unchanged ones get a bodiless 304
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set the validator headers; returns the 304 to send when the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    response.headers.update(headers)
+    if resource_versions.check(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return None
+
+@app.get("/models", response_model=ModelsResponse)
+def get_available_models(request: Request, response: Response):
     """Get list of available AI models"""
+    available_models = ai_engine.get_available_models()
+    # The same for every user; only the Ollama probe and HuggingFace token change it
+    not_modified = _not_modified(request, response, make_etag("models", ai_engine.default_model, *available_models))
+    if not_modified is not None:
+        return not_modified
     return {
-        "available_models": ai_engine.get_available_models(),
+        "available_models": available_models,
         "default_model": ai_engine.default_model,
-        "model_info": ai_engine.models
+        "model_info": ai_engine.free_models
     }
 
-@app.post("/documents/upload")
-def upload_document(doc: DocumentUpload, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.post("/documents/upload", response_model=DocumentUploadResponse)
+def upload_document(doc: DocumentUpload, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Upload and process a document for context"""
     try:
         # Create document record
@@ -538,15 +1137,22 @@ def upload_document(doc: DocumentUpload, current_user: User = Depends(get_curren
         db.add(document)
         db.commit()
         db.refresh(document)
+        resource_versions.bump("documents", current_user.id)
         
         return {"status": "success", "document_id": document.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
-@app.get("/documents")
-def get_user_documents(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/documents", response_model=List[DocumentSummary])
+def get_user_documents(request: Request, response: Response, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get user's uploaded documents"""
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
+    not_modified = _not_modified(request, response, resource_versions.etag("documents", current_user.id))
+    if not_modified is not None:
+        return not_modified
+    # Only the summary columns; the full document content is never loaded here
+    documents = db.query(
+        Document.id, Document.filename, Document.file_type, Document.uploaded_at
+    ).filter(Document.user_id == current_user.id).all()
     return [
         {
             "id": doc.id,
@@ -557,66 +1163,213 @@ def get_user_documents(current_user: User = Depends(get_current_user), db: Sessi
         for doc in documents
     ]
 
-@app.put("/user/preferences")
-def update_user_preferences(prefs: UserPreferences, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.put("/user/preferences", response_model=StatusResponse)
+def update_user_preferences(prefs: UserPreferences, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update user preferences and settings"""
     try:
+        user = db.query(User).filter(User.id == current_user.id).first()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
         if prefs.communication_style:
-            current_user.communication_style = prefs.communication_style
+            user.communication_style = prefs.communication_style
         if prefs.study_level:
-            current_user.study_level = prefs.study_level
+            user.study_level = prefs.study_level
         if prefs.preferences:
-            current_user.preferences.update(prefs.preferences)
+            # Reassign so the JSON column is flagged as modified
+            user.preferences = {**(user.preferences or {}), **prefs.preferences}
         
         db.commit()
+        # Cached snapshots hold the old profile fields
+        auth_user_cache.invalidate_user(user.email)
+        resource_versions.bump("preferences", current_user.id)
         return {"status": "success", "message": "Preferences updated"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating preferences: {str(e)}")
 
-@app.get("/user/preferences")
-def get_user_preferences(current_user: User = Depends(get_current_user)):
+@app.get("/user/preferences", response_model=UserPreferencesResponse)
+def get_user_preferences(request: Request, response: Response, current_user: CachedUser = Depends(get_current_user)):
     """Get user preferences and settings"""
-    return {
+    payload = {
         "communication_style": current_user.communication_style,
         "study_level": current_user.study_level,
         "preferences": current_user.preferences
     }
+    # Served from the auth snapshot, which in another worker can lag a write by AUTH_CACHE_SYNC_SECONDS;
+    # hashing it into the tag keeps a stale copy from being pinned under the new version
+    snapshot = hashlib.sha1(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    not_modified = _not_modified(request, response, resource_versions.etag("preferences", current_user.id, snapshot))
+    if not_modified is not None:
+        return not_modified
+    return payload
+
+@app.get("/chat/late/{late_response_id}", response_model=LateResponse, responses={202: {"model": LateResponse}})
+def get_late_response(late_response_id: str, response: Response, session_id: Optional[str] = None,
+                      current_user: Optional[CachedUser] = Depends(get_current_user_optional)):
+    """Provider answer for a chat that was answered offline after missing its deadline.
+
+    Only its owner can read it: the same user, or for an anonymous WebSocket
+    chat, the caller passing that ?session_id=. Anyone else gets 404.
+    """
+    owner = late_responses.owner_of(current_user.id if current_user else None, session_id)
+    entry = late_responses.get(late_response_id, owner)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired late response")
+    if entry["status"] == "pending":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"status": "pending"}
+    if entry["status"] == "failed":
+        return {"status": "failed"}
+    answer = entry["response"]
+    return {
+        "status": "ready",
+        "response": answer["content"],
+        "model": answer["model"],
+        "tokens_used": answer["tokens_used"],
+        "provider": answer["provider"]
+    }
 
-@app.get("/chat/history")
-def get_chat_history(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/usage", response_model=UsageResponse)
+def get_usage(current_user: CachedUser = Depends(get_current_user)):
+    """Today's request and token usage against the daily quotas"""
+    return usage_meter.quota_status(current_user.id)
+
+@app.get("/chat/history", response_model=List[ChatHistoryItem])
+def get_chat_history(request: Request, response: Response, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    not_modified = _not_modified(request, response, resource_versions.etag("chat_history", current_user.id))
+    if not_modified is not None:
+        return not_modified
     chats = db.query(Chat).filter(Chat.user_id == current_user.id).order_by(Chat.timestamp.desc()).limit(50).all()
+    # Top up from the archive once the hot rows run out
+    if len(chats) < 50:
+        chats = chats + chat_archive.recent_chats(current_user.id, 50 - len(chats))
     return chats
 
-@app.post("/reminders")
-def create_reminder(reminder: ReminderCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/export")
+def export_user_data(compress: Optional[str] = None, current_user: CachedUser = Depends(get_current_user)):
+    """Stream all of the user's chats, reminders and document metadata as NDJSON"""
+    gzip = compress == "gzip"
+    filename = f"ai-study-assistant-export-{current_user.id}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        iter_export_chunks(functools.partial(user_session, current_user.id), current_user.id, current_user.email, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# Comment lines sent on idle reminder streams so proxies don't time them out
+REMINDER_SSE_KEEPALIVE_SECONDS = float(os.environ.get("REMINDER_SSE_KEEPALIVE_SECONDS", "15"))
+
+@app.post("/reminders", response_model=ReminderResponse)
+def create_reminder(reminder: ReminderCreate, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    due_date = reminder.due_date
+    if due_date.tzinfo is not None:
+        # Stored naive in UTC, like every other timestamp column
+        due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
     db_reminder = Reminder(
         user_id=current_user.id,
         title=reminder.title,
         description=reminder.description,
-        due_date=reminder.due_date
+        due_date=due_date
     )
     db.add(db_reminder)
     db.commit()
     db.refresh(db_reminder)
+    resource_versions.bump("reminders", current_user.id)
+    reminder_scheduler.reminder_created(db_reminder)
     return db_reminder
 
-@app.get("/reminders")
-def get_reminders(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    reminders = db.query(Reminder).filter(Reminder.user_id == current_user.id).order_by(Reminder.due_date).all()
-    return reminders
+@app.get("/reminders/stream")
+async def stream_reminders(request: Request, token: Optional[str] = None):
+    """Server-sent events: one `reminder` event per reminder as it comes due.
+
+    EventSource can't set headers, so the token may also be passed as ?token=.
+    """
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+    current_user = await asyncio.to_thread(_ws_authenticate, token) if token else None
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = current_user.id
+    queue = reminder_scheduler.subscribe(user_id)
+
+    async def events():
+        try:
+            yield b"event: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=REMINDER_SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: reminder\ndata: " + orjson.dumps(event) + b"\n\n"
+        finally:
+            reminder_scheduler.unsubscribe(user_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/reminders", response_model=List[ReminderResponse])
+def get_reminders(request: Request, response: Response, completed: Optional[bool] = None, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    not_modified = _not_modified(request, response, resource_versions.etag("reminders", current_user.id, completed))
+    if not_modified is not None:
+        return not_modified
+    query = db.query(Reminder).filter(Reminder.user_id == current_user.id)
+    if completed is not None:
+        query = query.filter(Reminder.completed == completed)
+    return query.order_by(Reminder.due_date).all()
 
-@app.put("/reminders/{reminder_id}/complete")
-def complete_reminder(reminder_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.put("/reminders/{reminder_id}/complete", response_model=ReminderResponse)
+def complete_reminder(reminder_id: int, current_user: CachedUser = Depends(get_current_user), db: Session = Depends(get_db)):
     reminder = db.query(Reminder).filter(Reminder.id == reminder_id, Reminder.user_id == current_user.id).first()
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
     
     reminder.completed = True
     db.commit()
+    resource_versions.bump("reminders", current_user.id)
+    reminder_scheduler.reminder_completed(reminder.id)
     return reminder 
 
+# Admin memory diagnostics (tracemalloc snapshots, diffs and structure sizes)
+@app.get("/admin/memory", response_model=MemorySummaryResponse)
+def admin_memory_summary(current_user: CachedUser = Depends(get_current_admin)):
+    """RSS, tracemalloc state, stored snapshots and sizes of internal structures"""
+    return memory_monitor.summary()
+
+@app.post("/admin/memory/tracing", response_model=MemoryTracingResponse)
+def admin_memory_tracing(enabled: bool = True, current_user: CachedUser = Depends(get_current_admin)):
+    """Start or stop tracemalloc (stopping discards stored snapshots)"""
+    if enabled:
+        memory_monitor.start_tracing()
+    else:
+        memory_monitor.stop_tracing()
+    return {"tracing": enabled}
+
+@app.post("/admin/memory/snapshots", response_model=MemorySnapshotInfo)
+def admin_memory_snapshot(label: str = "", current_user: CachedUser = Depends(get_current_admin)):
+    """Take a tracemalloc snapshot (starts tracing if needed)"""
+    return memory_monitor.take_snapshot(label)
+
+@app.get("/admin/memory/snapshots/{snapshot_id}/diff", response_model=List[AllocationDiff])
+def admin_memory_diff(snapshot_id: int, against: Optional[int] = None, limit: int = 20, group_by: str = "lineno", current_user: CachedUser = Depends(get_current_admin)):
+    """Allocation-site growth from a snapshot to another snapshot (or to now)"""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return memory_monitor.diff(snapshot_id, against, limit=limit, group_by=group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found")
+
+@app.get("/admin/memory/top", response_model=List[AllocationSite])
+def admin_memory_top(limit: int = 20, group_by: str = "lineno", current_user: CachedUser = Depends(get_current_admin)):
+    """Current top allocation sites (empty unless tracing)"""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return memory_monitor.top_allocations(limit=limit, group_by=group_by)
+
 # Endpoint to receive feedback on assistant messages
-@app.post("/feedback")
+@app.post("/feedback", response_model=FeedbackResponse)
 def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)):
     fb = Feedback(
         chat_id=feedback.chat_id,
@@ -626,4 +1379,22 @@ def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)):
     db.add(fb)
     db.commit()
     db.refresh(fb)
-    return {"status": "success", "feedback_id": fb.id} 
\ No newline at end of file
+    feedback_rollups.fold_after_insert(db)
+    return {"status": "success", "feedback_id": fb.id}
+
+def _feedback_module(message: str) -> str:
+    """Conversation module a rated exchange belongs to, from the user's message"""
+    return select_conversation_module(message, detect_user_character(None))
+
+@app.get("/analytics/feedback", response_model=FeedbackAnalyticsResponse)
+def feedback_analytics(days: int = 7, group_by: str = "model", model: Optional[str] = None, module: Optional[str] = None,
+                       current_user: CachedUser = Depends(get_current_admin), db: Session = Depends(get_db)):
+    """Feedback totals and rating rates per model, module or day, read from the rollup tables"""
+    if group_by not in FEEDBACK_GROUP_BY:
+        raise HTTPException(status_code=400, detail="group_by must be model, module or day")
+    if not 1 <= days <= FEEDBACK_ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {FEEDBACK_ANALYTICS_MAX_DAYS}")
+    return feedback_rollups.summary(db, days, group_by, model=model, module=module)
+
+# Keep last: everything above is part of the measured import
+startup.mark_imported()
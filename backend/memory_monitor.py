@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import types
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from structured_log import log
+
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", "10"))
+MEMORY_MAX_SNAPSHOTS = int(os.environ.get("MEMORY_MAX_SNAPSHOTS", "5"))
+MEMORY_SAMPLE_INTERVAL_SECONDS = float(os.environ.get("MEMORY_SAMPLE_INTERVAL_SECONDS", "60"))
+MEMORY_GROWTH_THRESHOLD_MB = float(os.environ.get("MEMORY_GROWTH_THRESHOLD_MB", "100"))
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux /proc; falls back to peak RSS elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def deep_sizeof(obj: Any, max_items: int = 100000) -> int:
+    """Approximate retained size of a container graph, visiting each object once"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    visited = 0
+    while stack and visited < max_items:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        visited += 1
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        elif isinstance(current, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+            continue
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        elif hasattr(current, "__slots__"):
+            stack.extend(getattr(current, slot) for slot in current.__slots__ if hasattr(current, slot))
+    return total
+
+
+class MemoryMonitor:
+    """tracemalloc snapshots/diffs, sizes of registered structures and a growth sampler"""
+
+    def __init__(self):
+        self._snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._sizers: Dict[str, Callable[[], Any]] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.baseline_rss: Optional[int] = None
+        self.last_sample: Dict[str, Any] = {}
+        self.growth_alerts = 0
+
+    # Structure sizes
+
+    def register(self, name: str, sizer: Callable[[], Any]):
+        """Register a callback reporting the size of an internal structure"""
+        self._sizers[name] = sizer
+
+    def structure_sizes(self) -> Dict[str, Any]:
+        sizes = {}
+        for name, sizer in self._sizers.items():
+            try:
+                sizes[name] = sizer()
+            except Exception as e:
+                sizes[name] = {"error": str(e)}
+        return sizes
+
+    # tracemalloc
+
+    def start_tracing(self, frames: int = MEMORY_TRACE_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def take_snapshot(self, label: str = "") -> Dict[str, Any]:
+        """Store a filtered snapshot; the oldest is dropped beyond MEMORY_MAX_SNAPSHOTS"""
+        self.start_tracing()
+        snapshot = self._snapshot()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = {
+                "id": snapshot_id,
+                "label": label,
+                "taken_at": time.time(),
+                "snapshot": snapshot,
+                "traced_bytes": tracemalloc.get_traced_memory()[0],
+            }
+            while len(self._snapshots) > MEMORY_MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return self._describe(self._snapshots[snapshot_id])
+
+    @staticmethod
+    def _snapshot():
+        # Leave out tracemalloc's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def _describe(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._describe(entry) for entry in self._snapshots.values()]
+
+    def _get(self, snapshot_id: int):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(snapshot_id)
+        return entry["snapshot"]
+
+    def diff(self, from_id: int, to_id: Optional[int] = None, limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """Top allocation-site changes between two snapshots (or a snapshot and now)"""
+        old = self._get(from_id)
+        new = self._get(to_id) if to_id is not None else self._snapshot()
+        stats = new.compare_to(old, group_by)
+        return [
+            {
+                "site": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def top_allocations(self, limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        if not tracemalloc.is_tracing():
+            return []
+        stats = self._snapshot().statistics(group_by)
+        return [
+            {"site": str(stat.traceback[0]) if stat.traceback else "?", "size_bytes": stat.size, "count": stat.count}
+            for stat in stats[:limit]
+        ]
+
+    # Periodic sampler
+
+    def _sample(self):
+        rss = rss_bytes()
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        self.last_sample = {"at": time.time(), "rss_bytes": rss, "traced_bytes": traced[0] if traced else None}
+        if rss is None:
+            return
+        if self.baseline_rss is None:
+            self.baseline_rss = rss
+            return
+        growth_mb = (rss - self.baseline_rss) / (1024 * 1024)
+        if growth_mb >= MEMORY_GROWTH_THRESHOLD_MB:
+            self.growth_alerts += 1
+            log.warning(
+                "memory.growth",
+                rss_bytes=rss,
+                growth_mb=round(growth_mb, 1),
+                threshold_mb=MEMORY_GROWTH_THRESHOLD_MB,
+                structures=self.structure_sizes(),
+                top_allocations=self.top_allocations(limit=5),
+            )
+            # Re-arm from the new level so a steady leak keeps alerting once per threshold step
+            self.baseline_rss = rss
+
+    def _sample_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self._sample()
+            except Exception as e:
+                log.error("memory.sample_error", error=str(e))
+
+    def start_sampler(self, interval: float = MEMORY_SAMPLE_INTERVAL_SECONDS):
+        if self._sampler is None and interval > 0:
+            self._sample()
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, args=(interval,), name="memory-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop_sampler(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join(timeout=2.0)
+            self._sampler = None
+
+    def summary(self) -> Dict[str, Any]:
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        return {
+            "rss_bytes": rss_bytes(),
+            "baseline_rss_bytes": self.baseline_rss,
+            "growth_threshold_mb": MEMORY_GROWTH_THRESHOLD_MB,
+            "growth_alerts": self.growth_alerts,
+            "last_sample": self.last_sample,
+            "tracemalloc": {
+                "tracing": tracemalloc.is_tracing(),
+                "traced_bytes": traced[0] if traced else None,
+                "peak_traced_bytes": traced[1] if traced else None,
+            },
+            "snapshots": self.list_snapshots(),
+            "structures": self.structure_sizes(),
+        }
+
+
+# Global memory monitor instance
+memory_monitor = MemoryMonitor()
@@ -0,0 +1,241 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from profiling import current_profile
+
+# Latency buckets in seconds, from fast DB reads up to the 30 s provider timeout
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._series.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time, so the hot path never touches it"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, help, callback))
+
+    def series_counts(self) -> Dict[str, int]:
+        """Label combinations held per metric (grows with route/provider cardinality)"""
+        return {name: len(getattr(metric, "_values", getattr(metric, "_series", {}))) for name, metric in self._metrics.items() if not isinstance(metric, Gauge)}
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics recorded across the app
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+stage_latency = registry.histogram(
+    "chat_stage_duration_seconds", "Latency of each /chat stage", ("stage",)
+)
+provider_latency = registry.histogram(
+    "provider_request_duration_seconds", "Latency of each AI provider call", ("provider",)
+)
+provider_requests = registry.counter(
+    "provider_requests_total", "AI provider calls by outcome", ("provider", "outcome")
+)
+documents_loaded_bytes = registry.histogram(
+    "chat_documents_loaded_bytes", "Bytes of document content loaded into memory per /chat request", (),
+    buckets=(1024, 16384, 131072, 1048576, 8388608, 67108864),
+)
+hf_batch_size = registry.histogram(
+    "hf_batch_size", "Inputs per micro-batched HuggingFace request", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+ollama_prompt_tokens = registry.histogram(
+    "ollama_prompt_tokens", "Prompt tokens Ollama had to prefill per call, by whether a session context was reused", ("context_reuse",),
+    buckets=(16, 64, 256, 1024, 4096, 16384),
+)
+ollama_prefill_seconds = registry.histogram(
+    "ollama_prefill_seconds", "Ollama prompt evaluation time per call, by whether a session context was reused", ("context_reuse",)
+)
+router_decisions = registry.counter(
+    "router_decisions_total", "Models picked by the latency-aware router for requests that don't name one", ("model", "reason")
+)
+fallbacks = registry.counter(
+    "provider_fallbacks_total", "Responses served by the offline fallback instead of the requested provider", ("provider", "reason")
+)
+admission_shed = registry.counter(
+    "admission_shed_total", "Requests rejected with 503 by admission control", ("priority", "reason")
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time one stage of the chat pipeline: with stage("retrieval"): ..."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_latency.observe(elapsed, stage=name)
+        # Also feed the per-request Server-Timing breakdown when profiling is on
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(name, elapsed)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            # Use the route template so /reminders/{reminder_id}/complete stays one series
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_latency.observe(elapsed, method=scope["method"], route=route_path)
+            http_requests.inc(method=scope["method"], route=route_path, status=status_holder["status"])
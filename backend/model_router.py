@@ -0,0 +1,101 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from metrics import router_decisions
+from structured_log import log
+
+# Off by default: requests that don't name a model keep getting the offline model
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "false").lower() in ("1", "true", "yes")
+# Latency a routed request should be answered within, unless the request passes max_latency_ms
+ROUTER_SLO_MS = float(os.environ.get("ROUTER_SLO_MS", "5000"))
+# Calls remembered per model; older than ROUTER_WINDOW_SECONDS they are forgotten so a recovered provider is retried
+ROUTER_WINDOW_SIZE = int(os.environ.get("ROUTER_WINDOW_SIZE", "100"))
+ROUTER_WINDOW_SECONDS = float(os.environ.get("ROUTER_WINDOW_SECONDS", "300"))
+# Each older call counts this much less than the one after it, so a provider that slows down loses traffic quickly
+ROUTER_DECAY = float(os.environ.get("ROUTER_DECAY", "0.9"))
+# A model must estimate strictly above this chance of meeting the SLO, or the offline model answers
+ROUTER_MIN_SUCCESS = float(os.environ.get("ROUTER_MIN_SUCCESS", "0.5"))
+# Every Nth decision goes to a model with no calls in the window, so unseen providers collect data (0 = never)
+ROUTER_EXPLORE_EVERY = int(os.environ.get("ROUTER_EXPLORE_EVERY", "20"))
+OFFLINE_MODEL = "fallback-enhanced"
+
+
+class ModelRouter:
+    """Rolling latency/error window per model, used to route requests that don't name a model.
+
+    A model's chance of answering within the SLO is estimated as
+    (calls that succeeded within it + 1) / (calls + 2), with calls weighted by
+    ROUTER_DECAY per newer call. An unseen model starts at 0.5, which doesn't
+    pass the default ROUTER_MIN_SUCCESS, so every explore_every-th decision is
+    spent on a model with no recent calls instead; one fast answer puts it above
+    the threshold. A model that starts timing out or failing drops out within a
+    few calls; once its samples age out of the window it is back to unseen and
+    gets explored again.
+    """
+
+    def __init__(self, models: List[str], window_size: int = ROUTER_WINDOW_SIZE, window_seconds: float = ROUTER_WINDOW_SECONDS,
+                 explore_every: int = ROUTER_EXPLORE_EVERY):
+        self.window_seconds = window_seconds
+        self.explore_every = explore_every
+        # model -> deque of (finished_at, latency_ms, ok)
+        self._calls: Dict[str, Deque[Tuple[float, float, bool]]] = {model: deque(maxlen=window_size) for model in models}
+        self._lock = threading.Lock()
+        self.decisions = 0
+
+    def record(self, model: str, latency_ms: float, ok: bool):
+        with self._lock:
+            calls = self._calls.get(model)
+            if calls is not None:
+                calls.append((time.time(), latency_ms, ok))
+
+    def _recent(self, model: str, now: float) -> List[Tuple[float, float, bool]]:
+        with self._lock:
+            return [call for call in self._calls.get(model, ()) if now - call[0] <= self.window_seconds]
+
+    def estimate(self, model: str, slo_ms: float, now: Optional[float] = None) -> Dict[str, Any]:
+        calls = self._recent(model, now or time.time())
+        within = weight = 0.0
+        for age, (_, latency_ms, ok) in enumerate(reversed(calls)):
+            w = ROUTER_DECAY ** age
+            weight += w
+            within += w if ok and latency_ms <= slo_ms else 0.0
+        latencies = sorted(latency_ms for _, latency_ms, _ in calls)
+        return {
+            "p_within_slo": round((within + 1) / (weight + 2), 4),
+            "samples": len(calls),
+            "error_rate": round(sum(1 for call in calls if not call[2]) / len(calls), 4) if calls else None,
+            "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else None,
+        }
+
+    def choose(self, available: List[str], max_latency_ms: Optional[float] = None) -> str:
+        """Pick the available model most likely to answer within the SLO; log the decision"""
+        slo_ms = max_latency_ms if max_latency_ms and max_latency_ms > 0 else ROUTER_SLO_MS
+        now = time.time()
+        # Earlier entries in free_models win ties
+        candidates = {model: self.estimate(model, slo_ms, now) for model in self._calls if model in available and model != OFFLINE_MODEL}
+        chosen, reason = OFFLINE_MODEL, "no_candidates"
+        unseen = [model for model in candidates if candidates[model]["samples"] == 0]
+        if unseen and self.explore_every > 0 and (self.decisions + 1) % self.explore_every == 0:
+            chosen, reason = unseen[0], "explore"
+        elif candidates:
+            best = max(candidates, key=lambda model: candidates[model]["p_within_slo"])
+            if candidates[best]["p_within_slo"] > ROUTER_MIN_SUCCESS:
+                chosen, reason = best, "best_estimate"
+            else:
+                reason = "below_min_success"
+        self.decisions += 1
+        router_decisions.inc(model=chosen, reason=reason)
+        log.info("router.decision", chosen=chosen, reason=reason, slo_ms=slo_ms, candidates=candidates)
+        return chosen
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "decisions": self.decisions,
+            "slo_ms": ROUTER_SLO_MS,
+            "models": {model: self.estimate(model, ROUTER_SLO_MS, now) for model in self._calls},
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, Float, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -48,6 +48,47 @@ class Feedback(Base):
 
     chat = relationship("Chat", back_populates="feedback")
 
+class FeedbackRollup(Base):
+    """Feedback counts per day, model and conversation module, folded in from `feedback` by id"""
+    __tablename__ = "feedback_rollups"
+
+    day = Column(Date, primary_key=True)
+    model_used = Column(String, primary_key=True)
+    module = Column(String, primary_key=True)
+    total = Column(Integer, default=0)
+    positive = Column(Integer, default=0)
+    negative = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class FeedbackRollupState(Base):
+    """Single row: every feedback id up to last_feedback_id is counted in feedback_rollups"""
+    __tablename__ = "feedback_rollup_state"
+
+    id = Column(Integer, primary_key=True)
+    last_feedback_id = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class UsageRollup(Base):
+    """Per-user daily request and token totals, flushed from the in-memory usage meter"""
+    __tablename__ = "usage_rollups"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    requests = Column(Integer, default=0)
+    tokens = Column(Integer, default=0)
+    degraded = Column(Integer, default=0)  # Requests served by fallback-enhanced because the user was over quota
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ShardLayout(Base):
+    """Single row: how many shard files hold per-user tables (0 = this database) and the layout's epoch"""
+    __tablename__ = "shard_layout"
+
+    id = Column(Integer, primary_key=True)
+    shards = Column(Integer, default=0)
+    epoch = Column(Integer, default=0)  # Bumped by each rebalance; new rows get ids above every earlier epoch's
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class Document(Base):
     __tablename__ = "documents"
     
@@ -84,4 +125,7 @@ class Reminder(Base):
     completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    user = relationship("User", back_populates="reminders") 
\ No newline at end of file
+    user = relationship("User", back_populates="reminders")
+
+    # The reminder scheduler pages open reminders by due date
+    __table_args__ = (Index("ix_reminders_open_due", "completed", "due_date", "id"),)
\ No newline at end of file
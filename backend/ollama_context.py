@@ -0,0 +1,68 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ollama's returned `context` is the token state of the whole conversation so far; resending it
+# lets the model skip re-prefilling the system prompt and history on every turn
+OLLAMA_CONTEXT_MAX_SESSIONS = int(os.environ.get("OLLAMA_CONTEXT_MAX_SESSIONS", "1000"))
+# Past this many tokens the session restarts from a fresh prompt (keep below the model's num_ctx)
+OLLAMA_CONTEXT_MAX_TOKENS = int(os.environ.get("OLLAMA_CONTEXT_MAX_TOKENS", "3072"))
+OLLAMA_CONTEXT_TTL_SECONDS = float(os.environ.get("OLLAMA_CONTEXT_TTL_SECONDS", "1800"))
+
+
+class OllamaContextStore:
+    """LRU of Ollama contexts per chat session, keyed to the prompt prefix they were built from"""
+
+    def __init__(self, max_sessions: int = OLLAMA_CONTEXT_MAX_SESSIONS, max_tokens: int = OLLAMA_CONTEXT_MAX_TOKENS, ttl: float = OLLAMA_CONTEXT_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        # session_id -> (prefix_key, context, stored_at)
+        self._contexts: "OrderedDict[str, Tuple[str, List[int], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    def get(self, session_id: str, prefix_key: str) -> Optional[List[int]]:
+        """Context to continue from, or None when the session is new, expired or its prefix changed"""
+        with self._lock:
+            entry = self._contexts.get(session_id)
+            if entry is None or time.time() - entry[2] > self.ttl:
+                self.misses += 1
+                return None
+            if entry[0] != prefix_key:
+                # Style, level or profile changed: the cached system prompt is stale
+                del self._contexts[session_id]
+                self.resets += 1
+                return None
+            self._contexts.move_to_end(session_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, session_id: str, prefix_key: str, context: Optional[List[int]]):
+        with self._lock:
+            if not context or len(context) > self.max_tokens:
+                if self._contexts.pop(session_id, None) is not None:
+                    self.resets += 1
+                return
+            self._contexts[session_id] = (prefix_key, context, time.time())
+            self._contexts.move_to_end(session_id)
+            while len(self._contexts) > self.max_sessions:
+                self._contexts.popitem(last=False)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._contexts.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tokens = sum(len(entry[1]) for entry in self._contexts.values())
+            sessions = len(self._contexts)
+        return {"sessions": sessions, "tokens": tokens, "hits": self.hits, "misses": self.misses, "resets": self.resets}
+
+
+# Global Ollama context store
+ollama_contexts = OllamaContextStore()
@@ -0,0 +1,154 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+from passlib.context import CryptContext
+
+# Password hashing settings
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+
+def build_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    """CryptContext whose cost factor marks hashes with other costs as needing an update"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Per-process context, built lazily inside pool workers
+_worker_contexts: Dict[int, CryptContext] = {}
+
+
+def _worker_context(rounds: int) -> CryptContext:
+    context = _worker_contexts.get(rounds)
+    if context is None:
+        context = _worker_contexts[rounds] = build_context(rounds)
+    return context
+
+
+def _hash_in_worker(password: str, rounds: int) -> str:
+    return _worker_context(rounds).hash(password)
+
+
+def _verify_in_worker(password: str, hashed: str, rounds: int) -> Dict[str, Any]:
+    """Verify and, if the stored cost is stale, produce the replacement hash in the same job"""
+    context = _worker_context(rounds)
+    valid, new_hash = context.verify_and_update(password, hashed)
+    return {"valid": valid, "new_hash": new_hash}
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full, a job exceeds its timeout or the workers had to be restarted"""
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so login bursts can't starve the request threadpool"""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+        timeout: float = PASSWORD_HASH_TIMEOUT_SECONDS,
+        rounds: int = BCRYPT_ROUNDS,
+    ):
+        self.workers = max(1, workers)
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.rounds = rounds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.rehashed = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn avoids forking a process that already runs the event loop threads
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a pool whose worker died (crash, OOM kill); the next job starts a fresh one"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+                self.restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def _submit(self, fn, *args):
+        with self._pending_lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self._pending += 1
+        pool = self._get_pool()
+        try:
+            job = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release()
+            self._discard_pool(pool)
+            raise PasswordHasherBusy("Password hashing workers are restarting")
+        # Released when the worker finishes, not when we stop waiting: a timed-out job still holds a worker
+        job.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PasswordHasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise PasswordHasherBusy("Password hashing worker died")
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash_in_worker, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Dict[str, Any]:
+        """Return {"valid": bool, "new_hash": str | None}; new_hash is set when the cost factor changed"""
+        result = await self._submit(_verify_in_worker, password, hashed, self.rounds)
+        if result["new_hash"]:
+            self.rehashed += 1
+        return result
+
+    def warm_up(self):
+        """Start the worker processes ahead of the first login"""
+        pool = self._get_pool()
+        return [pool.submit(_worker_context, self.rounds) for _ in range(self.workers)]
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self._pending,
+            "rounds": self.rounds,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "rehashed": self.rehashed,
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
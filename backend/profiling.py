@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import types
+import uuid
+import cProfile
+import threading
+import contextvars
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from structured_log import log
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+# X-Profile-Scope values: what a cprofile/stack dump covers
+SCOPE_REQUEST_TASK = "request-task; event-loop steps of this request only, child tasks and threadpool work excluded"
+SCOPE_TIMINGS_ONLY = "timings-only; sync endpoint runs in the threadpool, which cprofile/stack can't attribute to one request"
+
+# Profile of the request being handled; None (the default) means profiling is off
+current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Stage timings collected for one profiled request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float):
+        self.stages.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; repeated stages are summed"""
+        totals: Dict[str, List[float]] = {}
+        for name, seconds in self.stages:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        parts = []
+        for name, (seconds, count) in totals.items():
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+@types.coroutine
+def run_in_steps(coro, enter: Callable[[], None], leave: Callable[[], None]):
+    """Await `coro`, calling enter()/leave() around each step it runs on the loop.
+
+    Other tasks run while `coro` is suspended, between leave() and the next
+    enter(), so whatever is switched on in enter() sees only this coroutine.
+    """
+    value, error = None, None
+    while True:
+        enter()
+        try:
+            yielded = coro.throw(error) if error is not None else coro.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            leave()
+        try:
+            value, error = (yield yielded), None
+        except BaseException as e:
+            value, error = None, e
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts, while `active`"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.active = False
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def dump(self, path: str):
+        """Collapsed-stack format, readable by flamegraph.pl and speedscope"""
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """Opt-in per-request profiling for admins, enabled by the X-Profile header.
+
+    X-Profile: 1        stage timings in a Server-Timing response header
+    X-Profile: cprofile also writes a cProfile dump to PROFILE_DIR
+    X-Profile: stack    also writes sampled collapsed stacks to PROFILE_DIR
+
+    The loop thread interleaves every request, so cprofile and stack only run
+    during this request's own steps; a sync endpoint (which runs in the
+    threadpool, per `is_async_route`) gets timings only. X-Profile-Scope says
+    which applied. Requests without the header (or from non-admins) pass
+    straight through.
+    """
+
+    def __init__(self, app, authorize: Callable[[Optional[str]], Awaitable[bool]],
+                 is_async_route: Optional[Callable[[dict], bool]] = None):
+        self.app = app
+        self.authorize = authorize
+        self.is_async_route = is_async_route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = None
+        auth_header = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                mode = value.decode("latin-1").strip().lower()
+            elif name == b"authorization":
+                auth_header = value.decode("latin-1")
+        if not mode or not await self.authorize(auth_header):
+            await self.app(scope, receive, send)
+            return
+
+        scope_note = None
+        if mode in ("cprofile", "stack"):
+            if self.is_async_route is not None and not self.is_async_route(scope):
+                mode, scope_note = "1", SCOPE_TIMINGS_ONLY
+            else:
+                scope_note = SCOPE_REQUEST_TASK
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        profile_file = None
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000) if mode == "stack" else None
+        if profiler or sampler:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            # Never the client's X-Request-ID: it could carry ../ or an absolute path (the log line links the two)
+            name = f"{int(time.time() * 1000)}-{uuid.uuid4().hex}"
+            profile_file = os.path.join(PROFILE_DIR, f"{name}.{'prof' if profiler else 'stacks'}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                if profile_file:
+                    headers.append((b"x-profile-file", os.path.basename(profile_file).encode("latin-1")))
+                if scope_note:
+                    headers.append((b"x-profile-scope", scope_note.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        def enter():
+            if profiler:
+                profiler.enable()
+            if sampler:
+                sampler.active = True
+
+        def leave():
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.active = False
+
+        if sampler:
+            sampler.start()
+        try:
+            if profiler or sampler:
+                await run_in_steps(self.app(scope, receive, send_wrapper), enter, leave)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.dump_stats(profile_file)
+            if sampler:
+                sampler.stop()
+                sampler.dump(profile_file)
+            current_profile.reset(token)
+            log.info("profile.request", path=scope.get("path"), mode=mode, stages=profile.server_timing(), file=profile_file)
@@ -0,0 +1,256 @@
+import os
+import time
+import heapq
+import asyncio
+import calendar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from models import Reminder
+from database import shard_sessions
+from shared_cache import shared_cache
+from structured_log import log
+
+# Only reminders due within this horizon are held in memory; later ones are loaded as the window advances
+REMINDER_WINDOW_SECONDS = float(os.environ.get("REMINDER_WINDOW_SECONDS", "3600"))
+REMINDER_LOAD_BATCH = int(os.environ.get("REMINDER_LOAD_BATCH", "5000"))
+REMINDER_MAX_HEAP = int(os.environ.get("REMINDER_MAX_HEAP", "200000"))
+# Overdue, still-open reminders this recent are delivered after a restart
+REMINDER_CATCHUP_SECONDS = float(os.environ.get("REMINDER_CATCHUP_SECONDS", "300"))
+REMINDER_SUBSCRIBER_QUEUE = int(os.environ.get("REMINDER_SUBSCRIBER_QUEUE", "100"))
+# Upper bound on how long the loop sleeps, which is also how often other workers' changes are picked up
+REMINDER_TICK_SECONDS = float(os.environ.get("REMINDER_TICK_SECONDS", "1"))
+CHANGES_CHANNEL = "reminder_changes"
+
+
+def to_epoch(value: datetime) -> float:
+    """Naive datetimes are UTC here (models default to datetime.utcnow)"""
+    if value.tzinfo is not None:
+        return value.timestamp()
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+
+
+def from_epoch(ts: float) -> datetime:
+    return datetime.utcfromtimestamp(ts)
+
+
+class ReminderScheduler:
+    """Min-heap of open reminders due inside a sliding window, firing due events to subscribers.
+
+    The heap is filled from the DB in (due_date, id) keyset pages as the window
+    advances, so memory tracks reminders due soon rather than all reminders.
+    Creations and completions are applied incrementally (and shared with other
+    workers through the shared cache); completions use lazy deletion, and only
+    live entries count toward max_heap.
+    """
+
+    def __init__(self, window: float = REMINDER_WINDOW_SECONDS, batch: int = REMINDER_LOAD_BATCH, max_heap: int = REMINDER_MAX_HEAP):
+        self.window = window
+        self.batch = batch
+        self.max_heap = max_heap
+        self._heap: List[Tuple[float, int, int, str]] = []
+        # Ids currently in the heap; a completed reminder is dropped from here and skipped when popped
+        self._live: Set[int] = set()
+        # Keyset cursor: everything up to (due, id) has been loaded
+        self._cursor: Tuple[float, int] = (0.0, 0)
+        self._exhausted_until = 0.0
+        # Fired id -> due. A reminder created inside the loaded range is pushed without moving the
+        # cursor, so a later page can select it again; these are skipped until the cursor passes them
+        self._fired: Dict[int, float] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changes_seq = 0
+        self.fired = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.loaded = 0
+
+    # Loading
+
+    def _load_until(self, horizon: float):
+        """Load open reminders after the cursor and due no later than horizon, one page at a time.
+
+        With sharding each shard returns its own next page and the pages are
+        merged, so the cursor still advances in global (due_date, id) order.
+        """
+        sessions = shard_sessions(self._session_factory)
+        try:
+            while len(self._live) < self.max_heap:
+                due, last_id = self._cursor
+                due_dt = from_epoch(due)
+                limit = min(self.batch, self.max_heap - len(self._live))
+                query = (
+                    select(Reminder.id, Reminder.user_id, Reminder.title, Reminder.due_date)
+                    .where(
+                        Reminder.completed == False,  # noqa: E712
+                        Reminder.due_date <= from_epoch(horizon),
+                        or_(Reminder.due_date > due_dt, and_(Reminder.due_date == due_dt, Reminder.id > last_id)),
+                    )
+                    .order_by(Reminder.due_date, Reminder.id)
+                    .limit(limit)
+                )
+                pages = [db.execute(query).all() for db in sessions]
+                rows = pages[0] if len(pages) == 1 else list(heapq.merge(*pages, key=lambda row: (row[3], row[0])))[:limit]
+                for reminder_id, user_id, title, due_date in rows:
+                    if reminder_id not in self._fired:
+                        self._push(to_epoch(due_date), reminder_id, user_id, title)
+                    self._cursor = (to_epoch(due_date), reminder_id)
+                self.loaded += len(rows)
+                if len(rows) < limit:
+                    # Nothing else is due before the horizon (a page cut short by the heap cap doesn't say that)
+                    self._exhausted_until = horizon
+                    break
+        finally:
+            for db in sessions:
+                db.close()
+        # Pages only select from the cursor's due date on, so older fired ids can't come back
+        self._fired = {reminder_id: due for reminder_id, due in self._fired.items() if due >= self._cursor[0]}
+
+    def _push(self, due: float, reminder_id: int, user_id: int, title: str):
+        if reminder_id in self._live:
+            return
+        heapq.heappush(self._heap, (due, reminder_id, user_id, title))
+        self._live.add(reminder_id)
+
+    def _unload_furthest(self):
+        """Drop the live entry due last and move the cursor back so a later page loads it again"""
+        due, reminder_id = max((entry[0], entry[1]) for entry in self._heap if entry[1] in self._live)
+        self._live.discard(reminder_id)
+        self._compact()
+        self._cursor = min(self._cursor, (due, reminder_id - 1))
+        # The range from there on is no longer fully loaded
+        self._exhausted_until = 0.0
+
+    def _compact(self):
+        """Rebuild the heap from live entries once completed ones (lazily deleted) outnumber them"""
+        if len(self._heap) > 2 * len(self._live):
+            self._heap = [entry for entry in self._heap if entry[1] in self._live]
+            heapq.heapify(self._heap)
+
+    # Incremental updates
+
+    def _loaded_through(self) -> float:
+        return max(self._cursor[0], self._exhausted_until)
+
+    def _apply(self, change: Dict[str, Any]):
+        if change["op"] == "created":
+            # Reminders past the loaded range are picked up by the window query later
+            if change["due"] <= self._loaded_through():
+                self._push(change["due"], change["id"], change["user_id"], change["title"])
+                if len(self._live) > self.max_heap:
+                    # Over the cap: the entry due last (possibly this one) waits for a later page
+                    self._unload_furthest()
+                if self._wakeup is not None:
+                    self._wakeup.set()
+        elif change["op"] == "completed":
+            self._live.discard(change["id"])
+            self._compact()
+
+    def reminder_created(self, reminder: Reminder):
+        change = {"op": "created", "id": reminder.id, "user_id": reminder.user_id, "title": reminder.title, "due": to_epoch(reminder.due_date)}
+        self._apply(change)
+        self._changes_seq = max(self._changes_seq, shared_cache.publish(CHANGES_CHANNEL, change))
+
+    def reminder_completed(self, reminder_id: int):
+        change = {"op": "completed", "id": reminder_id}
+        self._apply(change)
+        self._changes_seq = max(self._changes_seq, shared_cache.publish(CHANGES_CHANNEL, change))
+
+    def _sync_changes(self):
+        """Apply changes made through other workers"""
+        for seq, change in shared_cache.poll(CHANGES_CHANNEL, self._changes_seq):
+            self._apply(change)
+            self._changes_seq = seq
+
+    # Delivery
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=REMINDER_SUBSCRIBER_QUEUE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _fire(self, due: float, reminder_id: int, user_id: int, title: str):
+        self.fired += 1
+        self._fired[reminder_id] = due
+        event = {"id": reminder_id, "title": title, "due_date": from_epoch(due).isoformat()}
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def _fire_due(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            due, reminder_id, user_id, title = heapq.heappop(self._heap)
+            if reminder_id in self._live:
+                self._live.discard(reminder_id)
+                self._fire(due, reminder_id, user_id, title)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            try:
+                await asyncio.to_thread(self._sync_changes)
+                if self._loaded_through() < now + self.window / 2:
+                    await asyncio.to_thread(self._load_until, now + self.window)
+            except Exception as e:
+                log.error("reminders.load_error", error=str(e))
+
+            self._fire_due(now)
+
+            sleep = REMINDER_TICK_SECONDS
+            if self._heap:
+                sleep = min(sleep, max(0.0, self._heap[0][0] - time.time()))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, session_factory: Callable[[], Session]):
+        if self._task is not None:
+            return
+        self._session_factory = session_factory
+        self._cursor = (time.time() - REMINDER_CATCHUP_SECONDS, 0)
+        self._changes_seq = shared_cache.last_seq(CHANGES_CHANNEL)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "heap": len(self._heap),
+            "live": len(self._live),
+            "recently_fired": len(self._fired),
+            "loaded": self.loaded,
+            "loaded_through": from_epoch(self._loaded_through()).isoformat() if self._loaded_through() else None,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "fired": self.fired,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+# Global reminder scheduler
+reminder_scheduler = ReminderScheduler()
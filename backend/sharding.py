@@ -0,0 +1,157 @@
+"""Per-user shard layout tool: show where per-user rows live and move them to a new shard count.
+
+Rows keep their ids when they move, so feedback.chat_id and archived records
+stay valid. The new layout is recorded only after every row is in place; an
+interrupted rebalance can simply be run again (rows already copied are skipped).
+
+Usage (from backend/, with the app stopped):
+    python sharding.py status
+    python sharding.py rebalance --shards 8
+    DB_SHARDS=8 uvicorn main:app
+"""
+import time
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import orjson
+from sqlalchemy import func, inspect, select, update
+from sqlalchemy.orm import Session
+
+import database
+from database import (
+    MAX_SHARDS, SHARDED_TABLES, engine, id_base, prepare_shard, read_layout,
+    shard_engine, shard_for, shard_metadata,
+)
+from models import Base, ShardLayout
+
+# Rows read from a source table per round trip
+REBALANCE_BATCH = 2000
+
+
+def _location(shard: Optional[int]):
+    """(engine, table metadata) for a shard index, or the main database for None"""
+    if shard is None:
+        return engine, Base.metadata
+    return shard_engine(shard), shard_metadata
+
+
+def _row_counts(shard: Optional[int]) -> Dict[str, int]:
+    bind, metadata = _location(shard)
+    existing = set(inspect(bind).get_table_names())
+    with bind.connect() as conn:
+        return {
+            name: conn.execute(select(func.count()).select_from(metadata.tables[name])).scalar()
+            for name in SHARDED_TABLES if name in existing
+        }
+
+
+def status() -> Dict:
+    layout = read_layout()
+    shards = layout.shards if layout else 0
+    report = {
+        "shards": shards,
+        "epoch": layout.epoch if layout else 0,
+        "configured_shards": database.DB_SHARDS,
+        "main": _row_counts(None),
+    }
+    if shards:
+        report["shard_rows"] = {index: _row_counts(index) for index in range(shards)}
+        report["shard_urls"] = {index: database.DB_SHARD_URL_TEMPLATE.format(shard=index) for index in range(shards)}
+    return report
+
+
+def _move_table(name: str, source: Optional[int], destination_of, batch_size: int) -> int:
+    """Copy rows whose destination differs from `source` there, then delete them from `source`"""
+    source_engine, source_metadata = _location(source)
+    source_table = source_metadata.tables[name]
+    if not inspect(source_engine).has_table(name):
+        return 0
+    moved = 0
+    last_id = 0
+    while True:
+        with source_engine.connect() as conn:
+            rows = conn.execute(
+                select(source_table).where(source_table.c.id > last_id).order_by(source_table.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return moved
+        last_id = rows[-1]["id"]
+        by_destination: Dict[Optional[int], List[Dict]] = {}
+        for row in rows:
+            destination = destination_of(row["user_id"])
+            if destination != source:
+                by_destination.setdefault(destination, []).append(dict(row))
+        for destination, batch in by_destination.items():
+            destination_engine, destination_metadata = _location(destination)
+            with destination_engine.begin() as conn:
+                # OR IGNORE: a re-run after an interruption finds some rows already copied
+                conn.execute(destination_metadata.tables[name].insert().prefix_with("OR IGNORE"), batch)
+        moved_ids = [row["id"] for batch in by_destination.values() for row in batch]
+        if moved_ids:
+            with source_engine.begin() as conn:
+                conn.execute(source_table.delete().where(source_table.c.id.in_(moved_ids)))
+        moved += len(moved_ids)
+
+
+def rebalance(shards: int, batch_size: int = REBALANCE_BATCH) -> Dict:
+    """Move every per-user row to its place in a layout of `shards` shard files (0 = main database)"""
+    if not 0 <= shards <= MAX_SHARDS:
+        raise ValueError(f"shards must be between 0 and {MAX_SHARDS}")
+    started = time.perf_counter()
+    # Make sure the main schema (including shard_layout) exists before reading the layout
+    Base.metadata.create_all(bind=engine, tables=[
+        table for table in Base.metadata.sorted_tables if table.name not in SHARDED_TABLES
+    ])
+    layout = read_layout()
+    old_shards = layout.shards if layout else 0
+    epoch = (layout.epoch if layout else 0) + 1
+
+    if shards:
+        for index in range(shards):
+            prepare_shard(index, epoch)
+
+        def destination_of(user_id):
+            return shard_for(user_id, shards)
+    else:
+        Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[name] for name in SHARDED_TABLES])
+
+        def destination_of(user_id):
+            return None
+
+    # Every database that may hold rows under the old layout
+    sources = list(range(old_shards)) if old_shards else [None]
+    moved = {name: 0 for name in SHARDED_TABLES}
+    for source in sources:
+        for name in SHARDED_TABLES:
+            moved[name] += _move_table(name, source, destination_of, batch_size)
+
+    now = datetime.utcnow()
+    with Session(bind=engine) as db:
+        if db.execute(update(ShardLayout).where(ShardLayout.id == 1).values(shards=shards, epoch=epoch, updated_at=now)).rowcount == 0:
+            db.add(ShardLayout(id=1, shards=shards, epoch=epoch, updated_at=now))
+        db.commit()
+    return {
+        "from_shards": old_shards,
+        "to_shards": shards,
+        "epoch": epoch,
+        "next_id_base": id_base(epoch, 0) if shards else None,
+        "moved": moved,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or change how per-user tables are sharded")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the recorded layout and row counts per database")
+    rebalance_parser = commands.add_parser("rebalance", help="Move per-user rows to a new shard count (app must be stopped)")
+    rebalance_parser.add_argument("--shards", type=int, required=True, help="Shard files to spread users over (0 = back into the main database)")
+    rebalance_parser.add_argument("--batch-size", type=int, default=REBALANCE_BATCH)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        report = status()
+    else:
+        report = rebalance(args.shards, batch_size=args.batch_size)
+    print(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode())
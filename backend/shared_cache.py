@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+import orjson
+
+# "sqlite" shares state between uvicorn workers through one WAL-mode file; "memory" is per process
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+SHARED_CACHE_BACKEND = os.environ.get("SHARED_CACHE_BACKEND", "sqlite" if WEB_CONCURRENCY > 1 else "memory")
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", "./shared_cache.db")
+SHARED_CACHE_EVENT_RETENTION_SECONDS = float(os.environ.get("SHARED_CACHE_EVENT_RETENTION_SECONDS", "3600"))
+SHARED_CACHE_PURGE_INTERVAL_SECONDS = 60.0
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_channel_seq ON events (channel, seq);
+"""
+
+
+class SharedCache:
+    """Key/value store with TTLs, atomic counters and an append-only event log, shared across worker processes"""
+
+    def __init__(self, backend: str = SHARED_CACHE_BACKEND, path: str = SHARED_CACHE_PATH):
+        self.backend = backend
+        self.path = path if backend == "sqlite" else ":memory:"
+        self._conn: Optional[sqlite3.Connection] = None
+        # One connection per process; statements are microseconds, so a lock beats a connection per thread
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+        self.reads = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            if self.backend == "sqlite":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self.reads += 1
+        rows = self._execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        )
+        return orjson.loads(rows[0][0]) if rows else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.writes += 1
+        self._execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, orjson.dumps(value).decode(), self._expiry(ttl)),
+        )
+        self._maybe_purge()
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set only if the key is absent or expired; True if this caller won (usable as a lease)"""
+        self.writes += 1
+        rows = self._execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ? RETURNING key",
+            (key, orjson.dumps(value).decode(), self._expiry(ttl), time.time()),
+        )
+        return bool(rows)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to an integer counter; an expired counter restarts (ttl applies from creation)"""
+        self.writes += 1
+        now = time.time()
+        rows = self._execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ? THEN excluded.value "
+            "ELSE CAST(kv.value AS INTEGER) + ? END, "
+            "expires_at = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ? THEN excluded.expires_at "
+            "ELSE kv.expires_at END "
+            "RETURNING value",
+            (key, str(amount), self._expiry(ttl), now, amount, now),
+        )
+        return int(rows[0][0])
+
+    def delete(self, key: str):
+        self.writes += 1
+        self._execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    # Event log: workers publish and each one polls from the last sequence number it saw
+
+    def publish(self, channel: str, value: Any) -> int:
+        self.writes += 1
+        rows = self._execute(
+            "INSERT INTO events (channel, value, created_at) VALUES (?, ?, ?) RETURNING seq",
+            (channel, orjson.dumps(value).decode(), time.time()),
+        )
+        self._maybe_purge()
+        return rows[0][0]
+
+    def poll(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Any]]:
+        self.reads += 1
+        rows = self._execute(
+            "SELECT seq, value FROM events WHERE channel = ? AND seq > ? ORDER BY seq LIMIT ?", (channel, after, limit)
+        )
+        return [(seq, orjson.loads(value)) for seq, value in rows]
+
+    def last_seq(self, channel: str) -> int:
+        rows = self._execute("SELECT MAX(seq) FROM events WHERE channel = ?", (channel,))
+        return rows[0][0] or 0
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < SHARED_CACHE_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        self._execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._execute("DELETE FROM events WHERE created_at < ?", (now - SHARED_CACHE_EVENT_RETENTION_SECONDS,))
+
+    # Coroutine versions: with the sqlite backend another worker can hold the file's write lock for up
+    # to the 5s busy timeout, so calls made from the event loop wait for it in a thread instead
+
+    async def offload(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn (a cache call, or code making several) off the event loop when the cache is a shared file"""
+        if self.backend == "sqlite":
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def get_async(self, key: str, default: Any = None) -> Any:
+        return await self.offload(self.get, key, default)
+
+    async def set_async(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.offload(self.set, key, value, ttl)
+
+    async def add_async(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return await self.offload(self.add, key, value, ttl)
+
+    async def incr_async(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self.offload(self.incr, key, amount, ttl)
+
+    async def delete_async(self, key: str):
+        await self.offload(self.delete, key)
+
+    async def publish_async(self, channel: str, value: Any) -> int:
+        return await self.offload(self.publish, channel, value)
+
+    async def poll_async(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Any]]:
+        return await self.offload(self.poll, channel, after, limit)
+
+    def stats(self) -> dict:
+        keys = self._execute("SELECT COUNT(*) FROM kv")[0][0]
+        events = self._execute("SELECT COUNT(*) FROM events")[0][0]
+        return {
+            "backend": self.backend,
+            "path": self.path,
+            "pid": os.getpid(),
+            "keys": keys,
+            "events": events,
+            "reads": self.reads,
+            "writes": self.writes,
+        }
+
+
+# Global shared cache instance
+shared_cache = SharedCache()
@@ -0,0 +1,95 @@
+import os
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from structured_log import log
+
+# A failed required warm-up is retried after this delay, doubling per attempt up to the max
+STARTUP_RETRY_BASE_SECONDS = float(os.environ.get("STARTUP_RETRY_BASE_SECONDS", "1"))
+STARTUP_RETRY_MAX_SECONDS = float(os.environ.get("STARTUP_RETRY_MAX_SECONDS", "60"))
+
+
+class StartupState:
+    """Import/start timings and background warm-up progress behind /livez and /readyz"""
+
+    def __init__(self):
+        # Created by the first import in main.py, so this approximates the start of the app import
+        self.import_started = time.perf_counter()
+        self.import_seconds: Optional[float] = None
+        self.lifespan_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.warmups: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_imported(self):
+        self.import_seconds = time.perf_counter() - self.import_started
+
+    def mark_started(self):
+        """Called when the lifespan hook hands control to the server"""
+        self.lifespan_seconds = time.perf_counter() - self.import_started
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.warmups) and all(w["status"] == "ok" or not w["required"] for w in self.warmups.values())
+
+    async def _run_one(self, name: str, fn: Callable[[], Any]):
+        """Run a warm-up; a required one is retried with backoff until it succeeds (or stop())"""
+        entry = self.warmups[name]
+        start = time.perf_counter()
+        delay = STARTUP_RETRY_BASE_SECONDS
+        while True:
+            entry["attempts"] += 1
+            try:
+                # Warm-ups are blocking (DB, process spawn, HTTP probe), keep them off the event loop
+                await asyncio.to_thread(fn)
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                log.error("startup.warmup_failed", warmup=name, error=str(e), attempt=entry["attempts"],
+                          retry_in_seconds=delay if entry["required"] else None)
+                if not entry["required"]:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+            else:
+                entry["status"] = "ok"
+                entry.pop("error", None)
+                break
+        entry["seconds"] = round(time.perf_counter() - start, 4)
+
+    async def _run_all(self, warmups: List[Tuple[str, Callable[[], Any], bool]]):
+        await asyncio.gather(*[self._run_one(name, fn) for name, fn, _ in warmups])
+        if self.ready:
+            self.ready_seconds = time.perf_counter() - self.import_started
+        log.info("startup.warm", **self.report())
+
+    def start_warmups(self, warmups: List[Tuple[str, Callable[[], Any], bool]]):
+        """Run (name, fn, required) warm-ups concurrently in the background; /readyz waits only for required ones"""
+        for name, _, required in warmups:
+            self.warmups[name] = {"status": "pending", "required": required, "attempts": 0}
+        self._task = asyncio.create_task(self._run_all(warmups))
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> Dict[str, Any]:
+        def rounded(value):
+            return round(value, 4) if value is not None else None
+
+        return {
+            "ready": self.ready,
+            "import_seconds": rounded(self.import_seconds),
+            "lifespan_seconds": rounded(self.lifespan_seconds),
+            "ready_seconds": rounded(self.ready_seconds),
+            "warmups": self.warmups,
+        }
+
+
+# Global startup state
+startup = StartupState()
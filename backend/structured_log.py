@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import uuid
+import random
+import logging
+import threading
+import traceback
+import contextvars
+from collections import deque
+from typing import Dict, Optional
+
+import orjson
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE", "")
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get("LOG_FLUSH_INTERVAL_SECONDS", "0.05"))
+# Per-event sample rates for high-volume events, e.g. "chat.request=0.1,chat.response=0.1"
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "chat.request=0.1,chat.response=0.1")
+
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# Correlation id of the request being handled, set by RequestIdMiddleware
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+class StructuredLogger:
+    """JSON-lines logger; callers only append to a bounded buffer, a background thread serializes and writes"""
+
+    def __init__(self, stream=None, level: str = LOG_LEVEL, queue_size: int = LOG_QUEUE_SIZE, sample_rates: Optional[Dict[str, float]] = None, flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS):
+        self.level = LEVELS.get(level, logging.INFO)
+        self.sample_rates = sample_rates if sample_rates is not None else _parse_sample_rates(LOG_SAMPLE_RATES)
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self._stream = stream
+        # deque.append/popleft are atomic under the GIL, so producers never take a lock
+        self._buffer: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.emitted = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def _ensure_writer(self):
+        with self._thread_lock:
+            if self._thread is None:
+                if self._stream is None:
+                    self._stream = open(LOG_FILE, "ab") if LOG_FILE else sys.stdout.buffer
+                self._thread = threading.Thread(target=self._write_loop, name="structured-log-writer", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _record(ts, level, event, request_id, rate, fields) -> Dict:
+        record = {"ts": ts, "level": LEVEL_NAMES.get(level, level), "event": event}
+        if request_id:
+            record["request_id"] = request_id
+        if rate is not None:
+            record["sample_rate"] = rate
+        record.update(fields)
+        return record
+
+    def _drain(self):
+        lines = []
+        buffer = self._buffer
+        while buffer:
+            lines.append(orjson.dumps(self._record(*buffer.popleft()), default=str) + b"\n")
+        if lines:
+            try:
+                self._stream.write(b"".join(lines))
+                self._stream.flush()
+            except Exception:
+                pass
+
+    def _write_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def log(self, level: int, event: str, **fields):
+        self._emit(level, event, fields)
+
+    def _emit(self, level: int, event: str, fields: Dict):
+        if level < self.level:
+            return
+        # Errors are never sampled away
+        rate = self.sample_rates.get(event)
+        if rate is not None and level < logging.ERROR and random.random() >= rate:
+            self.sampled_out += 1
+            return
+        if len(self._buffer) >= self.queue_size:
+            # Never block the request path on logging
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self._ensure_writer()
+        # The record dict is assembled by the writer thread, off the request path
+        self._buffer.append((time.time(), level, event, request_id_var.get(), rate, fields))
+        self.emitted += 1
+
+    # One call frame per log call matters on the request path
+    def debug(self, event: str, **fields):
+        self._emit(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._emit(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._emit(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._emit(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields):
+        """Error record carrying the current exception's traceback"""
+        fields["traceback"] = traceback.format_exc()
+        self._emit(logging.ERROR, event, fields)
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (bounded) for buffered records to be written"""
+        if self._thread is None:
+            return
+        deadline = time.time() + timeout
+        while self._buffer and time.time() < deadline:
+            time.sleep(self.flush_interval / 2)
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=2.0)
+
+    def stats(self) -> Dict:
+        return {
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "queue_depth": len(self._buffer),
+        }
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware that assigns each request a correlation id (honours X-Request-ID)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+# Global logger instance
+log = StructuredLogger()
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so point everything at scratch files before any app module loads
+_SCRATCH = tempfile.mkdtemp(prefix="ai-assistant-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_SCRATCH, 'app.db')}")
+os.environ.setdefault("LOG_FILE", os.devnull)
+os.environ.setdefault("SHARED_CACHE_BACKEND", "memory")
+os.environ.setdefault("ADMIN_EMAILS", "admin@example.com")
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_SCRATCH, "archive"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_SCRATCH, "profiles"))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The FastAPI app with its schema created (the lifespan isn't run)"""
+    from database import init_db
+    import main
+
+    init_db()
+    return main.app
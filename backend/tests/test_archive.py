@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from archive import ChatArchive, archive_old_chats
+from models import Base, Chat
+
+
+def test_rows_with_lower_ids_than_archived_ones_are_archived_not_dropped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    archive = ChatArchive(str(tmp_path / "segments"))
+    now = datetime.utcnow()
+    # Id order doesn't follow timestamp order: id 1 is newer than id 2
+    db.add_all([
+        Chat(id=1, user_id=7, message="newer", response="a", timestamp=now - timedelta(days=30)),
+        Chat(id=2, user_id=7, message="older", response="b", timestamp=now - timedelta(days=400)),
+    ])
+    db.commit()
+
+    first = archive_old_chats(db, now - timedelta(days=180), archive=archive)
+    second = archive_old_chats(db, now - timedelta(days=7), archive=archive)
+
+    assert first["archived_chats"] == 1
+    assert second["archived_chats"] == 1
+    assert sorted(record["id"] for record in archive.iter_records(7)) == [1, 2]
+    assert db.query(Chat).count() == 0
+    db.close()
+
+
+def test_rerun_after_an_interrupted_delete_does_not_archive_twice(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    archive = ChatArchive(str(tmp_path / "segments"))
+    old = datetime.utcnow() - timedelta(days=400)
+    db.add_all([Chat(id=i, user_id=7, message="q", response="a", timestamp=old) for i in (1, 2, 3)])
+    db.commit()
+    # The block was written but the run died before deleting the rows
+    archive.append_block(7, "chat", [{"id": i, "timestamp": old.isoformat()} for i in (1, 2)])
+
+    report = archive_old_chats(db, datetime.utcnow() - timedelta(days=180), archive=archive)
+
+    assert report["archived_chats"] == 1
+    assert sorted(record["id"] for record in archive.iter_records(7)) == [1, 2, 3]
+    db.close()
@@ -0,0 +1,57 @@
+import time
+import asyncio
+
+import httpx
+
+# Stand-in for a query stuck behind another worker's SQLite write lock
+SLOW_QUERY_SECONDS = 0.2
+
+
+def test_event_loop_stays_responsive_during_a_login_burst(app, monkeypatch):
+    import auth
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    db.add(User(email="burst@example.com", password_hash="x"))
+    db.commit()
+    db.close()
+
+    lookup = auth.get_user_by_email
+
+    def slow_lookup(db, email):
+        time.sleep(SLOW_QUERY_SECONDS)
+        return lookup(db, email)
+
+    async def verify(password, password_hash):
+        return {"valid": True, "new_hash": None}
+
+    monkeypatch.setattr(auth, "get_user_by_email", slow_lookup)
+    monkeypatch.setattr(auth.password_hasher, "verify", verify)
+
+    async def burst():
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            ticking = asyncio.create_task(ticker())
+            responses = await asyncio.gather(*[
+                http.post("/login", json={"email": "burst@example.com", "password": "secret"}) for _ in range(8)
+            ])
+            done.set()
+            await ticking
+        return responses, max(gaps)
+
+    responses, worst_gap = asyncio.run(burst())
+    assert {r.status_code for r in responses} == {200}
+    # Eight lookups on the loop would stall it for 8 x SLOW_QUERY_SECONDS
+    assert worst_gap < SLOW_QUERY_SECONDS
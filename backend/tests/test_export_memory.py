@@ -0,0 +1,111 @@
+"""GET /export keeps memory flat as the row count grows.
+
+The app is driven as a bare ASGI callable whose `send` drops each body chunk,
+so nothing outside the export path holds on to the output. Set
+EXPORT_MEMORY_TEST_ROWS=100000 to check the 100k vs 1M case.
+"""
+import os
+import asyncio
+import tracemalloc
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+EXPORT_MEMORY_TEST_ROWS = int(os.environ.get("EXPORT_MEMORY_TEST_ROWS", "5000"))
+# Fixed for every row count; a response buffered whole would be ~15 MB at 50k rows
+PEAK_BOUND_BYTES = 4 * 1024 * 1024
+
+
+def _fill(user_id: int, rows: int):
+    from database import engine
+    from models import Chat
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            conn.execute(insert(Chat), [
+                {
+                    "user_id": user_id,
+                    "message": f"how should I plan revision for exam {i}?",
+                    "response": "Break the material into focused blocks and review actively. " * 4,
+                    "timestamp": now,
+                    "model_used": "fallback-enhanced",
+                    "tokens_used": 48,
+                    "context_length": 4,
+                }
+                for i in range(start, min(rows, start + 10000))
+            ])
+
+
+def _user(email: str, rows: int) -> str:
+    from auth import create_access_token
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    try:
+        user = User(email=email, password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+    _fill(user_id, rows)
+    return create_access_token({"sub": email})
+
+
+async def _export(app, token: str, query: bytes):
+    """Run GET /export to completion; returns (status, body bytes seen)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/export", "raw_path": b"/export", "root_path": "", "query_string": query,
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    state = {"status": None, "bytes": 0}
+    disconnect = asyncio.Event()
+
+    async def receive():
+        if not state.get("requested"):
+            state["requested"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["bytes"] += len(message.get("body", b""))
+            if not message.get("more_body"):
+                disconnect.set()
+
+    await app(scope, receive, send)
+    return state["status"], state["bytes"]
+
+
+def _peak(app, token: str, query: bytes):
+    tracemalloc.start()
+    try:
+        status, size = asyncio.run(_export(app, token, query))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert status == 200
+    return size, peak
+
+
+@pytest.mark.parametrize("query", [b"", b"compress=gzip"], ids=["plain", "gzip"])
+def test_export_peak_memory_does_not_grow_with_rows(app, query):
+    small = _user(f"export-small-{query.decode()}@example.com", EXPORT_MEMORY_TEST_ROWS)
+    large = _user(f"export-large-{query.decode()}@example.com", EXPORT_MEMORY_TEST_ROWS * 10)
+    # Warm import-time and statement caches so they don't count against the first run
+    _peak(app, small, query)
+
+    small_size, small_peak = _peak(app, small, query)
+    large_size, large_peak = _peak(app, large, query)
+
+    assert large_size > small_size * 5
+    assert small_peak < PEAK_BOUND_BYTES
+    assert large_peak < PEAK_BOUND_BYTES
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+
+
+def _counting_chat(monkeypatch):
+    """Count real _chat runs; the engine answers after a pause so duplicates overlap the first call"""
+    import main
+
+    runs = []
+    chat = main._chat
+
+    async def counted(*args, **kwargs):
+        runs.append(1)
+        return await chat(*args, **kwargs)
+
+    async def answer(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return {"content": f"answer {len(runs)}", "model": "fallback-enhanced", "provider": "local-free", "tokens_used": 3}
+
+    monkeypatch.setattr(main, "_chat", counted)
+    monkeypatch.setattr(main.ai_engine, "generate_response", answer)
+    return runs
+
+
+async def _post(app, key: str, client=("127.0.0.1", 1234)):
+    transport = httpx.ASGITransport(app=app, client=client)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        return await http.post("/chat", json={"message": "make me a revision plan"}, headers={"Idempotency-Key": key})
+
+
+def test_concurrent_duplicates_run_chat_once(app, monkeypatch):
+    runs = _counting_chat(monkeypatch)
+
+    async def burst():
+        return await asyncio.gather(*[_post(app, "same-key") for _ in range(5)])
+
+    responses = asyncio.run(burst())
+    assert len(runs) == 1
+    assert {r.status_code for r in responses} == {200}
+    assert {r.json()["response"] for r in responses} == {"answer 1"}
+    assert sorted(r.headers.get("Idempotent-Replayed") for r in responses if r.headers.get("Idempotent-Replayed")) == ["true"] * 4
+
+
+def test_anonymous_keys_are_scoped_per_client(app, monkeypatch):
+    runs = _counting_chat(monkeypatch)
+
+    first = asyncio.run(_post(app, "shared-key", client=("10.0.0.1", 1000)))
+    second = asyncio.run(_post(app, "shared-key", client=("10.0.0.2", 1000)))
+    assert len(runs) == 2
+    assert "Idempotent-Replayed" not in second.headers
+    assert first.json()["response"] == "answer 1"
+    assert second.json()["response"] == "answer 2"
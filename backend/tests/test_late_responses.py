@@ -0,0 +1,78 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+PROVIDER = "community-free"
+MESSAGE = "explain the krebs cycle"
+
+
+def _user(email: str):
+    """(user id, bearer token) for a fresh user"""
+    from auth import create_access_token
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    try:
+        user = User(email=email, password_hash="x")
+        db.add(user)
+        db.commit()
+        return user.id, create_access_token({"sub": email})
+    finally:
+        db.close()
+
+
+def _slow_provider(engine, monkeypatch, calls):
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"content": f"provider answer {len(calls)}", "model": PROVIDER, "provider": PROVIDER, "tokens_used": 5}
+
+    monkeypatch.setattr(engine, "get_available_models", lambda: ["fallback-enhanced", PROVIDER])
+    monkeypatch.setattr(engine, "_call_provider", lambda *args: answer())
+
+
+async def _missed_deadline(engine, user_id):
+    response = await engine.generate_response(MESSAGE, model=PROVIDER, user_id=user_id, deadline_ms=20)
+    # Let the provider finish in the background
+    while engine._late_tasks:
+        await asyncio.sleep(0.01)
+    return response
+
+
+def test_late_response_is_served_once_and_only_to_its_owner(app, monkeypatch):
+    from main import ai_engine
+
+    calls = []
+    _slow_provider(ai_engine, monkeypatch, calls)
+    owner_id, owner_token = _user("late-owner@example.com")
+    other_id, other_token = _user("late-other@example.com")
+
+    offline = asyncio.run(_missed_deadline(ai_engine, owner_id))
+    late_id = offline["late_response_id"]
+    assert late_id and offline["provider"] == "local-free"
+
+    client = TestClient(app)
+    assert client.get(f"/chat/late/{late_id}").status_code == 404
+    assert client.get(f"/chat/late/{late_id}", headers={"Authorization": f"Bearer {other_token}"}).status_code == 404
+    ready = client.get(f"/chat/late/{late_id}", headers={"Authorization": f"Bearer {owner_token}"})
+    assert ready.status_code == 200
+    assert ready.json() == {"status": "ready", "response": "provider answer 1", "model": PROVIDER, "tokens_used": 5, "provider": PROVIDER}
+
+    async def ask(user_id):
+        return await ai_engine.generate_response(MESSAGE, model=PROVIDER, user_id=user_id, deadline_ms=0)
+
+    # Someone else sending the same message gets a fresh provider call, not the owner's answer
+    assert asyncio.run(ask(other_id))["content"] == "provider answer 2"
+    assert asyncio.run(ask(owner_id))["content"] == "provider answer 1"
+    assert asyncio.run(ask(owner_id))["content"] == "provider answer 3"
+    assert len(calls) == 3
+
+
+def test_owner_less_callers_get_no_late_response_id(app, monkeypatch):
+    from main import ai_engine
+
+    _slow_provider(ai_engine, monkeypatch, [])
+    offline = asyncio.run(_missed_deadline(ai_engine, None))
+    assert offline["provider"] == "local-free"
+    assert offline["late_response_id"] is None
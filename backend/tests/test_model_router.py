@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from model_router import ModelRouter, OFFLINE_MODEL
+
+MODELS = ["huggingface-free", "community-free", OFFLINE_MODEL]
+
+
+def test_unseen_models_do_not_win_over_the_offline_model():
+    router = ModelRouter(MODELS, explore_every=0)
+    assert router.choose(MODELS) == OFFLINE_MODEL
+
+
+def test_an_unseen_provider_is_explored_and_then_routed_to():
+    router = ModelRouter(MODELS, explore_every=3)
+    router.record("huggingface-free", 5000.0, False)
+    picks = [router.choose(MODELS, max_latency_ms=1000) for _ in range(3)]
+    # Only the exploration slot goes to the provider nobody has named yet
+    assert picks == [OFFLINE_MODEL, OFFLINE_MODEL, "community-free"]
+    router.record("community-free", 200.0, True)
+    assert router.choose(MODELS, max_latency_ms=1000) == "community-free"
+
+
+def test_a_model_that_answered_within_the_slo_is_routed_to():
+    router = ModelRouter(MODELS, explore_every=0)
+    router.record("community-free", 120.0, True)
+    assert router.choose(MODELS, max_latency_ms=1000) == "community-free"
+    # Too slow for this request's budget
+    assert router.choose(MODELS, max_latency_ms=50) == OFFLINE_MODEL
+
+
+def test_chat_consults_the_router_once(app, monkeypatch):
+    import ai_engine as ai_engine_module
+    from main import ai_engine
+
+    monkeypatch.setattr(ai_engine_module, "ROUTER_ENABLED", True)
+    before = ai_engine.router.decisions
+    response = TestClient(app).post("/chat", json={"message": "how do I revise for a maths exam?"})
+    assert response.status_code == 200
+    assert ai_engine.router.decisions - before == 1
@@ -0,0 +1,29 @@
+import json
+import asyncio
+
+import httpx
+
+
+def test_reused_context_sends_only_the_turn_but_counts_the_full_prompt(app, monkeypatch):
+    import ai_engine as ai_engine_module
+    from main import ai_engine
+
+    prompts = []
+
+    def handler(request):
+        prompts.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "Spaced repetition.", "context": [1, 2, 3], "prompt_eval_count": 3})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(ai_engine_module.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(ai_engine, "get_available_models", lambda: ["fallback-enhanced", "ollama-local"])
+
+    async def turn(message, session_id):
+        return await ai_engine.generate_response(message, model="ollama-local", session_id=session_id, deadline_ms=0)
+
+    first = asyncio.run(turn("how should I revise?", "ws-session"))
+    second = asyncio.run(turn("how should I revise?", "ws-session"))
+
+    assert "context" not in prompts[0] and prompts[1]["context"] == [1, 2, 3]
+    assert len(prompts[1]["prompt"]) < len(prompts[0]["prompt"])
+    assert second["tokens_used"] == first["tokens_used"] == len(prompts[0]["prompt"].split())
@@ -0,0 +1,52 @@
+import os
+import time
+import asyncio
+
+import pytest
+
+from password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+def _die():
+    os._exit(1)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, queue_limit=2, timeout=5, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_dead_worker_is_replaced(hasher):
+    async def scenario():
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._submit(_die)
+        # The broken pool was dropped, so the next job gets fresh workers instead of a 500
+        hashed = await hasher.hash("correct horse")
+        return hashed, await hasher.verify("correct horse", hashed)
+
+    hashed, result = asyncio.run(scenario())
+    assert result["valid"]
+    assert hasher.restarts == 1
+    assert hasher.stats()["pending"] == 0
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes(hasher):
+    async def scenario():
+        await hasher._submit(_sleep, 0)  # start the worker
+        hasher.timeout = 0.2
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._submit(_sleep, 1.0)
+        pending_after_timeout = hasher.stats()["pending"]
+        await asyncio.sleep(1.5)
+        return pending_after_timeout, hasher.stats()["pending"]
+
+    after_timeout, after_finish = asyncio.run(scenario())
+    assert after_timeout == 1
+    assert after_finish == 0
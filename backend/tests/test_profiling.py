@@ -0,0 +1,82 @@
+import asyncio
+import cProfile
+import pstats
+
+from fastapi.testclient import TestClient
+
+from profiling import run_in_steps, SCOPE_REQUEST_TASK, SCOPE_TIMINGS_ONLY
+
+
+def _work_of_profiled_request():
+    return sum(range(1000))
+
+
+def _work_of_other_request():
+    return sum(range(1000))
+
+
+def test_profiler_sees_only_its_own_coroutine():
+    profiler = cProfile.Profile()
+
+    async def profiled():
+        for _ in range(20):
+            _work_of_profiled_request()
+            await asyncio.sleep(0)
+
+    async def other():
+        for _ in range(20):
+            _work_of_other_request()
+            await asyncio.sleep(0)
+
+    async def scenario():
+        await asyncio.gather(run_in_steps(profiled(), profiler.enable, profiler.disable), other())
+
+    asyncio.run(scenario())
+    functions = {name for _, _, name in pstats.Stats(profiler).stats}
+    assert "_work_of_profiled_request" in functions
+    assert "_work_of_other_request" not in functions
+
+
+def _admin_token() -> str:
+    from auth import create_access_token
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    if db.query(User).filter(User.email == "admin@example.com").first() is None:
+        db.add(User(email="admin@example.com", password_hash="x"))
+        db.commit()
+    db.close()
+    return create_access_token({"sub": "admin@example.com"})
+
+
+def test_sync_endpoint_gets_timings_only_async_gets_request_task(app):
+    token = _admin_token()
+
+    response = TestClient(app).get("/models", headers={"Authorization": f"Bearer {token}", "X-Profile": "cprofile"})
+    assert response.status_code == 200
+    assert response.headers["x-profile-scope"] == SCOPE_TIMINGS_ONLY
+    assert "x-profile-file" not in response.headers
+    assert "total;dur=" in response.headers["server-timing"]
+
+    chat = TestClient(app).post("/chat", json={"message": "hi", "model": "fallback-enhanced"},
+                                headers={"Authorization": f"Bearer {token}", "X-Profile": "cprofile"})
+    assert chat.status_code == 200
+    assert chat.headers["x-profile-scope"] == SCOPE_REQUEST_TASK
+    assert chat.headers["x-profile-file"].endswith(".prof")
+
+
+def test_profile_file_name_ignores_the_client_request_id(app, tmp_path):
+    import os
+    from profiling import PROFILE_DIR
+
+    token = _admin_token()
+    escape = tmp_path / "escaped"
+    response = TestClient(app).post("/chat", json={"message": "hi", "model": "fallback-enhanced"},
+                                    headers={"Authorization": f"Bearer {token}", "X-Profile": "cprofile",
+                                             "X-Request-ID": f"../../..{escape}"})
+    assert response.status_code == 200
+    name = response.headers["x-profile-file"]
+    assert "/" not in name and ".." not in name
+    assert os.path.exists(os.path.join(PROFILE_DIR, name))
+    assert not os.path.exists(f"{escape}.prof")
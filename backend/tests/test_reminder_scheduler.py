@@ -0,0 +1,111 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Reminder
+from reminder_scheduler import ReminderScheduler, from_epoch
+
+
+def _scheduler(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    scheduler = ReminderScheduler(**kwargs)
+    scheduler._session_factory = session_factory
+    return scheduler, session_factory
+
+
+def _add(session_factory, due: float) -> Reminder:
+    db = session_factory()
+    reminder = Reminder(user_id=1, title="revise", description="", due_date=from_epoch(due), completed=False)
+    db.add(reminder)
+    db.commit()
+    db.refresh(reminder)
+    db.expunge(reminder)
+    db.close()
+    return reminder
+
+
+def test_reminder_created_inside_loaded_window_fires_once(tmp_path):
+    scheduler, session_factory = _scheduler(tmp_path, window=3600, batch=100)
+    fired = []
+    scheduler._fire = lambda due, reminder_id, user_id, title, fire=scheduler._fire: (fired.append(reminder_id), fire(due, reminder_id, user_id, title))
+    now = time.time()
+    scheduler._cursor = (now - 60, 0)
+
+    first = _add(session_factory, now + 1)
+    scheduler._load_until(now + 3600)
+    # Created after the window was loaded, due before the cursor's horizon: pushed directly
+    second = _add(session_factory, now + 2)
+    scheduler.reminder_created(second)
+
+    scheduler._fire_due(now + 3)
+    scheduler._load_until(now + 7200)
+    scheduler._fire_due(now + 3)
+
+    assert fired == [first.id, second.id]
+
+
+def test_heap_cap_does_not_mark_window_exhausted(tmp_path):
+    scheduler, session_factory = _scheduler(tmp_path, window=3600, batch=100, max_heap=3)
+    now = time.time()
+    scheduler._cursor = (now - 60, 0)
+    for offset in range(5):
+        _add(session_factory, now + 10 + offset)
+
+    scheduler._load_until(now + 3600)
+    assert len(scheduler._heap) == 3
+    assert scheduler._exhausted_until == 0.0
+
+    scheduler._fire_due(now + 20)
+    scheduler._load_until(now + 3600)
+    assert len(scheduler._heap) == 2
+    assert scheduler._exhausted_until == now + 3600
+
+
+def _firing(scheduler):
+    fired = []
+    scheduler._fire = lambda due, reminder_id, user_id, title, fire=scheduler._fire: (fired.append(reminder_id), fire(due, reminder_id, user_id, title))
+    return fired
+
+
+def test_reminder_created_while_heap_is_full_still_fires(tmp_path):
+    scheduler, session_factory = _scheduler(tmp_path, window=3600, batch=100, max_heap=3)
+    fired = _firing(scheduler)
+    now = time.time()
+    scheduler._cursor = (now - 60, 0)
+    loaded = [_add(session_factory, now + 10 + offset) for offset in range(3)]
+    scheduler._load_until(now + 3600)
+
+    # Full heap, and the cursor is already past both new due times
+    early = _add(session_factory, now + 5)
+    scheduler.reminder_created(early)
+    late = _add(session_factory, now + 15)
+    scheduler.reminder_created(late)
+    assert len(scheduler._live) == 3
+
+    for tick in (20, 30):
+        scheduler._fire_due(now + tick)
+        scheduler._load_until(now + 3600)
+    scheduler._fire_due(now + 30)
+    assert sorted(fired) == sorted([early.id, late.id] + [reminder.id for reminder in loaded])
+    assert len(fired) == 5
+
+
+def test_completed_reminders_do_not_count_toward_the_cap(tmp_path):
+    scheduler, session_factory = _scheduler(tmp_path, window=3600, batch=100, max_heap=3)
+    now = time.time()
+    scheduler._cursor = (now - 60, 0)
+    reminders = [_add(session_factory, now + 10 + offset) for offset in range(4)]
+    scheduler._load_until(now + 3600)
+
+    db = session_factory()
+    db.query(Reminder).filter(Reminder.id == reminders[0].id).update({"completed": True})
+    db.commit()
+    db.close()
+    scheduler.reminder_completed(reminders[0].id)
+    scheduler._load_until(now + 3600)
+
+    assert scheduler._live == {reminder.id for reminder in reminders[1:]}
@@ -0,0 +1,81 @@
+import pytest
+
+import database
+from database import MAX_SHARDS, SHARD_ID_BITS, UnboundShardError, id_base, prepare_shard, shard_engine, shard_for
+
+SHARDS = 4
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Route per-user tables to SHARDS scratch shard files for the duration of a test"""
+    monkeypatch.setattr(database, "DB_SHARDS", SHARDS)
+    monkeypatch.setattr(database, "DB_SHARD_URL_TEMPLATE", f"sqlite:///{tmp_path}/shard{{shard}}.db")
+    monkeypatch.setattr(database, "_shard_engines", {})
+    for index in range(SHARDS):
+        prepare_shard(index, epoch=1)
+    yield
+    for shard in database._shard_engines.values():
+        shard.dispose()
+
+
+def _users_in_different_shards():
+    by_shard = {}
+    user_id = 1
+    while len(by_shard) < 2:
+        by_shard.setdefault(shard_for(user_id, SHARDS), user_id)
+        user_id += 1
+    return list(by_shard.values())
+
+
+def test_sessions_route_by_user_or_pinned_shard(app, sharded):
+    from models import Chat, User
+
+    first, second = _users_in_different_shards()
+    with database.user_session(first) as db:
+        assert db.get_bind(Chat) is shard_engine(shard_for(first, SHARDS))
+        # Tables that aren't per-user stay in the main database
+        assert db.get_bind(User) is database.engine
+    with database.user_session(second) as db:
+        assert db.get_bind(Chat) is shard_engine(shard_for(second, SHARDS))
+    # A pinned shard wins over the user, so cross-user jobs read exactly one file
+    pinned = (shard_for(first, SHARDS) + 1) % SHARDS
+    with database.SessionLocal(info={"shard": pinned, "user_id": first}) as db:
+        assert db.get_bind(Chat) is shard_engine(pinned)
+    with database.SessionLocal() as db:
+        with pytest.raises(UnboundShardError):
+            db.get_bind(Chat)
+        database.bind_user(db, first)
+        assert db.get_bind(Chat) is shard_engine(shard_for(first, SHARDS))
+
+
+def test_rows_get_ids_from_their_shard_and_epoch_range(app, sharded):
+    from models import Chat
+
+    user_id = _users_in_different_shards()[0]
+    shard = shard_for(user_id, SHARDS)
+
+    def add_chat():
+        with database.user_session(user_id) as db:
+            chat = Chat(user_id=user_id, message="q", response="a")
+            db.add(chat)
+            db.commit()
+            return chat.id
+
+    first = add_chat()
+    assert id_base(1, shard) < first < id_base(1, shard + 1)
+    # A rebalance prepares the shard for the next epoch: new rows sort after everything before it
+    prepare_shard(shard, epoch=2)
+    second = add_chat()
+    assert id_base(2, shard) < second < id_base(2, shard + 1)
+    # Re-preparing an older epoch (a restart) never moves the sequence back
+    prepare_shard(shard, epoch=1)
+    assert add_chat() == second + 1
+
+
+def test_id_base_ranges_do_not_overlap_across_epochs_and_shards():
+    bases = sorted(id_base(epoch, shard) for epoch in range(1, 4) for shard in range(MAX_SHARDS))
+    assert len(set(bases)) == len(bases)
+    assert all(later - earlier >= 1 << SHARD_ID_BITS for earlier, later in zip(bases, bases[1:]))
+    # Every range of an epoch lies above every range of the epoch before it
+    assert id_base(1, MAX_SHARDS - 1) + (1 << SHARD_ID_BITS) <= id_base(2, 0)
@@ -0,0 +1,45 @@
+import time
+import asyncio
+import sqlite3
+import threading
+
+from shared_cache import SharedCache
+
+LOCK_HELD_SECONDS = 0.3
+
+
+def test_async_calls_wait_for_another_writer_off_the_loop(tmp_path):
+    path = str(tmp_path / "shared.db")
+    cache = SharedCache(backend="sqlite", path=path)
+    cache.set("warm", 1)
+
+    # Another worker holding the file's write lock
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(LOCK_HELD_SECONDS, other.execute, ("COMMIT",))
+
+    async def scenario():
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        release.start()
+        await cache.set_async("key", "value", ttl=60)
+        won = await cache.add_async("lease", 1, ttl=60)
+        done.set()
+        await ticking
+        return won, max(gaps)
+
+    won, worst_gap = asyncio.run(scenario())
+    other.close()
+    assert won
+    assert cache.get("key") == "value"
+    assert worst_gap < LOCK_HELD_SECONDS / 2
@@ -0,0 +1,30 @@
+import asyncio
+
+import startup as startup_module
+from startup import StartupState
+
+
+def test_failed_required_warmup_is_retried_until_ready(monkeypatch):
+    monkeypatch.setattr(startup_module, "STARTUP_RETRY_BASE_SECONDS", 0.01)
+    failures = [RuntimeError("database is locked"), RuntimeError("database is locked")]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+
+    def no_ollama():
+        raise ConnectionError("connection refused")
+
+    async def run():
+        state = StartupState()
+        state.start_warmups([("database_pool", flaky, True), ("ollama_probe", no_ollama, False)])
+        await state._task
+        return state
+
+    state = asyncio.run(run())
+    assert state.ready
+    assert state.warmups["database_pool"]["status"] == "ok"
+    assert state.warmups["database_pool"]["attempts"] == 3
+    # Optional warm-ups are tried once and don't hold back readiness
+    assert state.warmups["ollama_probe"]["status"] == "failed"
+    assert state.warmups["ollama_probe"]["attempts"] == 1
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+
+def _user_id(email: str) -> int:
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    try:
+        user = User(email=email, password_hash="x")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def test_usage_stays_exact_while_a_flush_is_in_flight(app):
+    from database import SessionLocal
+    from usage import UsageMeter
+
+    user_id = _user_id("usage-flush@example.com")
+    meter = UsageMeter()
+    meter._session_factory = SessionLocal
+    write = meter._write
+
+    def slow_write(*args):
+        # Widen both halves of the write so records and reads land while it runs
+        time.sleep(0.1)
+        flushed = write(*args)
+        time.sleep(0.1)
+        return flushed
+
+    meter._write = slow_write
+
+    async def scenario():
+        recorded = 0
+        for _ in range(3):
+            meter.record(user_id, 10)
+            recorded += 1
+        seen = set()
+        flush = asyncio.create_task(meter.flush())
+        while not flush.done():
+            meter.record(user_id, 10)
+            recorded += 1
+            requests, tokens = meter.usage(user_id)
+            assert (requests, tokens) == (recorded, recorded * 10)
+            seen.add(bool(meter._inflight))
+            await asyncio.sleep(0.005)
+        await flush
+        assert True in seen
+        assert meter.usage(user_id) == (recorded, recorded * 10)
+        await meter.flush()
+        assert meter.usage(user_id) == (recorded, recorded * 10)
+        assert meter._pending == {} and meter._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_keeps_the_deltas(app):
+    from database import SessionLocal
+    from usage import UsageMeter
+
+    user_id = _user_id("usage-fail@example.com")
+    meter = UsageMeter()
+    meter._session_factory = SessionLocal
+    meter.record(user_id, 7)
+
+    def broken(*args):
+        raise RuntimeError("database is locked")
+
+    write = meter._write
+    meter._write = broken
+
+    async def scenario():
+        try:
+            await meter.flush()
+        except RuntimeError:
+            pass
+        assert meter.usage(user_id) == (1, 7)
+        meter._write = write
+        await meter.flush()
+        assert meter.usage(user_id) == (1, 7)
+
+    asyncio.run(scenario())
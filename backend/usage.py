@@ -0,0 +1,204 @@
+import os
+import asyncio
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import UsageRollup
+from structured_log import log
+
+# Daily per-user limits; 0 disables that limit. Over either one, requests are served by fallback-enhanced
+USAGE_DAILY_TOKEN_QUOTA = int(os.environ.get("USAGE_DAILY_TOKEN_QUOTA", "0"))
+USAGE_DAILY_REQUEST_QUOTA = int(os.environ.get("USAGE_DAILY_REQUEST_QUOTA", "0"))
+# How often counters are written to usage_rollups and other workers' usage is read back
+USAGE_FLUSH_SECONDS = float(os.environ.get("USAGE_FLUSH_SECONDS", "10"))
+USAGE_RELOAD_CHUNK = 500
+
+
+class UsageMeter:
+    """In-memory per-user daily counters with O(1) quota checks, flushed to usage_rollups.
+
+    The quota check reads totals from the last flush (all workers) plus this
+    worker's unflushed deltas, so it never touches the database; a user can
+    overshoot by at most what other workers served since the last flush.
+    """
+
+    def __init__(self, token_quota: int = USAGE_DAILY_TOKEN_QUOTA, request_quota: int = USAGE_DAILY_REQUEST_QUOTA):
+        self.token_quota = token_quota
+        self.request_quota = request_quota
+        self._day = datetime.utcnow().date()
+        # (day, user_id) -> [requests, tokens, degraded] not yet written
+        self._pending: Dict[Tuple[date, int], List[int]] = {}
+        # Swapped-out deltas being written; still counted until the reload lands
+        self._inflight: Dict[Tuple[date, int], List[int]] = {}
+        # user_id -> [requests, tokens] for today as of the last flush, across all workers
+        self._flushed: Dict[int, List[int]] = {}
+        self._active: Set[int] = set()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.degraded = 0
+        self.errors = 0
+
+    def _roll_day(self) -> date:
+        today = datetime.utcnow().date()
+        if today != self._day:
+            self._day = today
+            self._flushed = {}
+            self._active = set()
+        return today
+
+    def usage(self, user_id: int) -> Tuple[int, int]:
+        """Today's (requests, tokens) for a user"""
+        today = self._roll_day()
+        requests, tokens = self._flushed.get(user_id, (0, 0))
+        for deltas in (self._inflight, self._pending):
+            delta = deltas.get((today, user_id))
+            if delta is not None:
+                requests += delta[0]
+                tokens += delta[1]
+        return requests, tokens
+
+    def over_quota(self, user_id: int) -> bool:
+        if not self.token_quota and not self.request_quota:
+            return False
+        requests, tokens = self.usage(user_id)
+        return bool(
+            (self.token_quota and tokens >= self.token_quota)
+            or (self.request_quota and requests >= self.request_quota)
+        )
+
+    def record(self, user_id: int, tokens: int, degraded: bool = False):
+        today = self._roll_day()
+        self._active.add(user_id)
+        delta = self._pending.setdefault((today, user_id), [0, 0, 0])
+        delta[0] += 1
+        delta[1] += tokens or 0
+        if degraded:
+            delta[2] += 1
+            self.degraded += 1
+
+    def quota_status(self, user_id: int) -> Dict[str, Any]:
+        requests, tokens = self.usage(user_id)
+        return {
+            "day": self._day.isoformat(),
+            "requests": requests,
+            "tokens": tokens,
+            "request_quota": self.request_quota or None,
+            "token_quota": self.token_quota or None,
+            "over_quota": self.over_quota(user_id),
+        }
+
+    def _write(self, inflight: Dict[Tuple[date, int], List[int]], today: date, active: List[int]) -> Dict[int, List[int]]:
+        """Add deltas to usage_rollups and return today's totals for the given users (runs in a thread)"""
+        db = self._session_factory()
+        try:
+            if inflight:
+                now = datetime.utcnow()
+                for (day, user_id), (requests, tokens, degraded) in sorted(inflight.items()):
+                    # Increment in SQL so concurrent flushes from other workers add up rather than overwrite
+                    result = db.execute(
+                        update(UsageRollup)
+                        .where(UsageRollup.day == day, UsageRollup.user_id == user_id)
+                        .values(requests=UsageRollup.requests + requests, tokens=UsageRollup.tokens + tokens,
+                                degraded=UsageRollup.degraded + degraded, updated_at=now)
+                    )
+                    if result.rowcount == 0:
+                        db.add(UsageRollup(day=day, user_id=user_id, requests=requests, tokens=tokens, degraded=degraded, updated_at=now))
+                        db.flush()
+                db.commit()
+            flushed: Dict[int, List[int]] = {}
+            for start in range(0, len(active), USAGE_RELOAD_CHUNK):
+                rows = db.execute(
+                    select(UsageRollup.user_id, UsageRollup.requests, UsageRollup.tokens)
+                    .where(UsageRollup.day == today, UsageRollup.user_id.in_(active[start:start + USAGE_RELOAD_CHUNK]))
+                ).all()
+                for user_id, requests, tokens in rows:
+                    flushed[user_id] = [requests, tokens]
+            return flushed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def flush(self):
+        """Add pending deltas to usage_rollups, then reload today's totals for users active here
+
+        The counters are only touched on the event loop: pending deltas move to
+        _inflight before the database work is handed to a thread, and the reloaded
+        totals replace _flushed in the same step that clears _inflight, so
+        usage() never counts a delta twice or misses one.
+        """
+        self._inflight, self._pending = self._pending, {}
+        today = self._roll_day()
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, self._inflight, today, list(self._active)))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # stop() cancelled us mid-write; the thread carries on, so wait for its outcome
+            await asyncio.wait([write])
+            raise
+        finally:
+            if write.done():
+                self._settle(write, today)
+
+    def _settle(self, write: "asyncio.Future[Dict[int, List[int]]]", today: date):
+        if write.cancelled() or write.exception() is not None:
+            # Put the deltas back so the next flush retries them
+            for key, (requests, tokens, degraded) in self._inflight.items():
+                delta = self._pending.setdefault(key, [0, 0, 0])
+                delta[0] += requests
+                delta[1] += tokens
+                delta[2] += degraded
+        else:
+            if self._inflight:
+                self.flushes += 1
+            if self._roll_day() == today:
+                self._flushed = write.result()
+        self._inflight = {}
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.errors += 1
+                log.error("usage.flush_error", error=str(e))
+
+    def start(self, session_factory: Callable[[], Session], interval: float = USAGE_FLUSH_SECONDS):
+        self._session_factory = session_factory
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session_factory is not None and self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("usage.flush_error", error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_users": len(self._active),
+            "pending_users": len(self._pending),
+            "flushes": self.flushes,
+            "degraded": self.degraded,
+            "errors": self.errors,
+            "token_quota": self.token_quota or None,
+            "request_quota": self.request_quota or None,
+        }
+
+
+# Global usage meter
+usage_meter = UsageMeter()
@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+from shared_cache import shared_cache
+
+# Auth cache settings
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "300"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# How often a worker checks the shared log for invalidations made by other workers
+AUTH_CACHE_SYNC_SECONDS = float(os.environ.get("AUTH_CACHE_SYNC_SECONDS", "1"))
+INVALIDATION_CHANNEL = "auth_invalidate"
+
+
+class CachedUser:
+    """Detached snapshot of the user fields the request handlers read"""
+
+    __slots__ = ("id", "email", "communication_style", "study_level", "preferences", "created_at")
+
+    def __init__(self, id, email, communication_style, study_level, preferences, created_at=None):
+        self.id = id
+        self.email = email
+        self.communication_style = communication_style
+        self.study_level = study_level
+        self.preferences = preferences
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            communication_style=user.communication_style,
+            study_level=user.study_level,
+            preferences=dict(user.preferences or {}),
+            created_at=user.created_at,
+        )
+
+
+class AuthUserCache:
+    """Bounded TTL cache of verified token -> (claims, user snapshot)"""
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl: float = AUTH_CACHE_TTL_SECONDS, sync_interval: float = AUTH_CACHE_SYNC_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._synced_seq: Optional[int] = None
+        self._next_sync = 0.0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Time spent on decode + DB lookup for misses, used to estimate savings
+        self._miss_seconds = 0.0
+
+    async def get_async(self, token: str) -> Optional[CachedUser]:
+        """get() for code on the event loop: a due invalidation sync reads the shared log in a thread"""
+        now = time.time()
+        if now >= self._next_sync:
+            # Claimed before awaiting so concurrent callers don't all sync
+            self._next_sync = now + self.sync_interval
+            await shared_cache.offload(self._sync, now)
+        return self.get(token)
+
+    def get(self, token: str) -> Optional[CachedUser]:
+        """Return the cached user for a token, or None if absent/expired"""
+        now = time.time()
+        if now >= self._next_sync:
+            self._sync(now)
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry["expires_at"] <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry["user"]
+
+    def put(self, token: str, claims: Dict, user: CachedUser, lookup_seconds: float = 0.0):
+        """Cache a verified token; never outlives the token's own exp claim"""
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._miss_seconds += lookup_seconds
+            self._entries[token] = {"claims": claims, "user": user, "expires_at": expires_at}
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, email: str):
+        """Drop every cached token belonging to a user, in this worker and (via the shared log) the others"""
+        self._drop_user(email)
+        shared_cache.publish(INVALIDATION_CHANNEL, email)
+
+    def _drop_user(self, email: str):
+        with self._lock:
+            stale = [token for token, entry in self._entries.items() if entry["user"].email == email]
+            for token in stale:
+                del self._entries[token]
+            self.invalidations += len(stale)
+
+    def _sync(self, now: float):
+        """Apply invalidations published by other workers since the last check"""
+        self._next_sync = now + self.sync_interval
+        if self._synced_seq is None:
+            # Nothing is cached yet, so older invalidations don't matter
+            self._synced_seq = shared_cache.last_seq(INVALIDATION_CHANNEL)
+            return
+        for seq, email in shared_cache.poll(INVALIDATION_CHANNEL, self._synced_seq):
+            self._drop_user(email)
+            self._synced_seq = seq
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and estimated latency saved by skipping decode + DB lookups"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = (self._miss_seconds / self.misses * 1000) if self.misses else 0.0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "avg_miss_lookup_ms": round(avg_miss_ms, 3),
+                "estimated_saved_ms": round(avg_miss_ms * self.hits, 1),
+            }
+
+
+# Global auth cache instance
+auth_user_cache = AuthUserCache()
@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 import Chat from './Chat';
+import ChatSocket from './chatSocket';
 import AISettings from './AISettings';
 import AuthModal from './AuthModal';
 
@@ -38,6 +39,36 @@ function App() {
     }
   }, [selectedChat]);
 
+  // One WebSocket session per conversation; the server holds its history
+  const socketRef = useRef(null);
+  useEffect(() => {
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || '';
+    socketRef.current = typeof WebSocket !== 'undefined' ? new ChatSocket(backendUrl, token) : null;
+    return () => {
+      if (socketRef.current) socketRef.current.close();
+    };
+  }, [currentChat.id, token]);
+
+  const showAssistantText = (text) => {
+    setCurrentChat(prev => {
+      const messages = [...prev.messages];
+      const last = messages[messages.length - 1];
+      if (last && last.sender === 'assistant' && last.streaming) {
+        messages[messages.length - 1] = { ...last, text };
+      } else {
+        messages.push({ sender: 'assistant', text, timestamp: new Date().toISOString(), streaming: true });
+      }
+      return { ...prev, messages };
+    });
+  };
+
+  const finishAssistantText = (text) => {
+    setCurrentChat(prev => {
+      const messages = prev.messages.filter(m => !m.streaming);
+      return { ...prev, messages: [...messages, { sender: 'assistant', text, timestamp: new Date().toISOString() }] };
+    });
+  };
+
   const handleSendMessage = async (message, model = 'fallback-enhanced') => {
     // Add user message
     const userMsg = { sender: 'user', text: message, timestamp: new Date().toISOString() };
@@ -46,15 +77,35 @@ function App() {
       ...prev,
       messages: [...prev.messages, userMsg]
     }));
+    // Prefer the WebSocket session: only the new message goes over the wire
+    if (socketRef.current) {
+      try {
+        const previous = currentChat.messages.map(({ sender, text }) => ({ sender, text }));
+        const data = await socketRef.current.send(message, model, showAssistantText, previous);
+        finishAssistantText(data.response);
+        return data.response;
+      } catch (error) {
+        console.warn('WebSocket chat failed, falling back to HTTP:', error);
+        setCurrentChat(prev => ({ ...prev, messages: prev.messages.filter(m => !m.streaming) }));
+      }
+    }
     // Send the full conversation history (including the new user message)
     const history = [...currentChat.messages, userMsg];
     try {
       const backendUrl = process.env.REACT_APP_BACKEND_URL || '';
-      const response = await fetch(`${backendUrl}/api/chat`, {
+      // Same key on the retry, so a request that did reach the server isn't answered (and saved) twice
+      const idempotencyKey = window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      const post = () => fetch(`${backendUrl}/api/chat`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
         body: JSON.stringify({ message, history, model })
       });
+      let response;
+      try {
+        response = await post();
+      } catch (networkError) {
+        response = await post();
+      }
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -0,0 +1,98 @@
+// WebSocket chat client: the server keeps the conversation, so each send carries only the new message.
+// Reconnects with the last session_id so the server-side history (and any reply lost mid-send) survives drops.
+
+const RECONNECT_DELAY_MS = 1000;
+
+export default class ChatSocket {
+  constructor(backendUrl, token) {
+    const base = backendUrl || window.location.origin;
+    this.url = base.replace(/^http/, 'ws') + '/api/ws/chat';
+    this.token = token;
+    this.sessionId = null;
+    this.ws = null;
+    this.pending = new Map(); // message id -> {resolve, reject, text, onChunk}
+    this.nextId = 1;
+    this.closed = false;
+    this.seeded = false;
+  }
+
+  connect() {
+    if (this.ws && (this.ws.readyState === WebSocket.OPEN || this.ws.readyState === WebSocket.CONNECTING)) {
+      return this.ready;
+    }
+    const params = new URLSearchParams();
+    if (this.token) params.set('token', this.token);
+    if (this.sessionId) params.set('session_id', this.sessionId);
+    const query = params.toString();
+    this.ws = new WebSocket(query ? `${this.url}?${query}` : this.url);
+    this.ready = new Promise((resolve, reject) => {
+      this.ws.onmessage = (event) => this.handleFrame(JSON.parse(event.data), resolve);
+      this.ws.onerror = () => reject(new Error('WebSocket error'));
+      this.ws.onclose = () => this.handleClose(reject);
+    });
+    return this.ready;
+  }
+
+  handleFrame(frame, resolveReady) {
+    if (frame.type === 'session') {
+      this.sessionId = frame.session_id;
+      resolveReady();
+    } else if (frame.type === 'ping') {
+      this.ws.send(JSON.stringify({ type: 'pong' }));
+    } else if (frame.type === 'chunk') {
+      const entry = this.pending.get(frame.id);
+      if (entry) {
+        entry.text += frame.text;
+        if (entry.onChunk) entry.onChunk(entry.text);
+      }
+    } else if (frame.type === 'done') {
+      const entry = this.pending.get(frame.id);
+      if (entry) {
+        this.pending.delete(frame.id);
+        // A redelivered reply carries the whole text because its chunks were lost
+        entry.resolve({ ...frame, response: frame.response || entry.text });
+      }
+    } else if (frame.type === 'error' && frame.id !== undefined) {
+      const entry = this.pending.get(frame.id);
+      if (entry) {
+        this.pending.delete(frame.id);
+        entry.reject(new Error(frame.detail));
+      }
+    }
+  }
+
+  handleClose(rejectReady) {
+    rejectReady(new Error('WebSocket closed'));
+    if (this.closed) return;
+    // Replies still in flight are redelivered by the server after the reconnect
+    if (this.pending.size > 0) {
+      setTimeout(() => this.connect().catch(() => this.failPending()), RECONNECT_DELAY_MS);
+    }
+  }
+
+  failPending() {
+    for (const entry of this.pending.values()) entry.reject(new Error('Connection lost'));
+    this.pending.clear();
+  }
+
+  // history is only sent with the first message, to seed a conversation picked up from local storage
+  async send(text, model, onChunk, history) {
+    await this.connect();
+    const id = this.nextId++;
+    const frame = { type: 'message', id, text, model };
+    if (!this.seeded && history && history.length > 0) {
+      frame.history = history;
+    }
+    this.seeded = true;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject, text: '', onChunk });
+      this.ws.send(JSON.stringify(frame));
+    });
+  }
+
+  close() {
+    this.closed = true;
+    this.failPending();
+    if (this.ws) this.ws.close();
+  }
+}
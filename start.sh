@@ -13,8 +13,10 @@ echo "==== DEBUG: Running database migrations ===="
 python -m alembic upgrade head
 
 # Start the backend in the background and log output
-echo "==== DEBUG: Starting backend ===="
-python -m uvicorn main:app --host 0.0.0.0 --port 8000 > /app/backend.log 2>&1 &
+# WEB_CONCURRENCY > 1 runs several worker processes; they share state through SHARED_CACHE_PATH
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
+echo "==== DEBUG: Starting backend ($WEB_CONCURRENCY workers) ===="
+python -m uvicorn main:app --host 0.0.0.0 --port 8000 --workers "$WEB_CONCURRENCY" > /app/backend.log 2>&1 &
 
 # Wait a few seconds for backend to start, then print the log
 sleep 5